@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Content-addressed firmware build cache for RF tuning.
+Each (HIGH_UNIT_US, LOW_UNIT_US, INTER_FRAME_GAP_US, FQBN) candidate is
+rendered from the .ino, compiled once with arduino-cli and stored under
+.build_cache/<sha1 of rendered source + FQBN>/. Builds run in a background
+worker so the next likely candidates are compiled while the current one
+is being measured; flashing then only uploads the ready-made hex.
+
+Usage:
+  python3 build_cache.py 492 476 8784          # build (or reuse) one candidate
+  python3 build_cache.py --list
+  python3 build_cache.py --clear
+"""
+import os
+import re
+import sys
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+SKETCH_PATH = BASE_DIR / "attiny" / "attiny85THN132N_aht20.ino"
+CACHE_DIR = BASE_DIR / ".build_cache"
+FQBN = "ATTinyCore:avr:attinyx5micr"
+
+# Local arduino-cli installation (not snap); overridable so a stand-in
+# (fake_arduino_cli.py) can be used without hardware
+ARDUINO_CLI = os.environ.get(
+    "ARDUINO_CLI", "/home/joan/Projectes/OregonDecoding/Antigravity/bin/arduino-cli"
+)
+
+CONSTANTS = ("HIGH_UNIT_US", "LOW_UNIT_US", "INTER_FRAME_GAP_US")
+
+
+def render_sketch(source, high, low, gap):
+    """Same substitution as update_values, without touching the file."""
+    for name, value in zip(CONSTANTS, (high, low, gap)):
+        source, n = re.subn(
+            rf"(const\s+uint16_t\s+{name}\s*=\s*)(\d+);", f"\\g<1>{value};", source
+        )
+        if n != 1:
+            raise ValueError(f"{name} not found in sketch")
+    return source
+
+
+def _failed(future):
+    return future.done() and not future.cancelled() and future.exception() is not None
+
+
+class BuildCache:
+    def __init__(self, sketch=SKETCH_PATH, fqbn=FQBN, cli=ARDUINO_CLI, cache_dir=CACHE_DIR, workers=1):
+        self.sketch = Path(sketch)
+        self.fqbn = fqbn
+        self.cli = cli
+        self.cache_dir = Path(cache_dir)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def _source(self, high, low, gap):
+        with open(self.sketch, "r") as f:
+            return render_sketch(f.read(), high, low, gap)
+
+    def key(self, high, low, gap):
+        h = hashlib.sha1(self._source(high, low, gap).encode())
+        h.update(self.fqbn.encode())
+        return h.hexdigest()[:16]
+
+    def entry(self, key):
+        return self.cache_dir / key
+
+    def sketch_dir(self, key):
+        # arduino-cli needs the folder name to match the .ino name
+        return self.entry(key) / "sketch" / self.sketch.stem
+
+    def is_built(self, key):
+        return any((self.entry(key) / "build").glob("*.hex"))
+
+    def _compile(self, high, low, gap, key):
+        if self.is_built(key):
+            with self.lock:
+                self.hits += 1
+            return self.entry(key)
+
+        # Build in a scratch dir and move into place atomically
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f"{key}.", dir=self.cache_dir))
+        sketch_dir = tmp / "sketch" / self.sketch.stem
+        sketch_dir.mkdir(parents=True)
+        (sketch_dir / self.sketch.name).write_text(self._source(high, low, gap))
+
+        cmd = [self.cli, "compile", "-b", self.fqbn, "--output-dir", str(tmp / "build"), str(sketch_dir)]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+        if result.returncode != 0:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise RuntimeError(f"compile failed for H={high} L={low} G={gap}: {result.stderr.strip()}")
+
+        try:
+            os.rename(tmp, self.entry(key))
+        except OSError:
+            # Another process built the same key first
+            shutil.rmtree(tmp, ignore_errors=True)
+        with self.lock:
+            self.builds += 1
+        return self.entry(key)
+
+    def submit(self, high, low, gap):
+        """Schedule a build in the background worker (no-op if cached or queued)."""
+        key = self.key(high, low, gap)
+        with self.lock:
+            future = self.pending.get(key)
+            if future is not None and not _failed(future):
+                return future
+            future = self.executor.submit(self._compile, high, low, gap, key)
+            self.pending[key] = future
+        # Outside the lock: the callback runs right here if it already failed
+        future.add_done_callback(lambda f: self._forget_failed(key, f))
+        return future
+
+    def _forget_failed(self, key, future):
+        """A failed build is not cached: the next submit retries it."""
+        if not _failed(future):
+            return
+        with self.lock:
+            if self.pending.get(key) is future:
+                del self.pending[key]
+
+    def prefetch(self, candidates):
+        for high, low, gap in candidates:
+            self.submit(high, low, gap)
+
+    def cancel_prefetch(self):
+        """Drop queued (not yet started) builds so a needed one runs next."""
+        with self.lock:
+            for key, future in list(self.pending.items()):
+                if future.cancel():
+                    del self.pending[key]
+
+    def build(self, high, low, gap):
+        """Blocking build; waits for an in-flight prefetch of the same key."""
+        return self.submit(high, low, gap).result()
+
+    def upload(self, high, low, gap):
+        """Upload a cached build (compiling it first if needed)."""
+        key = self.key(high, low, gap)
+        entry = self.build(high, low, gap)
+        cmd = [self.cli, "upload", "-b", self.fqbn, "--input-dir", str(entry / "build"),
+               str(self.sketch_dir(key))]
+        print(f"Uploading cached build {key}...")
+        subprocess.run(cmd, check=True, timeout=60)
+        return key
+
+    def entries(self):
+        if not self.cache_dir.exists():
+            return []
+        return sorted(p for p in self.cache_dir.iterdir() if p.is_dir() and "." not in p.name)
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+def read_entry_values(entry):
+    """(high, low, gap) of a cached build, read back from its rendered sketch."""
+    ino = next((entry / "sketch").glob("*/*.ino"))
+    content = ino.read_text()
+    return tuple(
+        int(re.search(rf"const\s+uint16_t\s+{name}\s*=\s*(\d+);", content).group(1))
+        for name in CONSTANTS
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Firmware build cache")
+    parser.add_argument("values", nargs="*", type=int, help="HIGH LOW GAP to build")
+    parser.add_argument("--cli", default=ARDUINO_CLI, help="arduino-cli binary")
+    parser.add_argument("--fqbn", default=FQBN)
+    parser.add_argument("--list", action="store_true", help="List cached builds")
+    parser.add_argument("--clear", action="store_true", help="Delete the cache")
+    args = parser.parse_args()
+
+    with BuildCache(fqbn=args.fqbn, cli=args.cli) as cache:
+        if args.clear:
+            cache.clear()
+            print(f"✓ Cleared {cache.cache_dir}")
+        elif args.list:
+            for entry in cache.entries():
+                h, l, g = read_entry_values(entry)
+                print(f"{entry.name}  High={h} Low={l} Gap={g}")
+        elif len(args.values) == 3:
+            entry = cache.build(*args.values)
+            status = "cached" if cache.hits else "built"
+            print(f"✓ {status}: {entry}")
+        else:
+            parser.print_help()
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Frame collision simulator for several cloned THN132N transmitters.
+Each device transmits every 39/41/43 s (its channel period) stretched by
+its own clock error (the ATtiny oscillator/WDT varies between units, see
+docs/RF_TUNING_KNOWLEDGE.md section 1) plus a little per-burst jitter.
+A burst is two frame copies separated by INTER_FRAME_GAP_US; a copy is
+corrupted when any other device's copy overlaps it, and a reading is lost
+when both copies are corrupted.
+
+All transmit events of a run are generated at once and swept in start
+order (a sorted event list instead of a heap-driven loop), so days of
+simulated time take milliseconds and many random power-on phases and
+drift draws can be averaged.
+
+Because all periods are whole seconds, devices are phase-locked modulo
+1 s: two devices whose clocks agree can collide burst after burst until
+their drift separates them (a "dropout" the console shows as lost). With
+--recommend, per-device period offsets (added to active_delay_ms in the
+firmware) are searched so that losses and dropouts are minimised.
+
+Usage:
+  python3 collision_sim.py --sensor a:1 --sensor b:1 --sensor c:2 --days 7
+  python3 collision_sim.py --n 6 --drift-ppm 500 --recommend
+  python3 collision_sim.py --sensor a:1:120 --sensor b:1:-80 --recommend --max-offset-ms 300
+"""
+import time
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+from ook_synth import INO_FILE, REPEATS, ESP32_TIMINGS, read_timings
+from sensor_scheduler import CHANNEL_PERIODS, RAW_BITS
+
+# --- CONFIGURATION ---
+DRIFT_PPM = 1000.0      # std of the per-device clock error when not given
+JITTER_MS = 2.0         # std of the per-burst period jitter
+MISS_LIMIT = 3          # consecutive losses counted as a console dropout
+
+Device = namedtuple("Device", ["name", "channel", "drift_ppm"])
+Result = namedtuple("Result", ["bursts", "collided", "lost", "dropout", "max_run"])
+
+
+def parse_device(text):
+    """NAME:CHANNEL[:DRIFT_PPM] (drift drawn at random when omitted)."""
+    parts = text.split(":")
+    try:
+        name, channel = parts[0], int(parts[1])
+        drift = float(parts[2]) if len(parts) > 2 else None
+        if len(parts) > 3:
+            raise ValueError
+    except (ValueError, IndexError):
+        raise argparse.ArgumentTypeError(f"expected NAME:CHANNEL[:DRIFT_PPM], got {text}")
+    if channel not in CHANNEL_PERIODS:
+        raise argparse.ArgumentTypeError(f"invalid channel in {text}")
+    return Device(name, channel, drift)
+
+
+def copy_layout_us(timings, repeats=REPEATS):
+    """(start offset, duration) of every frame copy inside one burst."""
+    frame = RAW_BITS * (timings.high_us + timings.low_us)
+    return [(k * (frame + timings.gap_us), frame) for k in range(repeats)]
+
+
+def simulate(devices, offsets_ms, layout, days, drifts_ppm, phases_s, rng, jitter_ms=JITTER_MS,
+             miss_limit=MISS_LIMIT):
+    """
+    One run. drifts_ppm/phases_s hold one value per device; offsets_ms is the
+    period offset applied to each device. Returns a Result of per-device arrays.
+    """
+    horizon = days * 86400.0
+    starts, owner = [], []
+    for i, dev in enumerate(devices):
+        period = (CHANNEL_PERIODS[dev.channel] + offsets_ms[i] / 1000.0) * (1 + drifts_ppm[i] * 1e-6)
+        n = int((horizon - phases_s[i]) // period) + 1
+        steps = np.full(n, period)
+        steps[0] = phases_s[i]
+        if jitter_ms:
+            steps[1:] += rng.normal(0, jitter_ms / 1000.0, n - 1)
+        starts.append(np.cumsum(steps))
+        owner.append(np.full(n, i))
+    t_burst = np.concatenate(starts)
+    burst_owner = np.concatenate(owner)
+    n_bursts = len(t_burst)
+
+    # Frame copies: (start, end, burst index)
+    offs = np.array([o for o, _ in layout]) / 1e6
+    durs = np.array([d for _, d in layout]) / 1e6
+    c_start = (t_burst[:, None] + offs[None, :]).ravel()
+    c_end = c_start + np.tile(durs, n_bursts)
+    c_burst = np.repeat(np.arange(n_bursts), len(layout))
+
+    # Sweep in start order: a copy is hit if an earlier copy is still on air
+    # or the next one starts before it ends. A device's own copies never
+    # overlap (gap and period are far longer than a copy), so any overlap
+    # comes from another device.
+    order = np.argsort(c_start, kind="stable")
+    s, e = c_start[order], c_end[order]
+    prev_end = np.maximum.accumulate(e)
+    hit = np.zeros(len(s), dtype=bool)
+    hit[1:] = prev_end[:-1] > s[1:]
+    hit[:-1] |= s[1:] < e[:-1]
+
+    hits = np.bincount(c_burst[order], weights=hit, minlength=n_bursts)
+    collided = hits > 0
+    lost = hits == len(layout)
+
+    k = len(devices)
+    res = Result(np.bincount(burst_owner, minlength=k),
+                 np.bincount(burst_owner, weights=collided, minlength=k),
+                 np.bincount(burst_owner, weights=lost, minlength=k),
+                 np.zeros(k), np.zeros(k, dtype=np.int64))
+    for i in range(k):
+        dev_lost = lost[burst_owner == i]
+        runs = _runs(dev_lost)
+        if len(runs):
+            res.max_run[i] = runs.max()
+            res.dropout[i] = runs[runs >= miss_limit].sum()
+    return res
+
+
+def _runs(flags):
+    """Lengths of the runs of True in a boolean array."""
+    padded = np.concatenate(([0], flags.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    return edges[1::2] - edges[0::2]
+
+
+class Experiment:
+    """
+    Monte Carlo over power-on phases and unknown drifts. The random draws are
+    fixed per trial, so different offsets are compared on the same scenarios.
+    """
+
+    def __init__(self, devices, layout, days, trials, drift_ppm=DRIFT_PPM, jitter_ms=JITTER_MS,
+                 miss_limit=MISS_LIMIT, seed=None):
+        self.devices = devices
+        self.layout = layout
+        self.days = days
+        self.jitter_ms = jitter_ms
+        self.miss_limit = miss_limit
+        rng = np.random.default_rng(seed)
+        self.scenarios = []
+        for t in range(trials):
+            drifts = np.array([rng.normal(0, drift_ppm) if d.drift_ppm is None else d.drift_ppm
+                               for d in devices])
+            phases = rng.uniform(0, [CHANNEL_PERIODS[d.channel] for d in devices])
+            self.scenarios.append((drifts, phases, int(rng.integers(1 << 31))))
+        self.evaluations = 0
+
+    def run(self, offsets_ms):
+        """Summed per-device Result over all trials."""
+        total = None
+        for drifts, phases, seed in self.scenarios:
+            res = simulate(self.devices, offsets_ms, self.layout, self.days, drifts, phases,
+                           np.random.default_rng(seed), self.jitter_ms, self.miss_limit)
+            if total is None:
+                total = Result(*(a.astype(float) for a in res[:4]), res.max_run.copy())
+            else:
+                total = Result(*(a + b for a, b in zip(total[:4], res[:4])),
+                               np.maximum(total.max_run, res.max_run))
+        self.evaluations += 1
+        return total
+
+    @staticmethod
+    def score(res):
+        """Fraction of readings lost plus fraction spent in dropouts."""
+        n = res.bursts.sum()
+        return (res.lost.sum() + res.dropout.sum()) / n
+
+    def recommend(self, max_offset_ms, step_ms, passes=2):
+        """Greedy coordinate search over per-device period offsets."""
+        candidates = np.arange(-max_offset_ms, max_offset_ms + step_ms / 2, step_ms)
+        offsets = np.zeros(len(self.devices))
+        best = self.score(self.run(offsets))
+        for _ in range(passes):
+            improved = False
+            # The first device is the reference; only relative offsets matter
+            for i in range(1, len(self.devices)):
+                for c in candidates:
+                    if c == offsets[i]:
+                        continue
+                    trial = offsets.copy()
+                    trial[i] = c
+                    score = self.score(self.run(trial))
+                    if score < best - 1e-12:
+                        best, offsets, improved = score, trial, True
+            if not improved:
+                break
+        return offsets, best
+
+
+def print_result(devices, res, offsets_ms, days, trials):
+    print(f"{'device':>8} {'ch':>3} {'offset':>8} {'bursts':>8} {'collided':>9} {'lost':>7} "
+          f"{'dropout':>8} {'max run':>8}")
+    for i, d in enumerate(devices):
+        n = res.bursts[i]
+        print(f"{d.name:>8} {d.channel:>3} {offsets_ms[i]:+7.0f}ms {n/trials:8.0f} "
+              f"{100*res.collided[i]/n:8.2f}% {100*res.lost[i]/n:6.2f}% "
+              f"{100*res.dropout[i]/n:7.2f}% {res.max_run[i]:8d}")
+    n = res.bursts.sum()
+    print(f"{'all':>8} {'':>3} {'':>8} {n/trials:8.0f} {100*res.collided.sum()/n:8.2f}% "
+          f"{100*res.lost.sum()/n:6.2f}% {100*res.dropout.sum()/n:7.2f}%")
+    print(f"  ({trials} trial(s) of {days:g} days; 'max run' = longest streak of lost readings)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="THN132N multi-transmitter collision simulator")
+    parser.add_argument("--sensor", type=parse_device, action="append",
+                        help="NAME:CHANNEL[:DRIFT_PPM] (repeat per transmitter)")
+    parser.add_argument("--n", type=int, help="N transmitters spread over channels 1-3")
+    parser.add_argument("--days", type=float, default=3.0, help="Simulated time per trial")
+    parser.add_argument("--trials", type=int, default=8, help="Random phase/drift draws")
+    parser.add_argument("--drift-ppm", type=float, default=DRIFT_PPM,
+                        help="Std of the clock error for devices without a measured drift")
+    parser.add_argument("--jitter-ms", type=float, default=JITTER_MS, help="Per-burst period jitter (std)")
+    parser.add_argument("--miss-limit", type=int, default=MISS_LIMIT,
+                        help="Consecutive losses that count as a dropout")
+    parser.add_argument("--ino", default=str(INO_FILE), help="Firmware to read timings from")
+    parser.add_argument("--esp32", action="store_true", help="Use ESP32 RMT timings")
+    parser.add_argument("--recommend", action="store_true", help="Search per-device period offsets")
+    parser.add_argument("--max-offset-ms", type=float, default=500.0)
+    parser.add_argument("--offset-step-ms", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    devices = list(args.sensor or [])
+    if args.n:
+        devices += [Device(f"s{i+1}", 1 + i % 3, None) for i in range(args.n)]
+    if len(devices) < 2:
+        parser.error("need at least two transmitters (--sensor / --n)")
+
+    timings = ESP32_TIMINGS if args.esp32 else read_timings(args.ino)
+    layout = copy_layout_us(timings)
+    airtime = layout[-1][0] + layout[-1][1]
+    print(f"Timings: High={timings.high_us}us, Low={timings.low_us}us, Gap={timings.gap_us}us "
+          f"-> {len(layout)} copies of {layout[0][1]/1000:.1f} ms, burst {airtime/1000:.1f} ms")
+
+    exp = Experiment(devices, layout, args.days, args.trials, args.drift_ppm, args.jitter_ms,
+                     args.miss_limit, args.seed)
+    zero = np.zeros(len(devices))
+    t0 = time.perf_counter()
+    base = exp.run(zero)
+    print(f"\n📊 Nominal periods ({time.perf_counter() - t0:.2f}s for "
+          f"{args.trials * args.days:g} simulated days)")
+    print_result(devices, base, zero, args.days, args.trials)
+
+    if args.recommend:
+        t0 = time.perf_counter()
+        offsets, score = exp.recommend(args.max_offset_ms, args.offset_step_ms)
+        elapsed = time.perf_counter() - t0
+        print(f"\n🎯 Recommended offsets ({exp.evaluations} evaluations, {elapsed:.1f}s)")
+        print_result(devices, exp.run(offsets), offsets, args.days, args.trials)
+        print(f"  score {exp.score(base):.4f} -> {score:.4f}")
+        for d, o in zip(devices, offsets):
+            if o:
+                print(f"  {d.name}: add {o:+.0f} ms to active_delay_ms "
+                      f"(period {CHANNEL_PERIODS[d.channel] + o/1000:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
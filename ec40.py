@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the EC40 suite.
+Each subcommand runs one of the existing scripts unchanged (same options,
+same output); only that script is imported, so heavy dependencies such as
+pandas or numpy are loaded by the subcommands that need them and nothing
+else pays for them. `gen` is answered here directly from
+gen_tramas_thn132n, which has no heavy imports.
+
+Scripts that read or write data files relative to the working directory
+(logger, merge, build-lut) run from ec40_lut_suite/, where those files live.
+
+Usage:
+  python3 ec40.py gen 21.5 --house 247
+  python3 ec40.py capture
+  python3 ec40.py merge
+  python3 ec40.py build-lut
+  python3 ec40.py verify --full
+  python3 ec40.py solve --target p --gens 20
+  python3 ec40.py tune --strategy simulate --seed 1
+  python3 ec40.py <command> --help
+"""
+import os
+import sys
+
+# os.path instead of pathlib: pathlib alone is a large share of `gen` startup
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SUITE_DIR = os.path.join(BASE_DIR, "ec40_lut_suite")
+
+# --- CONFIGURATION ---
+# name -> (script, description, run from SUITE_DIR)
+COMMANDS = {
+    "capture": (os.path.join(SUITE_DIR, "01_data_capture", "logger_ec40.py"),
+                "Log live EC40 frames from rtl_433 to ec40_live.csv", True),
+    "merge": (os.path.join(SUITE_DIR, "01_data_capture", "merge_ec40_csvs.py"),
+              "Merge ec40_capturas*.csv into ec40_capturas_merged.csv", True),
+    "normalize": (os.path.join(SUITE_DIR, "04_universal_mp_analysis", "normalize_all_csvs.py"),
+                  "Normalize every capture CSV to the standard format", False),
+    "build-lut": (os.path.join(SUITE_DIR, "02_table_analysis", "build_r12_lut.py"),
+                  "Build the temperature -> R12 LUT from the merged captures", True),
+    "verify": (os.path.join(SUITE_DIR, "04_universal_mp_analysis", "generate_verification_table.py"),
+               "Compare captures against the generator (verification table)", False),
+    "solve": (os.path.join(SUITE_DIR, "04_universal_mp_analysis", "gp_search.py"),
+              "Genetic-programming search for M/P formulas", False),
+    "tune": (os.path.join(BASE_DIR, "tune_rf.py"),
+             "RF timing tuning loop (flash -> measure -> adjust)", False),
+}
+
+GEN_HELP = "Print the EC40 payload and RAW168 for one or more temperatures"
+GEN_DIR = os.path.join(SUITE_DIR, "02_table_analysis")
+
+
+def print_usage():
+    print("usage: ec40.py <command> [options]\n\ncommands:")
+    print(f"  {'gen':10} {GEN_HELP}")
+    for name, (_, description, _) in COMMANDS.items():
+        print(f"  {name:10} {description}")
+    print("\nRun 'ec40.py <command> --help' for the options of a command.")
+
+
+def run_script(script, args, in_suite_dir):
+    """Run a standalone script as __main__ with the given arguments."""
+    import runpy
+
+    sys.argv = [script] + list(args)
+    sys.path.insert(0, os.path.dirname(script))
+    if in_suite_dir:
+        os.chdir(SUITE_DIR)
+    runpy.run_path(script, run_name="__main__")
+
+
+def cmd_gen(args):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="ec40.py gen", description=GEN_HELP)
+    parser.add_argument("temp", nargs="+", type=float, help="Temperature in C")
+    parser.add_argument("--house", type=int, default=247, help="House code (0-255)")
+    parser.add_argument("--channel", type=int, default=1, help="Channel nibble (1, 2 or 4)")
+    parser.add_argument("--payload-only", action="store_true", help="Omit the RAW168 column")
+    args = parser.parse_args(args)
+
+    sys.path.insert(0, GEN_DIR)
+    from gen_tramas_thn132n import build_ec40_post, build_raw_from_ec40_post
+
+    for t in args.temp:
+        payload = build_ec40_post(t, args.channel, args.house)
+        if args.payload_only:
+            print(f"{t:6.1f} C  {payload.hex()}")
+        else:
+            print(f"{t:6.1f} C  {payload.hex()}  {build_raw_from_ec40_post(payload)}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print_usage()
+        return
+
+    command, args = argv[0], argv[1:]
+    if command == "gen":
+        cmd_gen(args)
+    elif command in COMMANDS:
+        script, _, in_suite_dir = COMMANDS[command]
+        run_script(script, args, in_suite_dir)
+    else:
+        print(f"✗ Unknown command '{command}'\n")
+        print_usage()
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠  Interrupted by user.")
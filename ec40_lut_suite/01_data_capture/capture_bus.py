@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bus pub/sub asyncio para el camino de captura.
+
+logger_ec40 publica cada trama parseada una sola vez y el bus la reparte a
+varios consumidores ("sinks") que trabajan en paralelo mientras se captura:
+
+    CsvSink        ec40_live.csv (solo tramas nuevas, como siempre)
+    BinarySink     registros de tamaño fijo: epoch + payload + RAW168
+    DedupSink      índice de repeticiones por RAW168 (ráfagas)
+    OutlierSink    aviso [outlier] con la moda online por celda
+    MPTableSink    tabla M/P por (house, temp_idx) actualizada en vivo
+    AccuracySink   trama recibida vs gen_tramas_thn132n
+    CoverageSink   mapa de temperaturas vistas por house
+
+Cada sink tiene su propia cola acotada. publish() nunca espera: si la cola
+de un sink lento está llena se descarta la trama más antigua (o la nueva,
+según la política) y se cuenta, así que la ingesta RF no se bloquea nunca.
+Un sink con trabajo bloqueante (disco) pone `threaded = True` y se ejecuta
+en un hilo para no frenar el bucle de eventos.
+
+Un sink es cualquier objeto con `name` y `handle(frame)` (función o
+corrutina) y, opcionalmente, `close()`.
+"""
+
+import asyncio
+import csv
+import inspect
+import struct
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR / "02_table_analysis"))
+
+from online_mode import OnlineModeDetector, temp_to_idx
+
+QUEUE_SIZE = 256
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+
+_STOP = object()
+
+
+class _Subscription:
+    def __init__(self, sink, maxsize, policy):
+        self.sink = sink
+        self.name = getattr(sink, "name", type(sink).__name__)
+        self.queue = asyncio.Queue(maxsize)
+        self.policy = policy
+        self.handled = 0
+        self.dropped = 0
+        self.errors = 0
+        self.task = None
+
+
+class CaptureBus:
+    def __init__(self, maxsize=QUEUE_SIZE):
+        self.maxsize = maxsize
+        self.subs = []
+        self.published = 0
+
+    def subscribe(self, sink, maxsize=None, policy=DROP_OLDEST):
+        self.subs.append(_Subscription(sink, maxsize or self.maxsize, policy))
+        return sink
+
+    async def start(self):
+        for sub in self.subs:
+            sub.task = asyncio.create_task(self._consume(sub))
+
+    def publish(self, frame):
+        """Entrega la trama a todos los sinks sin esperar a ninguno."""
+        self.published += 1
+        for sub in self.subs:
+            if sub.queue.full():
+                sub.dropped += 1
+                if sub.policy == DROP_NEWEST:
+                    continue
+                sub.queue.get_nowait()
+            sub.queue.put_nowait(frame)
+
+    async def _consume(self, sub):
+        threaded = getattr(sub.sink, "threaded", False)
+        while True:
+            frame = await sub.queue.get()
+            if frame is _STOP:
+                break
+            try:
+                if threaded:
+                    await asyncio.to_thread(sub.sink.handle, frame)
+                else:
+                    result = sub.sink.handle(frame)
+                    if inspect.isawaitable(result):
+                        await result
+                sub.handled += 1
+            except Exception as e:
+                sub.errors += 1
+                print(f"⚠️  sink {sub.name}: {e}")
+
+    async def close(self):
+        """Vacía las colas, para los consumidores y cierra los sinks."""
+        for sub in self.subs:
+            # La ingesta ya ha parado: aquí sí se espera a que haya sitio
+            await sub.queue.put(_STOP)
+        await asyncio.gather(*(sub.task for sub in self.subs if sub.task))
+        for sub in self.subs:
+            close = getattr(sub.sink, "close", None)
+            if close:
+                close()
+
+    def stats(self):
+        return {sub.name: {"handled": sub.handled, "dropped": sub.dropped,
+                           "errors": sub.errors, "queued": sub.queue.qsize()}
+                for sub in self.subs}
+
+
+# --- sinks ---
+
+class CsvSink:
+    """Añade las tramas nuevas al CSV de capturas (columnas = header)."""
+    name = "csv"
+    threaded = True
+
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+        try:
+            with open(path, "x", newline="") as f:
+                csv.writer(f).writerow(header)
+        except FileExistsError:
+            pass
+
+    def handle(self, frame):
+        if not frame.get("new", True):
+            return
+        with open(self.path, "a", newline="") as f:
+            csv.writer(f).writerow([frame[c] for c in self.header])
+
+
+class BinarySink:
+    """
+    Registros binarios de 37 bytes: epoch int64 + payload (8) + RAW168 (21),
+    es decir, el registro de frame_cache precedido del instante de captura.
+    """
+    name = "bin"
+    threaded = True
+    RECORD = struct.Struct("<q8s21s")
+
+    def __init__(self, path):
+        self.f = open(path, "ab")
+
+    def handle(self, frame):
+        if not frame.get("new", True):
+            return
+        self.f.write(self.RECORD.pack(int(frame["epoch"]), bytes.fromhex(frame["raw64"]),
+                                      bytes.fromhex(frame["raw168"])))
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class DedupSink:
+    """Índice RAW168 -> [repeticiones, primer epoch, último epoch]."""
+    name = "dedup"
+
+    def __init__(self):
+        self.index = {}
+
+    def handle(self, frame):
+        entry = self.index.get(frame["raw168"])
+        if entry is None:
+            self.index[frame["raw168"]] = [1, frame["epoch"], frame["epoch"]]
+        else:
+            entry[0] += 1
+            entry[2] = frame["epoch"]
+
+    def close(self):
+        if self.index:
+            total = sum(e[0] for e in self.index.values())
+            print(f"📇 dedup: {total} tramas, {len(self.index)} únicas "
+                  f"({total / len(self.index):.2f} repeticiones de media)")
+
+
+class OutlierSink:
+    """Moda online por (house, temp_idx, nib7): avisa de outliers al llegar."""
+    name = "outlier"
+
+    def __init__(self):
+        self.detector = OnlineModeDetector()
+
+    def handle(self, frame):
+        if frame["house_code"] is None or not frame.get("new", True):
+            return
+        cell = (frame["house_code"], temp_to_idx(frame["temp"]), frame["raw64"][7])
+        verdict = self.detector.add(cell, frame["checksum_hex"], frame["raw168"])
+        if verdict.outlier:
+            print(f"[outlier] EC40={frame['raw64']} chk={frame['checksum_hex']} "
+                  f"(moda {verdict.mode}, {verdict.mode_count}x)")
+
+
+class MPTableSink:
+    """
+    Tabla M/P en vivo por (house, temp_idx), con la misma regla que
+    prepare_data: las celdas con más de un (M, P) se descartan. Con
+    golden_master=True, al cerrar registra `source` (el CSV donde CsvSink
+    guarda las tramas) como fuente del golden master y lo reconstruye, así
+    los conflictos se miran contra todas las capturas y no solo contra las
+    de esta sesión.
+    """
+    name = "mp"
+
+    def __init__(self, golden_master=False, source=None):
+        if golden_master and source is None:
+            raise ValueError("golden_master necesita el CSV de las capturas (source)")
+        self.detector = OnlineModeDetector()
+        self.golden_master = golden_master
+        self.source = source
+
+    def handle(self, frame):
+        if frame["house_code"] is None:
+            return
+        r12 = int(frame["checksum_hex"], 16)
+        key = (frame["house_code"], temp_to_idx(frame["temp"]))
+        known = key in self.detector.cells
+        self.detector.add(key, ((r12 >> 4) & 0xF, r12 & 0xF))
+        if not known:
+            print(f"[mp] house {key[0]} temp {frame['temp']:.1f}: M={(r12 >> 4) & 0xF} P={r12 & 0xF}")
+
+    def table(self):
+        """Celdas sin conflicto en el formato de golden_master.csv."""
+        rows = []
+        for (house, temp_idx) in self.detector.cells:
+            if self.detector.conflicted((house, temp_idx)):
+                continue
+            (m, p), _ = self.detector.mode((house, temp_idx))
+            rows.append({"house": house, "temp_idx": temp_idx,
+                         "temp_c": (temp_idx / 10.0) - 40.0, "m": m, "p": p})
+        return rows
+
+    def close(self):
+        data = self.table()
+        print(f"📋 mp: {len(data)} celdas limpias, "
+              f"{self.detector.stats()['conflicted']} con conflicto")
+        if self.golden_master and data:
+            sys.path.insert(0, str(BASE_DIR / "04_universal_mp_analysis"))
+            from prepare_data import rebuild_golden_master
+            rebuild_golden_master([self.source])
+
+
+class AccuracySink:
+    """Compara cada trama con la que genera gen_tramas_thn132n."""
+    name = "accuracy"
+
+    def __init__(self):
+        from gen_tramas_thn132n import build_ec40_post
+        self.build = build_ec40_post
+        self.total = 0
+        self.exact = 0
+        self.r12_ok = 0
+
+    def handle(self, frame):
+        if frame["house_code"] is None or not frame.get("new", True):
+            return
+        payload = bytes.fromhex(frame["raw64"])
+        expected = self.build(frame["temp"], payload[2] >> 4, frame["house_code"])
+        self.total += 1
+        self.exact += payload == expected
+        # R12 = nibble bajo del byte 3 + byte 7
+        self.r12_ok += (payload[3] & 0x0F, payload[7]) == (expected[3] & 0x0F, expected[7])
+        if payload != expected:
+            print(f"[gen] {frame['temp']:.1f}°C house {frame['house_code']}: "
+                  f"recibido {payload.hex()} generado {expected.hex()}")
+
+    def close(self):
+        if self.total:
+            print(f"🎯 accuracy: {self.exact}/{self.total} tramas exactas "
+                  f"({100 * self.exact / self.total:.1f}%), R12 {100 * self.r12_ok / self.total:.1f}%")
+
+
+class CoverageSink:
+    """Temperaturas (temp_idx) vistas por house."""
+    name = "coverage"
+
+    def __init__(self):
+        self.cells = defaultdict(Counter)
+
+    def handle(self, frame):
+        if frame["house_code"] is not None:
+            self.cells[frame["house_code"]][temp_to_idx(frame["temp"])] += 1
+
+    def close(self):
+        for house in sorted(self.cells):
+            temps = self.cells[house]
+            lo, hi = min(temps), max(temps)
+            print(f"🗺️  coverage house {house:3d}: {len(temps)} temperaturas distintas "
+                  f"({lo / 10 - 40:.1f} .. {hi / 10 - 40:.1f} °C)")
+
@@ -1,10 +1,22 @@
 #!/usr/bin/env python3
-import subprocess
-import csv
+import argparse
+import asyncio
+import sys
 import time
 import re
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "02_table_analysis"))
+
+from check_os21 import check_batch, error_names, quarantine
+from capture_bus import (CaptureBus, CsvSink, BinarySink, DedupSink, OutlierSink,
+                         MPTableSink, AccuracySink, CoverageSink, QUEUE_SIZE)
 
 CSV_FILE = "ec40_live.csv"
+BIN_FILE = "ec40_live.bin"
+
+SINK_NAMES = ["csv", "bin", "dedup", "outlier", "mp", "accuracy", "coverage"]
+DEFAULT_SINKS = ["csv", "outlier"]
 
 CSV_HEADER = [
     "timestamp",
@@ -31,13 +43,6 @@ re_batt   = re.compile(r"Battery\s+:\s+(\d+)")
 
 seen = set()
 
-def ensure_csv():
-    try:
-        with open(CSV_FILE, "x", newline="") as f:
-            csv.writer(f).writerow(CSV_HEADER)
-    except FileExistsError:
-        pass
-
 def decode_ec40_fields(raw64):
     """
     Decodifica los campos EC40:
@@ -90,59 +95,108 @@ def parse_block(block):
     }
 
 
-def main():
-    ensure_csv()
+def make_sinks(names, golden_master=False):
+    factories = {
+        "csv": lambda: CsvSink(CSV_FILE, CSV_HEADER),
+        "bin": lambda: BinarySink(BIN_FILE),
+        "dedup": DedupSink,
+        "outlier": OutlierSink,
+        "mp": lambda: MPTableSink(golden_master, CSV_FILE),
+        "accuracy": AccuracySink,
+        "coverage": CoverageSink,
+    }
+    return [factories[name]() for name in names]
 
-    print("Escuchando rtl_433… (Ctrl+C para salir)\n")
 
-    p = subprocess.Popen(
-        ["rtl_433", "-R", "12"],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
+def ingest(bus, data):
+    """Checksum + dedup en línea; lo demás lo hacen los sinks del bus."""
+    key = data["raw168"]
+    code = int(check_batch([data["raw64"]])[0])
+
+    if code:
+        if key not in seen:
+            # Trama corrupta: a cuarentena, nunca al bus
+            seen.add(key)
+            quarantine([(data, code)], "logger_ec40", "raw64")
+            print(f"[cuarentena] EC40={data['raw64']} ({'+'.join(error_names(code))})")
+        return
+
+    data["new"] = key not in seen
+    data["timestamp"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    data["epoch"] = int(time.time())
+    seen.add(key)
+
+    if data["new"]:
+        print(f"[new] {data['model']}  {data['temp']}°C "
+              f"EC40={data['raw64']} "
+              f"type={data['sensor_type_hex']} roll={data['rolling_code_hex']} chk={data['checksum_hex']}")
+
+    # Nunca espera: un sink lento pierde tramas en su cola, la ingesta no
+    bus.publish(data)
+
+
+async def capture(bus):
+    p = await asyncio.create_subprocess_exec(
+        "rtl_433", "-R", "12",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
     )
 
     block = ""
     try:
-        for line in p.stdout:
+        async for raw in p.stdout:
+            line = raw.decode(errors="replace")
             block += line
 
             # Fin de bloque
             if line.strip() == "" or line.startswith("_ _"):
                 data = parse_block(block)
-
                 if data:
-                    key = data["raw168"]
-
-                    if key not in seen:
-                        seen.add(key)
-
-                        with open(CSV_FILE, "a", newline="") as f:
-                            writer = csv.writer(f)
-                            writer.writerow([
-                                time.strftime("%Y-%m-%d %H:%M:%S"),
-                                data["model"],
-                                data["raw168"],
-                                data["raw64"],
-                                data["temp"],
-                                data["channel"],
-                                data["house_code"],
-                                data["battery"],
-                                data["sensor_type_hex"],
-                                data["rolling_code_hex"],
-                                data["checksum_hex"],
-                            ])
-
-                        print(f"[new] {data['model']}  {data['temp']}°C "
-                              f"EC40={data['raw64']} "
-                              f"type={data['sensor_type_hex']} roll={data['rolling_code_hex']} chk={data['checksum_hex']}")
-
+                    ingest(bus, data)
                 block = ""
+    finally:
+        if p.returncode is None:
+            p.kill()
+            await p.wait()
+
+
+async def run(args):
+    bus = CaptureBus(args.queue_size)
+    for sink in make_sinks(args.sinks, args.golden_master):
+        bus.subscribe(sink)
+    await bus.start()
+    try:
+        await capture(bus)
+    finally:
+        await bus.close()
+        for name, s in bus.stats().items():
+            if s["dropped"] or s["errors"]:
+                print(f"⚠️  sink {name}: {s['dropped']} tramas descartadas, {s['errors']} errores")
 
+
+def main():
+    parser = argparse.ArgumentParser(description="Captura EC40 desde rtl_433")
+    parser.add_argument("--sinks", type=lambda s: s.split(","), default=DEFAULT_SINKS,
+                        help=f"Consumidores del bus, separados por comas: {','.join(SINK_NAMES)}")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE,
+                        help="Tramas en cola por sink antes de descartar")
+    parser.add_argument("--golden-master", action="store_true",
+                        help="Con los sinks csv y mp: registrar el CSV y reconstruir el golden master al salir")
+    args = parser.parse_args()
+
+    unknown = set(args.sinks) - set(SINK_NAMES)
+    if unknown:
+        parser.error(f"sinks desconocidos: {', '.join(sorted(unknown))}")
+    if args.golden_master and not {"csv", "mp"} <= set(args.sinks):
+        # El golden master se reconstruye desde el CSV: sin él las celdas se perderían
+        parser.error("--golden-master necesita los sinks csv y mp")
+
+    print("Escuchando rtl_433… (Ctrl+C para salir)\n")
+
+    try:
+        asyncio.run(run(args))
     except KeyboardInterrupt:
         print("\nSaliendo…")
-        p.kill()
 
 
 if __name__ == "__main__":
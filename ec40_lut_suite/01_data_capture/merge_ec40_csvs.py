@@ -1,7 +1,15 @@
 #!/usr/bin/env python3
 import glob
+import math
 import os
-import pandas as pd
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "02_table_analysis"))
+
+from check_os21 import check_batch, find_payload_column, quarantine
+# Sin pandas: mismo resultado con csv + NumPy (arranca mucho más rápido)
+from csv_table import read_csv, concat
 
 def main():
     # Buscar todos los CSV tipo ec40_capturas*.csv
@@ -14,34 +22,47 @@ def main():
     for f in files:
         print("  -", f)
 
-    dfs = []
+    tables = []
     for f in files:
         try:
-            df = pd.read_csv(f)
-            df["source_file"] = os.path.basename(f)
-            dfs.append(df)
+            table = read_csv(f)
+            table.set_column("source_file", [os.path.basename(f)] * len(table))
+            tables.append(table)
         except Exception as e:
             print(f"Error leyendo {f}: {e}")
 
-    if not dfs:
+    if not tables:
         print("No hay datos válidos.")
         return
 
-    all_df = pd.concat(dfs, ignore_index=True)
+    merged = concat(tables)
+
+    # Checksum OS21: las tramas corruptas van a cuarentena, no al merge
+    column = find_payload_column(merged.columns)
+    if column is None:
+        print("⚠️  Sin columna de payload: no se valida el checksum")
+    else:
+        errors = check_batch(["" if v is None else str(v) for v in merged.column(column)])
+        if errors.any():
+            records = merged.take(errors.nonzero()[0].tolist()).records()
+            bad = [({k: math.nan if v is None else v for k, v in row.items()}, int(e))
+                   for row, e in zip(records, errors[errors != 0])]
+            quarantine(bad, "merge_ec40_csvs", column)
+            print(f"🚧 {len(bad)} tramas con checksum incorrecto enviadas a cuarentena")
+        merged = merged.take((errors == 0).nonzero()[0].tolist())
 
     # Eliminar duplicados exactos (misma fila completa)
-    before = len(all_df)
-    all_df = all_df.drop_duplicates()
-    after = len(all_df)
+    before = len(merged)
+    merged = merged.drop_duplicates()
+    after = len(merged)
     print(f"Filas totales: {before}, tras eliminar duplicados: {after}")
 
     # Ordenar por timestamp si existe
-    if "timestamp" in all_df.columns:
-        all_df["timestamp"] = pd.to_datetime(all_df["timestamp"], errors="coerce")
-        all_df = all_df.sort_values("timestamp").reset_index(drop=True)
+    if "timestamp" in merged.columns:
+        merged = merged.sort_by_timestamp("timestamp")
 
     out_file = "ec40_capturas_merged.csv"
-    all_df.to_csv(out_file, index=False)
+    merged.write_csv(out_file)
     print(f"Fichero unificado guardado en: {out_file}")
 
 if __name__ == "__main__":
@@ -1,31 +1,49 @@
 #!/usr/bin/env python3
 import json
-import pandas as pd
+import math
+import sys
 from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Sin pandas: mismo resultado con csv + NumPy (arranca mucho más rápido)
+from csv_table import read_csv
 
 MERGED_FILE = "ec40_capturas_merged.csv"
 
 def main():
     try:
-        df = pd.read_csv(MERGED_FILE)
+        table = read_csv(MERGED_FILE)
     except Exception as e:
         print(f"Error leyendo {MERGED_FILE}: {e}")
         return
 
     required_cols = {"temperature_C", "R12"}
-    if not required_cols.issubset(df.columns):
+    if not required_cols.issubset(table.columns):
         print(f"Faltan columnas en {MERGED_FILE}. Necesito: {required_cols}")
         return
 
-    # Normalizar temperatura a pasos de 0.1 ºC
-    df["temp_0_1"] = df["temperature_C"].round(1)
+    # Normalizar temperatura a pasos de 0.1 ºC (mismo redondeo que pandas)
+    dtype = np.int64 if table.kinds["temperature_C"] == "int" else np.float64
+    temps = np.array([np.nan if t is None else t for t in table.column("temperature_C")], dtype=dtype)
+    temps = np.round(temps, 1).tolist()
+
+    # Agrupar R12 por temperatura (sin vacíos, en orden de aparición)
+    groups = {}
+    for temp, r12 in zip(temps, table.column("R12")):
+        if temp == temp:
+            # R12 vacío: NaN, como en pandas (mismo objeto para que Counter lo agrupe)
+            groups.setdefault(temp, []).append(math.nan if r12 is None else r12)
 
     lut = {}
     conflicts = []
 
-    for temp, group in df.groupby("temp_0_1"):
+    for temp in sorted(groups):
         # Contar ocurrencias de cada R12 para esta temperatura
-        c = Counter(group["R12"])
+        c = Counter(groups[temp])
         most_common = c.most_common()
 
         if len(most_common) == 0:
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice temporal de capturas EC40 y análisis de secuencias de rolling code.
+
+Carga las capturas con timestamp en arrays NumPy (epoch int64, house, canal,
+temperatura, nib7) ordenados por (house, timestamp). Cada house ocupa un
+bloque contiguo, así que:
+
+    - bloque de una house        -> 2 searchsorted sobre `house`
+    - ventana [t0, t1) de house  -> 2 searchsorted más sobre `ts` del bloque
+    - runs de nib7 (RLE)         -> np.diff sobre todo el archivo de una vez
+    - transiciones               -> runs consecutivos de la misma house
+
+nib7 es el nibble 7 del payload post-reflect (nibble bajo del byte 3, nibble
+alto de R12): se mantiene durante una sesión del sensor y cambia tras un
+cambio de pilas o reset. Los runs de menos de `min_run` tramas se consideran
+ruido (trama suelta de otra sesión) y no generan transición; un hueco de más
+de RESET_GAP_S segundos sin tramas antes del cambio indica un reset.
+
+Uso:
+    python3 capture_index.py                         # todo el archivo
+    python3 capture_index.py --house 247 --min-run 5
+    python3 capture_index.py --house 247 --from "2025-11-20 08:00:00" --to "2025-11-20 09:00:00"
+"""
+
+import argparse
+import csv
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+
+DEFAULT_CSV_FILES = [
+    BASE_DIR / "ec40_capturas_merged.csv",
+    BASE_DIR / "ec40_live.csv",
+]
+
+# Columnas según el formato de CSV (merged/normalizado o logger_ec40)
+PAYLOAD_COLUMNS = ["payload64_hex", "raw64", "ec40_hex"]
+HOUSE_COLUMNS = ["house", "house_code"]
+TEMP_COLUMNS = ["temperature_C", "temp"]
+
+MIN_RUN = 3
+# Sin tramas durante más de ~3 periodos (39-43 s): el sensor estuvo apagado
+RESET_GAP_S = 120
+
+Runs = namedtuple("Runs", ["house", "nib7", "start", "length", "t_start", "t_end"])
+Transition = namedtuple("Transition", ["house", "old", "new", "t_last", "t_first", "gap_s"])
+
+
+def to_epoch(timestamps):
+    """Strings 'YYYY-MM-DD HH:MM:SS' -> epoch int64 (-1 si no son válidos)."""
+    ts = np.asarray(timestamps, dtype=object)
+    try:
+        return ts.astype("datetime64[s]").astype(np.int64)
+    except ValueError:
+        out = np.full(len(ts), -1, dtype=np.int64)
+        for i, s in enumerate(ts):
+            try:
+                out[i] = np.datetime64(s, "s").astype(np.int64)
+            except ValueError:
+                pass
+        return out
+
+
+def format_epoch(t):
+    return str(np.datetime64(int(t), "s")).replace("T", " ")
+
+
+def _column(fieldnames, candidates):
+    return next((c for c in candidates if c in (fieldnames or [])), None)
+
+
+def read_captures(csv_file):
+    """Columnas crudas (listas) de un CSV de capturas; None si no tiene timestamp."""
+    with open(csv_file, "r") as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames
+        payload_col = _column(fields, PAYLOAD_COLUMNS)
+        house_col = _column(fields, HOUSE_COLUMNS)
+        temp_col = _column(fields, TEMP_COLUMNS)
+        if "timestamp" not in (fields or []) or not payload_col or not house_col:
+            return None
+        cols = {"timestamp": [], "payload": [], "house": [], "channel": [], "temp": []}
+        for row in reader:
+            payload = (row[payload_col] or "").strip()
+            if len(payload) != 16 or not (row[house_col] or "").isdigit():
+                continue
+            cols["timestamp"].append(row["timestamp"])
+            cols["payload"].append(payload)
+            cols["house"].append(int(row[house_col]))
+            cols["channel"].append(int(row.get("channel") or 0))
+            cols["temp"].append(float(row[temp_col]) if temp_col and row[temp_col] else np.nan)
+    return cols
+
+
+class CaptureIndex:
+    """Capturas ordenadas por (house, ts); todas las consultas son por slices."""
+
+    def __init__(self, ts, house, channel, temp, payload):
+        ts = np.asarray(ts, dtype=np.int64)
+        valid = ts >= 0
+        order = np.lexsort((ts[valid], np.asarray(house)[valid]))
+        pick = np.flatnonzero(valid)[order]
+
+        self.ts = ts[pick]
+        self.house = np.asarray(house, dtype=np.int32)[pick]
+        self.channel = np.asarray(channel, dtype=np.int8)[pick]
+        self.temp = np.asarray(temp, dtype=np.float64)[pick]
+        self.payload = np.asarray(payload, dtype="U16")[pick]
+        # nib7 = carácter 7 del hex, sin pasar por int() fila a fila
+        codes = self.payload.view(np.uint32).reshape(-1, 16)[:, 7] if len(pick) else np.zeros(0, np.uint32)
+        self.nib7 = np.where(codes >= ord("a"), codes - ord("a") + 10,
+                             np.where(codes >= ord("A"), codes - ord("A") + 10, codes - ord("0"))).astype(np.uint8)
+
+    @classmethod
+    def from_csv(cls, csv_files=DEFAULT_CSV_FILES):
+        cols = {"timestamp": [], "payload": [], "house": [], "channel": [], "temp": []}
+        for csv_file in csv_files:
+            if not Path(csv_file).exists():
+                continue
+            part = read_captures(csv_file)
+            if part is None:
+                continue
+            for k in cols:
+                cols[k].extend(part[k])
+        return cls(to_epoch(cols["timestamp"]), cols["house"], cols["channel"],
+                   cols["temp"], cols["payload"])
+
+    def __len__(self):
+        return len(self.ts)
+
+    def houses(self):
+        return np.unique(self.house)
+
+    # --- consultas O(log n) ---
+
+    def bounds(self, house):
+        """(lo, hi) del bloque de la house."""
+        lo = int(np.searchsorted(self.house, house, side="left"))
+        hi = int(np.searchsorted(self.house, house, side="right"))
+        return lo, hi
+
+    def window(self, house, t0=None, t1=None):
+        """slice de las tramas de `house` con t0 <= ts < t1 (epoch o string)."""
+        lo, hi = self.bounds(house)
+        block = self.ts[lo:hi]
+        if t0 is not None:
+            t0 = to_epoch([t0])[0] if isinstance(t0, str) else t0
+            lo_w = lo + int(np.searchsorted(block, t0, side="left"))
+        else:
+            lo_w = lo
+        if t1 is not None:
+            t1 = to_epoch([t1])[0] if isinstance(t1, str) else t1
+            hi_w = lo + int(np.searchsorted(block, t1, side="left"))
+        else:
+            hi_w = hi
+        return slice(lo_w, max(lo_w, hi_w))
+
+    # --- secuencias de nib7 ---
+
+    def runs(self, sl=slice(None)):
+        """RLE de nib7 (cortando también en cada cambio de house)."""
+        house, nib7, ts = self.house[sl], self.nib7[sl], self.ts[sl]
+        offset = sl.start or 0
+        if not len(ts):
+            empty = np.zeros(0, dtype=np.int64)
+            return Runs(empty, empty, empty, empty, empty, empty)
+        cut = np.flatnonzero((np.diff(nib7) != 0) | (np.diff(house) != 0)) + 1
+        start = np.concatenate(([0], cut))
+        end = np.concatenate((cut, [len(ts)]))
+        return Runs(house[start], nib7[start], start + offset, end - start, ts[start], ts[end - 1])
+
+    def transitions(self, min_run=MIN_RUN, sl=slice(None)):
+        """
+        Cambios de rolling code en una pasada sobre todo el archivo (o un slice).
+        Se descartan los runs cortos y se fusionan los runs vecinos que quedan
+        con el mismo nib7 antes de comparar.
+        """
+        r = self.runs(sl)
+        keep = r.length >= min_run
+        house, nib7 = r.house[keep], r.nib7[keep]
+        t_start, t_end = r.t_start[keep], r.t_end[keep]
+        if not len(house):
+            return []
+
+        # Fusionar: nueva sesión donde cambia house o nib7 entre runs conservados
+        first = np.concatenate(([True], (np.diff(nib7) != 0) | (np.diff(house) != 0)))
+        seg = np.cumsum(first) - 1
+        s_house, s_nib7 = house[first], nib7[first]
+        s_start = t_start[first]
+        s_end = np.zeros(len(s_house), dtype=np.int64)
+        np.maximum.at(s_end, seg, t_end)
+
+        same = s_house[1:] == s_house[:-1]
+        idx = np.flatnonzero(same)
+        return [Transition(int(s_house[i + 1]), int(s_nib7[i]), int(s_nib7[i + 1]),
+                           int(s_end[i]), int(s_start[i + 1]), int(s_start[i + 1] - s_end[i]))
+                for i in idx]
+
+
+def print_runs(index, house, sl, min_run):
+    r = index.runs(sl)
+    print(f"\n🏠 House {house} (0x{house:X}): {sl.stop - sl.start} tramas, {len(r.house)} runs de nib7")
+    for n, l, a, b in zip(r.nib7, r.length, r.t_start, r.t_end):
+        mark = "" if l >= min_run else "  (ruido)"
+        print(f"   nib7={n:X}  {l:5d} tramas  {format_epoch(a)} → {format_epoch(b)}{mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice temporal de capturas y transiciones de rolling code")
+    parser.add_argument("csv", nargs="*", help="CSVs de capturas (por defecto merged + live)")
+    parser.add_argument("--house", type=int, help="Mostrar los runs de una house")
+    parser.add_argument("--from", dest="t0", help="Inicio de la ventana (YYYY-MM-DD HH:MM:SS)")
+    parser.add_argument("--to", dest="t1", help="Fin de la ventana (exclusivo)")
+    parser.add_argument("--min-run", type=int, default=MIN_RUN, help="Tramas mínimas de un run válido")
+    args = parser.parse_args()
+
+    files = [Path(p) for p in args.csv] or DEFAULT_CSV_FILES
+    t0 = time.perf_counter()
+    index = CaptureIndex.from_csv(files)
+    print(f"📊 {len(index)} tramas de {len(index.houses())} houses indexadas "
+          f"en {(time.perf_counter() - t0)*1000:.1f} ms")
+
+    if args.house is not None:
+        sl = index.window(args.house, args.t0, args.t1)
+        print_runs(index, args.house, sl, args.min_run)
+        events = index.transitions(args.min_run, sl)
+    else:
+        events = index.transitions(args.min_run)
+
+    print(f"\n🔄 Transiciones de rolling code (runs >= {args.min_run} tramas): {len(events)}")
+    for e in events:
+        kind = "⚡ reset / cambio de pilas" if e.gap_s > RESET_GAP_S else "cambio sin hueco"
+        print(f"   House {e.house:3d}: nib7 {e.old:X} → {e.new:X}  {format_epoch(e.t_last)} → "
+              f"{format_epoch(e.t_first)}  (hueco {e.gap_s} s, {kind})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Validación vectorizada del checksum OS21 de payloads EC40 y cuarentena.
+
+El byte 6 del payload post-reflect es la suma de los nibbles de los bytes
+0..5 con los nibbles intercambiados (gen_tramas_thn132n.calc_os21_checksum).
+Sobre el hex de 16 caracteres equivale a: suma de los nibbles 0..11,
+nibble 12 = parte baja (R1) y nibble 13 = parte alta (M).
+
+Se comprueba todo un lote a la vez con NumPy. Las tramas que no pasan se
+apartan a un fichero de cuarentena (CSV) en lugar de llegar a los
+generadores de LUT; lo usan logger_ec40, merge_ec40_csvs y
+normalize_all_csvs.
+
+Uso:
+    python3 check_os21.py                        # valida todas las capturas archivadas
+    python3 check_os21.py ../ec40_live.csv --quarantine
+"""
+
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+
+QUARANTINE_FILE = BASE_DIR / "ec40_quarantine.csv"
+QUARANTINE_HEADER = ["quarantined_at", "source", "reason", "payload", "row"]
+
+PAYLOAD_LEN_BYTES = 8
+EC40_ID = (0xEC, 0x40)
+
+# Columnas de payload según el formato de CSV
+PAYLOAD_COLUMNS = ["payload64_hex", "raw64", "ec40_hex"]
+
+DEFAULT_CSV_FILES = [
+    BASE_DIR / "ec40_capturas_merged.csv",
+    BASE_DIR / "ec40_live.csv",
+    BASE_DIR / "ec40_all_captures_normalized.csv",
+    BASE_DIR / "01_data_capture" / "tramas_thn132n.csv",
+]
+
+# Códigos de error (se pueden combinar)
+ERR_FORMAT = 0x1
+ERR_ID = 0x2
+ERR_CHECKSUM = 0x4
+
+ERROR_NAMES = {
+    ERR_FORMAT: "formato",
+    ERR_ID: "id",
+    ERR_CHECKSUM: "checksum",
+}
+
+
+def error_names(code):
+    return [name for bit, name in ERROR_NAMES.items() if code & bit] or ["ok"]
+
+
+def payloads_to_array(payloads):
+    """
+    Secuencia de payloads (hex de 16 caracteres o 8 bytes) -> array N x 8.
+    Devuelve (array, máscara de formato incorrecto).
+    """
+    n = len(payloads)
+    out = np.zeros((n, PAYLOAD_LEN_BYTES), dtype=np.uint8)
+    bad = np.zeros(n, dtype=bool)
+    for i, p in enumerate(payloads):
+        try:
+            b = bytes.fromhex(p.strip()) if isinstance(p, str) else bytes(p)
+        except (ValueError, AttributeError, TypeError):
+            b = b""
+        if len(b) != PAYLOAD_LEN_BYTES:
+            bad[i] = True
+            continue
+        out[i] = np.frombuffer(b, dtype=np.uint8)
+    return out, bad
+
+
+def check_batch(payloads):
+    """
+    Valida un lote de payloads EC40 post-reflect.
+
+    Args:
+        payloads: array (N, 8) uint8, o secuencia de strings hex / bytes
+
+    Returns:
+        array (N,) de códigos de error (0 = OK)
+    """
+    if isinstance(payloads, np.ndarray):
+        arr = payloads.astype(np.uint8, copy=False).reshape(-1, PAYLOAD_LEN_BYTES)
+        bad_fmt = np.zeros(len(arr), dtype=bool)
+    else:
+        arr, bad_fmt = payloads_to_array(payloads)
+
+    errors = np.where(bad_fmt, ERR_FORMAT, 0).astype(np.uint8)
+
+    bad_id = ((arr[:, 0] != EC40_ID[0]) | (arr[:, 1] != EC40_ID[1])) & ~bad_fmt
+    errors |= np.where(bad_id, ERR_ID, 0).astype(np.uint8)
+
+    # Suma de nibbles de los bytes 0..5, con los nibbles intercambiados
+    body = arr[:, :6].astype(np.uint16)
+    s = ((body >> 4) + (body & 0x0F)).sum(axis=1) & 0xFF
+    expected = ((s & 0x0F) << 4) | (s >> 4)
+    bad_chk = (arr[:, 6] != expected) & ~bad_fmt
+    errors |= np.where(bad_chk, ERR_CHECKSUM, 0).astype(np.uint8)
+
+    return errors
+
+
+def is_valid(payload):
+    """Validación de una sola trama (ingesta en vivo)."""
+    return check_batch([payload])[0] == 0
+
+
+def find_payload_column(fieldnames):
+    return next((c for c in PAYLOAD_COLUMNS if c in (fieldnames or [])), None)
+
+
+def split_rows(rows, column):
+    """
+    Separa filas (dicts) según el checksum del payload de `column`.
+    Devuelve (válidas, [(fila, código de error)]).
+    """
+    errors = check_batch([row.get(column) or "" for row in rows])
+    good = [row for row, e in zip(rows, errors) if e == 0]
+    bad = [(row, int(e)) for row, e in zip(rows, errors) if e != 0]
+    return good, bad
+
+
+def quarantine(bad, source, column, path=QUARANTINE_FILE):
+    """Añade las filas rechazadas al CSV de cuarentena."""
+    if not bad:
+        return 0
+    path = Path(path)
+    new = not path.exists()
+    now = time.strftime("%Y-%m-%d %H:%M:%S")
+    with open(path, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new:
+            writer.writerow(QUARANTINE_HEADER)
+        for row, code in bad:
+            writer.writerow([now, source, "+".join(error_names(code)), row.get(column, ""),
+                             json.dumps(row, default=str)])
+    return len(bad)
+
+
+def validate_file(csv_file, write_quarantine=False):
+    with open(csv_file, "r") as f:
+        reader = csv.DictReader(f)
+        column = find_payload_column(reader.fieldnames)
+        rows = list(reader)
+    if column is None:
+        print(f"⚠️  {csv_file.name}: sin columna de payload reconocida")
+        return
+
+    t0 = time.perf_counter()
+    errors = check_batch([row[column] or "" for row in rows])
+    elapsed = time.perf_counter() - t0
+
+    print(f"📊 {csv_file.name}: {len(rows)} tramas en {elapsed*1000:.1f} ms")
+    print(f"   Checksum OK: {int(np.count_nonzero(errors == 0))}")
+    for bit, name in ERROR_NAMES.items():
+        count = int(np.count_nonzero(errors & bit))
+        if count:
+            print(f"   Error {name}: {count}")
+
+    if write_quarantine:
+        bad = [(row, int(e)) for row, e in zip(rows, errors) if e]
+        n = quarantine(bad, csv_file.name, column)
+        if n:
+            print(f"   🚧 {n} tramas enviadas a {QUARANTINE_FILE.name}")
+
+
+def main():
+    args = sys.argv[1:]
+    write_quarantine = "--quarantine" in args
+    files = [Path(p) for p in args if not p.startswith("--")] or DEFAULT_CSV_FILES
+    for csv_file in files:
+        if not csv_file.exists():
+            print(f"⚠️  Saltando {csv_file} (no existe)")
+            continue
+        validate_file(csv_file, write_quarantine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tabla CSV mínima sin pandas para los pipelines de merge y LUT.
+
+Reproduce lo que usaban merge_ec40_csvs y build_r12_lut de pandas
+(read_csv, concat, drop_duplicates, sort por timestamp, to_csv) con el
+módulo csv y NumPy, de modo que los ficheros generados son idénticos:
+
+    - inferencia de tipo por columna y fichero: int, float, bool o texto;
+      una columna int con vacíos pasa a float ("3" -> "3.0"), como en pandas
+    - concat: unión de columnas en orden de aparición, vacíos donde falten
+    - fechas: formato deducido del primer valor (como to_datetime) y NaT en
+      las filas que no lo siguen; orden con el mismo argsort y NaT al final
+    - floats escritos con repr(), vacíos como "", saltos de línea "\\n"
+
+Arranca en milisegundos y ocupa una fracción de la memoria de un DataFrame,
+así que sirve en el host de captura donde pandas es lento de instalar.
+"""
+
+import csv
+import math
+import re
+from datetime import datetime
+
+import numpy as np
+
+# Valores que pandas.read_csv lee como NaN por defecto
+NA_VALUES = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+    "n/a", "nan", "null",
+}
+
+BOOL_VALUES = {"True": True, "TRUE": True, "true": True,
+               "False": False, "FALSE": False, "false": False}
+
+# Formatos que se prueban con el primer timestamp, en el orden de pandas
+# (mes antes que día). Los ISO se validan con regex y se leen con fromisoformat.
+DATE_FORMATS = [
+    "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M",
+    "%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M",
+    "%Y-%m-%d",
+    "%m/%d/%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S", "%m/%d/%Y", "%d/%m/%Y",
+]
+_ISO_FIELDS = {"%Y": r"\d{4}", "%m": r"\d{2}", "%d": r"\d{2}", "%H": r"\d{2}",
+               "%M": r"\d{2}", "%S": r"\d{2}", "%f": r"\d{1,6}"}
+
+
+def _parse_column(raw):
+    """Lista de strings -> (tipo, valores) con None para los vacíos."""
+    values = [None if v is None or v in NA_VALUES else v for v in raw]
+    present = [v for v in values if v is not None]
+    if not present:
+        return "float", [None] * len(values)
+    for kind, conv in (("int", int), ("float", float), ("bool", BOOL_VALUES.__getitem__)):
+        if kind != "bool" and any("_" in v for v in present):
+            continue            # int("1_0") es válido en Python, no en pandas
+        try:
+            parsed = [None if v is None else conv(v) for v in values]
+        except (ValueError, KeyError):
+            continue
+        if kind == "int" and len(present) < len(values):
+            return "float", [None if v is None else float(v) for v in parsed]
+        return kind, parsed
+    return "str", values
+
+
+def _combine_kinds(kinds):
+    if kinds <= {"int"}:
+        return "int"
+    if kinds <= {"int", "float"}:
+        return "float"
+    return "str"
+
+
+class Table:
+    def __init__(self, columns, kinds, data):
+        self.columns = list(columns)
+        self.kinds = dict(kinds)
+        self.data = data            # columna -> lista de valores (None = NaN)
+
+    def __len__(self):
+        return len(self.data[self.columns[0]]) if self.columns else 0
+
+    def column(self, name):
+        return self.data[name]
+
+    def set_column(self, name, values, kind="str"):
+        if name not in self.data:
+            self.columns.append(name)
+        self.data[name] = list(values)
+        self.kinds[name] = kind
+
+    def take(self, indices):
+        return Table(self.columns, self.kinds,
+                     {c: [col[i] for i in indices] for c, col in self.data.items()})
+
+    def records(self):
+        return [dict(zip(self.columns, row)) for row in zip(*(self.data[c] for c in self.columns))]
+
+    def drop_duplicates(self):
+        """Elimina filas completas repetidas (se queda la primera)."""
+        seen = set()
+        keep = []
+        for i, row in enumerate(zip(*(self.data[c] for c in self.columns))):
+            if row not in seen:
+                seen.add(row)
+                keep.append(i)
+        return self.take(keep)
+
+    def sort_by_timestamp(self, name="timestamp"):
+        """Convierte `name` a datetime (inválidos -> NaT) y ordena como sort_values."""
+        stamps = to_datetime(self.data[name])
+        self.set_column(name, stamps, "datetime")
+        valid = np.array([s is not None for s in stamps], dtype=bool)
+        # datetime64 y no int64: NumPy ordena int64 con otra implementación
+        # (SIMD) y los empates saldrían en otro orden que en pandas
+        keys = np.array([_epoch_us(s) for s in stamps if s is not None], dtype=np.int64)
+        order = np.flatnonzero(valid)[keys.astype("datetime64[us]").argsort(kind="quicksort")]
+        return self.take(np.concatenate([order, np.flatnonzero(~valid)]).tolist())
+
+    def write_csv(self, path):
+        formatters = {c: _formatter(self.kinds[c], self.data[c]) for c in self.columns}
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(self.columns)
+            for row in zip(*(self.data[c] for c in self.columns)):
+                writer.writerow([formatters[c](v) for c, v in zip(self.columns, row)])
+
+
+def read_csv(path):
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = [r + [None] * (len(header) - len(r)) for r in reader if r]
+    kinds, data = {}, {}
+    for i, name in enumerate(header):
+        kinds[name], data[name] = _parse_column([r[i] for r in rows])
+    return Table(header, kinds, data)
+
+
+def concat(tables):
+    columns = []
+    for t in tables:
+        columns += [c for c in t.columns if c not in columns]
+    kinds, data = {}, {}
+    for c in columns:
+        # Una columna ausente en un fichero son NaN (float), como en pandas
+        kinds[c] = _combine_kinds({t.kinds[c] if c in t.data else "float" for t in tables})
+        values = []
+        for t in tables:
+            values += t.data[c] if c in t.data else [None] * len(t)
+        if kinds[c] == "float":
+            values = [None if v is None else float(v) for v in values]
+        data[c] = values
+    return Table(columns, kinds, data)
+
+
+# --- fechas y formato ---
+
+def _iso_parser(fmt):
+    pattern = re.compile(re.sub(r"%[YmdHMSf]", lambda m: _ISO_FIELDS[m.group()], fmt))
+
+    def parse(text):
+        return datetime.fromisoformat(text) if pattern.fullmatch(text) else None
+    return parse
+
+
+def _strptime_parser(fmt):
+    def parse(text):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            return None
+    return parse
+
+
+def _guess_parser(text):
+    """Parser estricto del primer formato de DATE_FORMATS que encaja con `text`."""
+    for fmt in DATE_FORMATS:
+        parse = _iso_parser(fmt) if fmt.startswith("%Y-") else _strptime_parser(fmt)
+        if parse(text) is not None:
+            return parse
+    return None
+
+
+def _parse_any(text):
+    try:
+        return datetime.fromisoformat(text.strip())
+    except ValueError:
+        return None
+
+
+def to_datetime(values):
+    """
+    Como pd.to_datetime(errors="coerce"): el formato se deduce del primer
+    valor no vacío y las filas con otro formato ("...09.5", "2025-11-20")
+    pasan a NaT (None). Si el primero no encaja en ningún formato, cada
+    valor se interpreta por separado.
+    """
+    texts = [None if v is None else str(v).lstrip() for v in values]
+    first = next((t for t in texts if t is not None), None)
+    parse = (_guess_parser(first) if first is not None else None) or _parse_any
+    return [None if t is None else parse(t) for t in texts]
+
+
+def _epoch_us(dt):
+    return (dt.toordinal() * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second) * 10**6 + dt.microsecond
+
+
+def _formatter(kind, values):
+    if kind == "datetime":
+        stamps = [v for v in values if v is not None]
+        if stamps and all(v.hour == v.minute == v.second == v.microsecond == 0 for v in stamps):
+            fmt = "%Y-%m-%d"
+        elif any(v.microsecond % 1000 for v in stamps):
+            fmt = "%Y-%m-%d %H:%M:%S.%f"
+        elif any(v.microsecond for v in stamps):
+            # Como pandas: milisegundos si ningún valor necesita más precisión
+            return lambda v: "" if v is None else v.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        else:
+            fmt = "%Y-%m-%d %H:%M:%S"
+        return lambda v: "" if v is None else v.strftime(fmt)
+    return _format_value
+
+
+def _format_value(v):
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return ""
+    if isinstance(v, float):
+        return repr(v)
+    return str(v)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Decodificador vectorizado RAW168 (Manchester/OOK) -> payload EC40 post-reflect.
+
+Inverso de gen_tramas_thn132n.build_raw_from_ec40_post, sobre un lote entero
+de tramas con NumPy:
+    1. comprobación de longitud (21 bytes) y de KNOWN_PREAMBLE (hasta el ID)
+    2. validez Manchester de cada par de bits (10 / 01)
+    3. bits LSB-first -> byte, reflejo de nibbles -> payload de 8 bytes
+
+Cada trama devuelve un código de error (máscara de bits, 0 = OK).
+
+Uso:
+    python3 decode_raw168.py                  # valida todas las capturas archivadas
+    python3 decode_raw168.py ../ec40_live.csv
+"""
+
+import csv
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+
+KNOWN_PREAMBLE = "555555559995a5a6aa6a"
+
+RAW_LEN_BYTES = 21
+HEADER_LEN_BYTES = 5
+PAYLOAD_LEN_BYTES = 8
+
+# Códigos de error (se pueden combinar)
+ERR_LENGTH = 0x1
+ERR_PREAMBLE = 0x2
+ERR_MANCHESTER = 0x4
+
+ERROR_NAMES = {
+    ERR_LENGTH: "longitud",
+    ERR_PREAMBLE: "preámbulo",
+    ERR_MANCHESTER: "manchester",
+}
+
+# (raw, payload) por formato de CSV
+CSV_COLUMNS = [
+    ("raw168_hex", "payload64_hex"),
+    ("raw168", "raw64"),
+    ("raw_hex", "ec40_hex"),
+]
+
+DEFAULT_CSV_FILES = [
+    BASE_DIR / "ec40_capturas_merged.csv",
+    BASE_DIR / "ec40_live.csv",
+    BASE_DIR / "01_data_capture" / "tramas_thn132n.csv",
+]
+
+DecodeResult = namedtuple("DecodeResult", ["payloads", "errors", "manchester_errors", "length_errors"])
+
+# El último byte de KNOWN_PREAMBLE ya codifica el canal (1): solo se exige
+# preámbulo + sync + ID EC40 para aceptar tramas de cualquier canal
+_PREAMBLE = np.frombuffer(bytes.fromhex(KNOWN_PREAMBLE), dtype=np.uint8)[:9]
+
+
+def error_names(code):
+    return [name for bit, name in ERROR_NAMES.items() if code & bit] or ["ok"]
+
+
+def raw_to_array(raws):
+    """
+    Convierte una secuencia de RAW168 (hex o bytes) en un array N x 21.
+    Devuelve (array, máscara de longitud incorrecta).
+    """
+    n = len(raws)
+    out = np.zeros((n, RAW_LEN_BYTES), dtype=np.uint8)
+    bad_len = np.zeros(n, dtype=bool)
+    for i, raw in enumerate(raws):
+        try:
+            b = bytes.fromhex(raw) if isinstance(raw, str) else bytes(raw)
+        except ValueError:
+            b = b""
+        if len(b) != RAW_LEN_BYTES:
+            bad_len[i] = True
+            continue
+        out[i] = np.frombuffer(b, dtype=np.uint8)
+    return out, bad_len
+
+
+def decode_batch(raws):
+    """
+    Decodifica un lote de tramas RAW168.
+
+    Args:
+        raws: array (N, 21) uint8, o secuencia de strings hex / bytes
+
+    Returns:
+        DecodeResult(payloads (N, 8) uint8, errors (N,) códigos,
+                     manchester_errors (N,) pares inválidos por trama,
+                     length_errors (N,) bool, longitud distinta de 21 bytes)
+
+    Las tramas con longitud incorrecta no se decodifican: su payload queda a
+    cero y sus manchester_errors a 0, se cuentan solo en length_errors.
+    """
+    if isinstance(raws, np.ndarray):
+        arr = raws.astype(np.uint8, copy=False).reshape(-1, RAW_LEN_BYTES)
+        bad_len = np.zeros(len(arr), dtype=bool)
+    else:
+        arr, bad_len = raw_to_array(raws)
+    if not len(arr):
+        return DecodeResult(np.zeros((0, PAYLOAD_LEN_BYTES), dtype=np.uint8), np.zeros(0, dtype=np.uint8),
+                            np.zeros(0, dtype=np.int64), bad_len)
+
+    errors = np.where(bad_len, ERR_LENGTH, 0).astype(np.uint8)
+
+    # 1. Preámbulo + sync + ID EC40
+    bad_pre = np.any(arr[:, :len(_PREAMBLE)] != _PREAMBLE, axis=1) & ~bad_len
+    errors |= np.where(bad_pre, ERR_PREAMBLE, 0).astype(np.uint8)
+
+    # 2. Pares Manchester: 0 -> 10, 1 -> 01 (el bit es el segundo del par)
+    mc = np.unpackbits(arr[:, HEADER_LEN_BYTES:], axis=1).reshape(len(arr), -1, 2)
+    invalid = mc[:, :, 0] == mc[:, :, 1]
+    manchester_errors = np.where(bad_len, 0, np.count_nonzero(invalid, axis=1))
+    errors |= np.where(manchester_errors > 0, ERR_MANCHESTER, 0).astype(np.uint8)
+
+    # 3. Bits LSB-first -> byte pre-reflect -> reflejo de nibbles
+    data_bits = mc[:, :, 1].reshape(len(arr), PAYLOAD_LEN_BYTES, 8)
+    pre = np.packbits(data_bits, axis=2, bitorder="little").reshape(len(arr), PAYLOAD_LEN_BYTES)
+    payloads = ((pre << 4) | (pre >> 4)).astype(np.uint8)
+    payloads[bad_len] = 0
+
+    return DecodeResult(payloads, errors, manchester_errors, bad_len)
+
+
+def payloads_to_hex(payloads):
+    return [bytes(row).hex() for row in payloads]
+
+
+def load_raw_payload_pairs(csv_file):
+    """Lee (raw168, payload) de un CSV con cualquiera de los formatos conocidos."""
+    with open(csv_file, "r") as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames or []
+        cols = next(((r, p) for r, p in CSV_COLUMNS if r in fields and p in fields), None)
+        if cols is None:
+            return [], []
+        raws, payloads = [], []
+        for row in reader:
+            if row[cols[0]] and row[cols[1]]:
+                raws.append(row[cols[0]].strip())
+                payloads.append(row[cols[1]].strip().lower())
+    return raws, payloads
+
+
+def validate_file(csv_file):
+    raws, expected = load_raw_payload_pairs(csv_file)
+    if not raws:
+        print(f"⚠️  {csv_file.name}: sin columnas RAW/payload reconocidas")
+        return
+
+    t0 = time.perf_counter()
+    result = decode_batch(raws)
+    decoded = payloads_to_hex(result.payloads)
+    elapsed = time.perf_counter() - t0
+
+    ok = result.errors == 0
+    mismatch = [i for i in np.flatnonzero(ok) if decoded[i] != expected[i]]
+
+    print(f"📊 {csv_file.name}: {len(raws)} tramas en {elapsed*1000:.1f} ms")
+    print(f"   Decodificadas OK: {int(ok.sum())}")
+    for bit, name in ERROR_NAMES.items():
+        count = int(np.count_nonzero(result.errors & bit))
+        if count:
+            print(f"   Error {name}: {count}")
+    if result.manchester_errors.any():
+        print(f"   Pares Manchester inválidos: {int(result.manchester_errors.sum())}")
+    print(f"   Payload inconsistente con el RAW: {len(mismatch)}")
+    for i in mismatch[:5]:
+        print(f"     fila {i}: raw→{decoded[i]}  csv={expected[i]}")
+
+
+def main():
+    files = [Path(p) for p in sys.argv[1:]] or DEFAULT_CSV_FILES
+    for csv_file in files:
+        if not csv_file.exists():
+            print(f"⚠️  Saltando {csv_file} (no existe)")
+            continue
+        validate_file(csv_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -60,6 +60,7 @@ def bits_to_hex(bits):
 
 BASE_BITS = hex_to_bits(BASE_RAW_HEX)
 HEADER_BITS = BASE_BITS[:40]  # preámbulo+sync
+HEADER_BYTES = bytes.fromhex(BASE_RAW_HEX[:10])  # los mismos 40 bits empaquetados
 
 # ---------- temperatura → e,d,R12 ----------
 
@@ -115,6 +116,10 @@ def reflect_nibbles(buf: bytes) -> bytes:
 
 # ---------- EC40 post-reflect ----------
 
+# Canal lógico (el que muestra rtl_433) -> nibble de canal del payload
+# (g_channel en el firmware, una máscara de bits)
+CHANNEL_CODES = {1: 1, 2: 2, 3: 4}
+
 def build_ec40_post(temp_c: float,
                     channel: int = 1,
                     device_id: int = 247) -> bytes:
@@ -139,23 +144,59 @@ def build_ec40_post(temp_c: float,
 
 # ---------- Manchester + RAW ----------
 
+def _manchester_word(byte_post: int) -> int:
+    """
+    16 bits Manchester de un byte EC40 post-reflect:
+    reflejo de nibbles, bits LSB-first y cada bit 0 -> 10, 1 -> 01.
+    """
+    pre = ((byte_post & 0x0F) << 4) | (byte_post >> 4)
+    word = 0
+    for j in range(8):
+        word = (word << 2) | (0b01 if (pre >> j) & 1 else 0b10)
+    return word
+
+# byte post-reflect -> 2 bytes Manchester (reflejo de nibbles ya incluido)
+MANCHESTER_LUT = [_manchester_word(b) for b in range(256)]
+MANCHESTER_LUT_BYTES = [w.to_bytes(2, "big") for w in MANCHESTER_LUT]
+
+RAW_LEN_BYTES = len(HEADER_BYTES) + 2 * 8  # 21 bytes = 168 bits
+
+def build_raw_bytes_from_ec40_post(ec40_post: bytes) -> bytes:
+    return HEADER_BYTES + b"".join([MANCHESTER_LUT_BYTES[b] for b in ec40_post])
+
 def build_raw_from_ec40_post(ec40_post: bytes) -> str:
-    ec40_pre = reflect_nibbles(ec40_post)
-
-    data_bits = []
-    for byte in ec40_pre:
-        for j in range(8):
-            data_bits.append((byte >> j) & 1)  # LSB-first
-
-    mc_bits = []
-    for bit in data_bits:
-        if bit == 0:
-            mc_bits.extend([1, 0])
-        else:
-            mc_bits.extend([0, 1])
-
-    all_bits = HEADER_BITS + mc_bits
-    return bits_to_hex(all_bits)
+    return build_raw_bytes_from_ec40_post(ec40_post).hex().upper()
+
+_MANCHESTER_LUT_NP = None
+
+def _manchester_lut_array():
+    """MANCHESTER_LUT como array (256, 2) uint8; se crea una vez (NumPy es opcional)."""
+    global _MANCHESTER_LUT_NP
+    if _MANCHESTER_LUT_NP is None:
+        import numpy as np
+        _MANCHESTER_LUT_NP = np.array([[w >> 8, w & 0xFF] for w in MANCHESTER_LUT], dtype=np.uint8)
+    return _MANCHESTER_LUT_NP
+
+def build_raw_batch(payloads):
+    """
+    Codifica N payloads EC40 post-reflect (N x 8 bytes) en un array
+    NumPy uint8 de N x 21 bytes (168 bits RAW por fila).
+
+    `payloads` puede ser un array (N, 8) o una secuencia de bytes
+    (vacía -> array (0, 21)).
+    """
+    import numpy as np
+
+    lut = _manchester_lut_array()
+    if isinstance(payloads, np.ndarray):
+        msgs = payloads.astype(np.uint8, copy=False).reshape(-1, 8)
+    else:
+        msgs = np.frombuffer(b"".join(payloads), dtype=np.uint8).reshape(-1, 8)
+
+    out = np.empty((len(msgs), RAW_LEN_BYTES), dtype=np.uint8)
+    out[:, :len(HEADER_BYTES)] = np.frombuffer(HEADER_BYTES, dtype=np.uint8)
+    out[:, len(HEADER_BYTES):] = lut[msgs].reshape(len(msgs), 2 * 8)
+    return out
 
 # ---------- main CLI ----------
 
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Estimador online de la moda por celda con contadores acotados.
+
+Sustituye a las pasadas batch que agrupan todas las tramas por celda
+(house, temp_idx[, nib7]) y luego eligen el valor más frecuente
+(detect_outliers_find_rule.detect_outliers, prepare_data.load_and_clean_data).
+Cada trama se decide en el momento en que llega:
+
+    - primera trama de la celda                 -> limpia
+    - valor ya visto en la celda                -> limpia
+    - valor nuevo distinto de la moda actual    -> outlier
+
+Es la misma regla que la pasada batch (outlier = valor distinto de la moda
+que aparece una sola vez), así que cuando un valor marcado reaparece o la
+moda deja atrás al primer valor de la celda, add() devuelve también las
+revisiones de tramas anteriores. Al final del flujo las decisiones
+coinciden con las de la pasada batch.
+
+Las decisiones se guardan aparte de los contadores: por celda, los valores
+vistos una sola vez (con su trama) y los que se han visto más veces. Con eso
+basta para saber si un valor es nuevo, reaparece por segunda vez o ya era
+conocido, sin conteos. Son como mucho `max_values` valores por celda: al
+superarlo se olvida el valor visto una sola vez más antiguo (su trama se
+queda con la última decisión, ya no se revisa) y, si todos se han repetido,
+el valor nuevo se marca sin guardarlo. Hasta ese límite las decisiones
+coinciden exactamente con la pasada batch; las celdas reales tienen unos
+pocos valores.
+
+La moda que se informa sale de como mucho `capacity` contadores
+(Misra-Gries): con más valores distintos se descuenta a todos y se eliminan
+los que llegan a cero, de modo que cualquier valor con frecuencia
+> n/(capacity+1) sobrevive. Por encima de esa capacidad la moda y su conteo
+son aproximados, pero descontar un contador nunca cambia una decisión.
+
+Uso:
+    from online_mode import OnlineModeDetector
+
+    det = OnlineModeDetector()
+    verdict = det.add((house, temp_idx, nib7), r12, frame_id)
+    if verdict.outlier: ...
+    for frame_id, outlier in verdict.revised: ...
+"""
+
+from collections import namedtuple
+
+CAPACITY = 4
+MAX_VALUES = 64
+
+# revised: [(frame_id, outlier)] de tramas anteriores cuya decisión cambia
+Verdict = namedtuple("Verdict", ["outlier", "mode", "mode_count", "revised"])
+
+
+def temp_to_idx(temp_c):
+    """Índice de temperatura de las LUT P: (temp + 40) * 10."""
+    return int(round((temp_c + 40) * 10))
+
+
+class _Cell:
+    __slots__ = ("counts", "singles", "repeated", "flags", "first", "total")
+
+    def __init__(self):
+        self.counts = {}        # valor -> conteo (Misra-Gries, solo para la moda)
+        self.singles = {}       # valor visto una vez -> id de su trama
+        self.repeated = set()   # valores vistos más de una vez
+        self.flags = {}         # valor -> id de la trama marcada como outlier
+        self.first = None       # valor de la primera trama de la celda
+        self.total = 0
+
+    def mode(self):
+        # Empate: gana el primero en llegar (como Counter.most_common)
+        best = None
+        for value, count in self.counts.items():
+            if best is None or count > self.counts[best]:
+                best = value
+        return best
+
+    def flagged(self):
+        """{id: valor} de tramas que hoy son outliers en esta celda."""
+        return {fid: v for v, fid in self.flags.items()}
+
+
+class OnlineModeDetector:
+    def __init__(self, capacity=CAPACITY, max_values=MAX_VALUES):
+        self.capacity = capacity
+        self.max_values = max_values
+        self.cells = {}
+        self.frames = 0
+        self.outliers = 0
+        self.evictions = 0
+        self.forgotten = 0
+
+    def add(self, key, value, frame_id=None):
+        """Procesa una trama y devuelve su Verdict."""
+        if frame_id is None:
+            frame_id = self.frames
+        self.frames += 1
+
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = _Cell()
+        cell.total += 1
+        revised = []
+        outlier = False
+
+        if value in cell.singles:
+            # Segunda aparición: deja de ser outlier
+            del cell.singles[value]
+            cell.repeated.add(value)
+            prev = cell.flags.pop(value, None)
+            if prev is not None:
+                revised.append((prev, False))
+            # El primer valor solo es la moda mientras todos están a 1
+            first_id = cell.singles.get(cell.first)
+            if first_id is not None and cell.first not in cell.flags:
+                cell.flags[cell.first] = first_id
+                revised.append((first_id, True))
+        elif value not in cell.repeated:
+            if cell.first is None:
+                cell.first = value
+            else:
+                # Valor nuevo con la celda ya empezada: nunca es la moda
+                cell.flags[value] = frame_id
+                outlier = True
+            if len(cell.singles) + len(cell.repeated) >= self.max_values:
+                self._forget(cell)
+            if len(cell.singles) + len(cell.repeated) < self.max_values:
+                cell.singles[value] = frame_id
+            else:
+                cell.flags.pop(value, None)
+
+        if value in cell.counts:
+            cell.counts[value] += 1
+        else:
+            if len(cell.counts) >= self.capacity:
+                self._evict(cell)
+            cell.counts[value] = 1
+
+        self.outliers += outlier + sum(1 if o else -1 for _, o in revised)
+        mode = cell.mode()
+        return Verdict(outlier, mode, cell.counts[mode], revised)
+
+    def _forget(self, cell):
+        """Olvida el valor visto una sola vez más antiguo (si hay alguno)."""
+        self.forgotten += 1
+        if cell.singles:
+            value = next(iter(cell.singles))
+            del cell.singles[value]
+            cell.flags.pop(value, None)
+
+    def _evict(self, cell):
+        self.evictions += 1
+        for value in list(cell.counts):
+            cell.counts[value] -= 1
+            if cell.counts[value] <= 0:
+                del cell.counts[value]
+
+    # --- consultas ---
+
+    def mode(self, key):
+        """(valor, conteo) más frecuente de la celda, o None."""
+        cell = self.cells.get(key)
+        if cell is None or not cell.counts:
+            return None
+        mode = cell.mode()
+        return mode, cell.counts[mode]
+
+    def conflicted(self, key):
+        """True si la celda ha visto alguna vez más de un valor distinto."""
+        cell = self.cells.get(key)
+        return cell is not None and len(cell.singles) + len(cell.repeated) > 1
+
+    def flagged(self, key):
+        """{id de trama: valor} de los outliers actuales de la celda (sin los olvidados)."""
+        cell = self.cells.get(key)
+        return cell.flagged() if cell else {}
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "cells": len(self.cells),
+            "outliers": self.outliers,
+            "conflicted": sum(1 for k in self.cells if self.conflicted(k)),
+            "evictions": self.evictions,
+            "forgotten": self.forgotten,
+        }
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Comprueba que csv_table lee y escribe timestamps como pandas 3.0.6
+(pd.to_datetime(errors="coerce") + to_csv) también con formatos mezclados.
+Los valores esperados se sacaron de pandas; la prueba no lo necesita.
+
+Uso:
+    python3 test_csv_table.py
+"""
+
+import os
+import tempfile
+from datetime import datetime
+
+from csv_table import Table, to_datetime
+
+D = datetime
+
+
+def test_mixed_formats_follow_first_value():
+    values = ["2025-11-20 08:00:09", "2025-11-20 08:00:09.5", "2025-11-20",
+              "bad", None, "2025-11-20T08:00:10"]
+    assert to_datetime(values) == [D(2025, 11, 20, 8, 0, 9), None, None, None, None, None]
+
+
+def test_fraction_first():
+    values = ["2025-11-20 08:00:09.5", "2025-11-20 08:00:09", "2025-11-20"]
+    assert to_datetime(values) == [D(2025, 11, 20, 8, 0, 9, 500000), None, None]
+
+
+def test_other_first_formats():
+    assert to_datetime(["2025-11-20", "2025-11-20 08:00:09"]) == [D(2025, 11, 20), None]
+    assert to_datetime(["2025-11-20T08:00:09", "2025-11-20 08:00:09"]) == [D(2025, 11, 20, 8, 0, 9), None]
+    assert to_datetime(["2025-11-20 08:00", "2025-11-20 08:00:09"]) == [D(2025, 11, 20, 8, 0), None]
+    assert to_datetime(["20/11/2025 08:00:09", "2025-11-20 08:00:09"]) == [D(2025, 11, 20, 8, 0, 9), None]
+
+
+def test_unparseable_first_parses_each_value():
+    values = ["bad", "2025-11-20 08:00:09", "2025-11-20"]
+    assert to_datetime(values) == [None, D(2025, 11, 20, 8, 0, 9), D(2025, 11, 20)]
+
+
+def test_sort_and_write():
+    t = Table(["timestamp", "n"], {"timestamp": "str", "n": "int"},
+              {"timestamp": ["2025-11-20 08:00:09.25", "2025-11-20 08:00:01",
+                             "2025-11-20", "2025-11-20 08:00:05.5"],
+               "n": [1, 2, 3, 4]})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "out.csv")
+        t.sort_by_timestamp().write_csv(path)
+        with open(path) as f:
+            text = f.read()
+    # Milisegundos como en pandas; lo que no sigue el formato del primero es
+    # NaT y va al final en el orden original
+    assert text == ("timestamp,n\n"
+                    "2025-11-20 08:00:05.500,4\n"
+                    "2025-11-20 08:00:09.250,1\n"
+                    ",2\n"
+                    ",3\n")
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✓ {name}")
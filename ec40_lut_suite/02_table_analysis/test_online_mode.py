@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Comprueba que OnlineModeDetector marca las mismas tramas que la pasada batch
+(Counter por celda, outlier = valor distinto de la moda visto una sola vez),
+también cuando una celda supera la capacidad de contadores y hay descuentos.
+
+Uso:
+    python3 test_online_mode.py
+"""
+
+import random
+from collections import Counter
+
+from online_mode import OnlineModeDetector
+
+
+def batch_outliers(values):
+    """Índices marcados por la pasada batch en una sola celda."""
+    counts = Counter(values)
+    if len(values) < 2:
+        return set()
+    mode = counts.most_common(1)[0][0]
+    return {i for i, v in enumerate(values) if counts[v] == 1 and v != mode}
+
+
+def online_outliers(values, capacity=4):
+    det = OnlineModeDetector(capacity)
+    flagged = set()
+    for i, v in enumerate(values):
+        verdict = det.add("celda", v, i)
+        if verdict.outlier:
+            flagged.add(i)
+        for prev, outlier in verdict.revised:
+            (flagged.add if outlier else flagged.discard)(prev)
+    assert flagged == set(det.flagged("celda")), "revisiones y estado no cuadran"
+    return flagged
+
+
+def test_overflow():
+    # A,A,B,C,D,E con 4 contadores: al llegar E se descuenta y B,C,D caen
+    values = list("AABCDE")
+    assert online_outliers(values) == batch_outliers(values) == {2, 3, 4, 5}
+
+
+def test_evicted_mode_returns():
+    # La moda A pierde su contador y vuelve: sigue siendo limpia
+    values = list("AABCDEFGHA")
+    assert online_outliers(values, capacity=2) == batch_outliers(values)
+
+
+def test_first_value_revised():
+    # A sola es la moda hasta que B llega a 2; entonces A pasa a outlier
+    values = list("ABB")
+    assert online_outliers(values) == batch_outliers(values) == {0}
+
+
+def test_random_streams():
+    rng = random.Random(0)
+    for _ in range(2000):
+        n = rng.randint(1, 30)
+        alphabet = "ABCDEFGHIJ"[:rng.randint(1, 10)]
+        values = [rng.choice(alphabet) for _ in range(n)]
+        capacity = rng.randint(1, 5)
+        assert online_outliers(values, capacity) == batch_outliers(values), values
+
+
+def test_bounded_values():
+    # Más valores distintos que max_values: la memoria por celda no crece y
+    # las tramas nuevas siguen marcándose al llegar
+    det = OnlineModeDetector(capacity=4, max_values=8)
+    for i in range(1000):
+        verdict = det.add("celda", i % 500, i)
+        cell = det.cells["celda"]
+        assert len(cell.singles) + len(cell.repeated) <= 8
+        assert len(cell.flags) <= 8 and len(cell.counts) <= 4
+        assert verdict.outlier == (i > 0)
+    assert det.stats()["forgotten"] > 0
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✓ {name}")
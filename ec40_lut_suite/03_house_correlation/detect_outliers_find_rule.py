@@ -4,16 +4,23 @@
 """
 Detección y filtrado de outliers en datos capturados
 Estrategia:
-1. Para cada (house, temperatura), encontrar valor R12 más frecuente
-2. Marcar como outliers los valores que difieren significativamente
+1. Para cada celda (house, temp_idx, nib7), seguir online el R12 más
+   frecuente (02_table_analysis/online_mode.py) y marcar cada trama al llegar
+2. Marcar como outliers los valores únicos que difieren de la moda
 3. Re-calcular tablas M y P con datos limpios
 4. Buscar regla universal de transformación
 """
 
 import csv
+import sys
 from collections import Counter, defaultdict
+from pathlib import Path
 from typing import Dict, Tuple, List, Set
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "02_table_analysis"))
+
+from online_mode import OnlineModeDetector, temp_to_idx
+
 KNOWN_PREAMBLE = "555555559995a5a6aa6a"
 
 
@@ -34,8 +41,10 @@ def detect_outliers(csv_path: str):
     print("DETECCIÓN DE OUTLIERS EN DATOS CAPTURADOS")
     print("="*80)
     
-    # Agrupar por (house, temp) → [r12 values]
-    r12_by_house_temp = defaultdict(list)
+    # Una celda por (house, temp_idx, nib7): nib7 (nibble alto de R12) es el
+    # rolling code de la sesión, así que tramas de otra sesión no son outliers
+    detector = OnlineModeDetector()
+    outlier_rows = set()
     all_frames = []
     
     with open(csv_path, newline='') as f:
@@ -67,21 +76,32 @@ def detect_outliers(csv_path: str):
                 b7 = msg[7]
                 r12 = ((b3_low << 8) | b7) & 0xFFF
                 
-                key = (house, temp_c)
-                r12_by_house_temp[key].append(r12)
-                all_frames.append({
-                    'row': row_num,
-                    'house': house,
-                    'temp': temp_c,
-                    'r12': r12,
-                    'ec40': ec40_hex
-                })
+                key = (house, temp_to_idx(temp_c), b3_low)
             except Exception:
                 continue
+            
+            all_frames.append({
+                'row': row_num,
+                'key': key,
+                'house': house,
+                'temp': temp_c,
+                'r12': r12,
+                'ec40': ec40_hex
+            })
+            
+            # Decisión inmediata + revisión de tramas anteriores de la celda
+            verdict = detector.add(key, r12, row_num)
+            if verdict.outlier:
+                outlier_rows.add(row_num)
+            for prev_row, is_outlier in verdict.revised:
+                if is_outlier:
+                    outlier_rows.add(prev_row)
+                else:
+                    outlier_rows.discard(prev_row)
     
     print(f"\nTotal frames cargados: {len(all_frames)}")
     
-    # Detectar outliers: valores R12 que aparecen solo 1 vez cuando hay múltiples capturas
+    # Outliers: valores R12 que aparecen solo 1 vez y no son la moda de su celda
     print("\n" + "="*80)
     print("1. DETECCIÓN DE VALORES INCONSISTENTES")
     print("="*80)
@@ -90,28 +110,19 @@ def detect_outliers(csv_path: str):
     clean_frames = []
     
     for frame in all_frames:
-        key = (frame['house'], frame['temp'])
-        r12_values = r12_by_house_temp[key]
-        
-        # Si hay múltiples capturas de la misma temperatura
-        if len(r12_values) > 1:
-            # Contar frecuencias
-            counter = Counter(r12_values)
-            most_common_r12, most_common_count = counter.most_common(1)[0]
-            
-            # Si el valor actual NO es el más común y solo aparece 1 vez
-            if frame['r12'] != most_common_r12 and counter[frame['r12']] == 1:
-                outliers.append({
-                    **frame,
-                    'reason': f"R12 único (esperado: 0x{most_common_r12:03X}, encontrado {most_common_count}x)",
-                    'expected': most_common_r12
-                })
-            else:
-                clean_frames.append(frame)
+        if frame['row'] in outlier_rows:
+            most_common_r12, most_common_count = detector.mode(frame['key'])
+            outliers.append({
+                **frame,
+                'reason': f"R12 único (esperado: 0x{most_common_r12:03X}, encontrado {most_common_count}x)",
+                'expected': most_common_r12
+            })
         else:
-            # Solo hay una captura, aceptarla (no podemos validar)
             clean_frames.append(frame)
     
+    stats = detector.stats()
+    print(f"\nCeldas (house, temp, nib7): {stats['cells']} ({stats['conflicted']} con conflicto)")
+    
     print(f"\nFrames limpios: {len(clean_frames)}")
     print(f"Outliers detectados: {len(outliers)}")
     
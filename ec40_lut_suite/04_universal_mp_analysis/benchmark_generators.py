@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Benchmark de velocitat i precisió de totes les variants del generador.
+
+Executa cada generador contra el mateix conjunt congelat de captures
+(ec40_capturas_merged.csv, identificat pel seu SHA-1) i mesura:
+    - trames/s (millor de N repeticions)
+    - latència per trama p50 / p99
+    - memòria de pic (tracemalloc)
+    - temps d'importació (intèrpret nou)
+    - precisió exacta global, per house i per nib7
+
+Els resultats es guarden en JSON a benchmark_results/ i es poden comparar amb
+una execució anterior per detectar regressions.
+
+Ús:
+    python3 benchmark_generators.py
+    python3 benchmark_generators.py --repeat 5 --baseline benchmark_results/20251201_120000.json
+"""
+
+import argparse
+import contextlib
+import csv
+import hashlib
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict, namedtuple
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+DATA_FILE = BASE_DIR / "ec40_capturas_merged.csv"
+RESULTS_DIR = Path(__file__).parent / "benchmark_results"
+
+MODULE_DIRS = {
+    'mp': Path(__file__).parent,
+    'utilities': BASE_DIR / "04_utilities",
+}
+
+# Regressió: caiguda de throughput tolerada entre versions
+THROUGHPUT_TOLERANCE = 0.20
+
+Capture = namedtuple('Capture', ['house', 'channel', 'temp', 'nib7', 'payload', 'r12'])
+
+
+def load_captures():
+    captures = []
+    with open(DATA_FILE, 'r') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                payload = row['payload64_hex'].lower()
+                captures.append(Capture(
+                    house=int(row['house']),
+                    channel=int(row['channel']),
+                    temp=float(row['temperature_C']),
+                    nib7=int(payload[7], 16),
+                    payload=payload,
+                    r12=int(row['R12'], 16),
+                ))
+            except (ValueError, KeyError, IndexError):
+                continue
+    return captures
+
+
+def file_sha1(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+# --- VARIANTS ---
+# Cada variant: (directori, mòdul, setup, call, check, comparat)
+#   call(mod, c)       -> sortida del generador (única part cronometrada)
+#   check(c, out)      -> True si coincideix amb la captura
+#   comparat           -> què es compara, es mostra al costat de la precisió
+
+# Nibbles del payload comparats: el mateix prefix per a tots els generadors de
+# trama; generate_message només en produeix 14 i es compara amb aquests
+FRAME_NIBBLES = 15
+MESSAGE_NIBBLES = 14
+
+
+def _nibbles_hex(nibbles):
+    return ''.join(f'{n:x}' for n in nibbles)
+
+
+def _prefix_match(out, payload, n):
+    """Els n primers nibbles coincideixen (una sortida curta no coincideix)."""
+    return len(out) >= n and out[:n] == payload[:n]
+
+
+def _setup_optimized(mod):
+    mod.load_p_lut_base()
+
+
+def _r12_from_bytes(out):
+    byte3, byte7 = out
+    return ((byte3 & 0x0F) << 8) | byte7
+
+
+VARIANTS = {
+    'oregon_optimized_generator': (
+        'mp', 'oregon_optimized_generator', _setup_optimized,
+        lambda mod, c: mod.generate_frame(c.house, c.channel, c.temp, c.nib7),
+        lambda c, out: _prefix_match(out, c.payload, FRAME_NIBBLES),
+        f'{FRAME_NIBBLES} nibbles',
+    ),
+    'oregon_final_generator': (
+        'mp', 'oregon_final_generator', None,
+        lambda mod, c: mod.generate_frame(c.house, c.channel, c.temp, c.nib7),
+        lambda c, out: _prefix_match(out, c.payload, FRAME_NIBBLES),
+        f'{FRAME_NIBBLES} nibbles',
+    ),
+    'oregon_universal_generator': (
+        'mp', 'oregon_universal_generator', None,
+        lambda mod, c: mod.generate_frame(c.house, c.channel, c.temp),
+        lambda c, out: _prefix_match(out, c.payload, FRAME_NIBBLES),
+        f'{FRAME_NIBBLES} nibbles',
+    ),
+    'universal_generator_complete': (
+        'mp', 'universal_generator_complete', None,
+        lambda mod, c: mod.generate_frame(c.house, c.channel, c.temp),
+        lambda c, out: _prefix_match(out, c.payload, FRAME_NIBBLES),
+        f'{FRAME_NIBBLES} nibbles',
+    ),
+    'universal_generator.generate_message': (
+        'mp', 'universal_generator', None,
+        lambda mod, c: mod.generate_message(c.house, c.channel, c.temp)[0],
+        lambda c, out: _prefix_match(_nibbles_hex(out), c.payload, MESSAGE_NIBBLES),
+        f'{MESSAGE_NIBBLES} nibbles',
+    ),
+    'oregon_parameters.encode_ec40_bytes': (
+        'utilities', 'oregon_parameters', None,
+        lambda mod, c: mod.encode_ec40_bytes(c.temp, c.house, c.channel),
+        lambda c, out: _r12_from_bytes(out) == c.r12,
+        'R12',
+    ),
+}
+
+
+def import_variant(dir_key, module_name):
+    path = str(MODULE_DIRS[dir_key])
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return importlib.import_module(module_name)
+
+
+def measure_import_time(dir_key, module_name):
+    """Temps d'importació en un intèrpret nou (sense cache de mòduls)."""
+    code = (
+        "import sys, time; "
+        f"sys.path.insert(0, {str(MODULE_DIRS[dir_key])!r}); "
+        "t = time.perf_counter(); "
+        f"import {module_name}; "
+        "print(time.perf_counter() - t)"
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    try:
+        return float(result.stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        return None
+
+
+def _run(call, mod, c):
+    try:
+        return call(mod, c)
+    except (ValueError, KeyError, IndexError):
+        return None
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def _accuracy_table(groups):
+    return {
+        str(k): {'total': total, 'matches': ok, 'accuracy': ok / total}
+        for k, (total, ok) in sorted(groups.items())
+    }
+
+
+def benchmark_variant(name, captures, repeat):
+    dir_key, module_name, setup, call, check, compared = VARIANTS[name]
+    devnull = open(os.devnull, 'w')
+
+    # Alguns generadors imprimeixen avisos: silenciar-los de forma uniforme
+    with contextlib.redirect_stdout(devnull):
+        mod = import_variant(dir_key, module_name)
+        if setup:
+            setup(mod)
+
+        # 1. Latència per trama + precisió
+        latencies = []
+        outputs = []
+        for c in captures:
+            t0 = time.perf_counter_ns()
+            out = _run(call, mod, c)
+            latencies.append(time.perf_counter_ns() - t0)
+            outputs.append(out)
+
+        # 2. Throughput (millor de N passades)
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for c in captures:
+                _run(call, mod, c)
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+
+        # 3. Memòria de pic
+        tracemalloc.start()
+        for c in captures:
+            _run(call, mod, c)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    devnull.close()
+
+    by_house = defaultdict(lambda: [0, 0])
+    by_nib7 = defaultdict(lambda: [0, 0])
+    matches = 0
+    failures = 0
+    for c, out in zip(captures, outputs):
+        ok = out is not None and check(c, out)
+        failures += out is None
+        matches += ok
+        for groups, key in ((by_house, c.house), (by_nib7, c.nib7)):
+            groups[key][0] += 1
+            groups[key][1] += ok
+
+    latencies.sort()
+    return {
+        'frames': len(captures),
+        'frames_per_sec': len(captures) / best if best else None,
+        'latency_us': {
+            'p50': _percentile(latencies, 50) / 1000,
+            'p99': _percentile(latencies, 99) / 1000,
+        },
+        'peak_memory_bytes': peak,
+        'import_time_s': measure_import_time(dir_key, module_name),
+        'accuracy': matches / len(captures),
+        'compared': compared,
+        'matches': matches,
+        'exceptions': failures,
+        'accuracy_by_house': _accuracy_table(by_house),
+        'accuracy_by_nib7': _accuracy_table({f"0x{k:X}": v for k, v in by_nib7.items()}),
+    }
+
+
+def compare_with_baseline(results, baseline_file):
+    """Retorna la llista de regressions respecte a una execució anterior."""
+    with open(baseline_file, 'r') as f:
+        baseline = json.load(f)
+
+    regressions = []
+    if baseline['dataset']['sha1'] != results['dataset']['sha1']:
+        print("⚠️  El dataset ha canviat respecte al baseline: la precisió no és comparable")
+
+    for name, cur in results['variants'].items():
+        old = baseline['variants'].get(name)
+        if old is None:
+            continue
+        comparable = (baseline['dataset']['sha1'] == results['dataset']['sha1']
+                      and old.get('compared') == cur['compared'])
+        if cur['accuracy'] < old['accuracy'] and comparable:
+            regressions.append(f"{name}: precisió {old['accuracy']*100:.2f}% -> {cur['accuracy']*100:.2f}%")
+        if old['frames_per_sec'] and cur['frames_per_sec'] < old['frames_per_sec'] * (1 - THROUGHPUT_TOLERANCE):
+            regressions.append(f"{name}: throughput {old['frames_per_sec']:.0f} -> {cur['frames_per_sec']:.0f} trames/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de generadors EC40")
+    parser.add_argument('--repeat', type=int, default=3, help="Passades per mesurar throughput")
+    parser.add_argument('--only', nargs='*', choices=list(VARIANTS), help="Variants a executar")
+    parser.add_argument('--baseline', type=Path, help="JSON anterior per detectar regressions")
+    parser.add_argument('--output', type=Path, help="Fitxer JSON de sortida")
+    args = parser.parse_args()
+
+    captures = load_captures()
+    print("=" * 90)
+    print(f"BENCHMARK DE GENERADORS ({len(captures)} trames de {DATA_FILE.name})")
+    print("=" * 90)
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'dataset': {'file': DATA_FILE.name, 'sha1': file_sha1(DATA_FILE), 'frames': len(captures)},
+        'variants': {},
+    }
+
+    print(f"{'Variant':40} | {'trames/s':>9} | {'p50 us':>7} | {'p99 us':>7} | {'pic KB':>7} | {'import ms':>9} | Precisió")
+    print("-" * 105)
+    for name in args.only or VARIANTS:
+        r = benchmark_variant(name, captures, args.repeat)
+        results['variants'][name] = r
+        import_ms = r['import_time_s'] * 1000 if r['import_time_s'] is not None else float('nan')
+        print(f"{name:40} | {r['frames_per_sec']:9.0f} | {r['latency_us']['p50']:7.1f} | "
+              f"{r['latency_us']['p99']:7.1f} | {r['peak_memory_bytes']/1024:7.1f} | "
+              f"{import_ms:9.1f} | {r['accuracy']*100:6.2f}% ({r['compared']})")
+
+    output = args.output or RESULTS_DIR / f"{time.strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Resultats guardats a {output}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline)
+        if regressions:
+            print("\n❌ REGRESSIONS:")
+            for r in regressions:
+                print(f"   - {r}")
+            sys.exit(1)
+        print("\n✅ Cap regressió respecte al baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,10 @@ import sys
 from pathlib import Path
 from collections import defaultdict
 
+sys.path.insert(0, str(Path(__file__).parent.parent / "02_table_analysis"))
+
+from check_os21 import check_batch
+
 def extract_p_lut(csv_file, house_id, output_file=None):
     """
     Extreu la taula P per un House ID donat des d'un fitxer CSV.
@@ -19,6 +23,7 @@ def extract_p_lut(csv_file, house_id, output_file=None):
         output_file: Path de sortida per al .h (opcional)
     """
     p_map = {}
+    candidates = []
     
     with open(csv_file, 'r') as f:
         reader = csv.reader(f)
@@ -31,24 +36,19 @@ def extract_p_lut(csv_file, house_id, output_file=None):
                 hex_str = row[3]
                 
                 if house != house_id: continue
-                
-                # Calcular checksum per validar
-                nibbles = [int(c, 16) for c in hex_str[:12]]
-                s = sum(nibbles)
-                chk_lo = s & 0xF
-                chk_hi = (s >> 4) & 0xF
-                
-                r1_actual = int(hex_str[12], 16)
-                m_actual = int(hex_str[13], 16)
-                
-                if r1_actual == chk_lo and m_actual == chk_hi:
-                    # Checksum OK, P és el següent nibble
-                    p = int(hex_str[14], 16)
-                    t_idx = int(round((temp_c + 40) * 10))
-                    p_map[t_idx] = p
+                candidates.append((temp_c, hex_str))
                     
             except (ValueError, IndexError):
                 continue
+    
+    # Checksum (R1, M) validat de cop per tot el lot
+    errors = check_batch([hex_str for _, hex_str in candidates])
+    for (temp_c, hex_str), err in zip(candidates, errors):
+        if err == 0:
+            # Checksum OK, P és el següent nibble
+            p = int(hex_str[14], 16)
+            t_idx = int(round((temp_c + 40) * 10))
+            p_map[t_idx] = p
                 
     if not p_map:
         print(f"❌ No s'han trobat dades validades per House {house_id}.")
@@ -4,19 +4,27 @@ Genera un document de verificació detallat comparant captures vs generador.
 PROCESСА TOTS els CSVs de captures de la carpeta ec40_lut_suite.
 """
 
+import bisect
 import csv
+import hashlib
+import inspect
+import json
 import sys
 from pathlib import Path
+from collections import Counter
 import glob
 
 # Afegir el path de Docs per importar la LUT
 sys.path.insert(0, str(Path(__file__).parent / "Docs"))
 
-from oregon_p_lut_complete import get_p
+from oregon_p_lut_complete import get_p, P_LUT_BASE, NIB7_XOR_TABLE
 
 BASE_DIR = Path(__file__).parent.parent
 OUTPUT_DIR = Path(__file__).parent / "Docs"
 
+# Resultats per fila de l'última verificació (per a execucions incrementals)
+CACHE_FILE = OUTPUT_DIR / "verification_cache.json"
+
 # TOTS els CSVs de captures (exclou verification_table.csv i env/)
 CSV_FILES = [
     BASE_DIR / "ec40_capturas_merged.csv",
@@ -122,6 +130,51 @@ def load_all_captures():
     
     return all_captures
 
+def verify_capture(capture):
+    """Genera la trama d'una captura i la compara nibble a nibble."""
+    try:
+        house = capture['house']
+        channel = capture['channel']
+        temp_c = capture['temp']
+        captured_hex = capture['payload']
+        
+        # Nibbles capturats
+        captured_nibbles = [int(c, 16) for c in captured_hex]
+        nib7 = captured_nibbles[7] if len(captured_nibbles) > 7 else 0x2
+        
+        # Generar trama
+        generated_nibbles = generate_frame(house, channel, temp_c, nib7)
+        
+        # Comparar (primers 15 nibbles)
+        captured_15 = captured_nibbles[:15]
+        match = (generated_nibbles == captured_15)
+        
+        # Identificar diferències nibble a nibble
+        diffs = []
+        for i in range(min(15, len(captured_15))):
+            if i < len(generated_nibbles) and captured_15[i] != generated_nibbles[i]:
+                diffs.append({
+                    'pos': i,
+                    'captured': captured_15[i],
+                    'generated': generated_nibbles[i]
+                })
+        
+        return {
+            'source': capture['source'],
+            'timestamp': capture['timestamp'],
+            'house': house,
+            'channel': channel,
+            'temp': temp_c,
+            'nib7': nib7,
+            'captured': ''.join(f'{n:x}' for n in captured_15),
+            'generated': ''.join(f'{n:x}' for n in generated_nibbles),
+            'match': match,
+            'diffs': diffs
+        }
+        
+    except (ValueError, KeyError, IndexError):
+        return None
+
 def create_verification_table():
     """Crea taula de verificació completa."""
     
@@ -143,53 +196,14 @@ def create_verification_table():
     matches = 0
     
     for capture in all_captures:
-        try:
-            house = capture['house']
-            channel = capture['channel']
-            temp_c = capture['temp']
-            timestamp = capture['timestamp']
-            captured_hex = capture['payload']
-            
-            # Nibbles capturats
-            captured_nibbles = [int(c, 16) for c in captured_hex]
-            nib7 = captured_nibbles[7] if len(captured_nibbles) > 7 else 0x2
-            
-            # Generar trama
-            generated_nibbles = generate_frame(house, channel, temp_c, nib7)
-            
-            # Comparar (primers 15 nibbles)
-            captured_15 = captured_nibbles[:15]
-            match = (generated_nibbles == captured_15)
-            
-            total += 1
-            if match:
-                matches += 1
-            
-            # Identificar diferències nibble a nibble
-            diffs = []
-            for i in range(min(15, len(captured_15))):
-                if i < len(generated_nibbles) and captured_15[i] != generated_nibbles[i]:
-                    diffs.append({
-                        'pos': i,
-                        'captured': captured_15[i],
-                        'generated': generated_nibbles[i]
-                    })
-            
-            results.append({
-                'source': capture['source'],
-                'timestamp': timestamp,
-                'house': house,
-                'channel': channel,
-                'temp': temp_c,
-                'nib7': nib7,
-                'captured': ''.join(f'{n:x}' for n in captured_15),
-                'generated': ''.join(f'{n:x}' for n in generated_nibbles),
-                'match': match,
-                'diffs': diffs
-            })
-            
-        except (ValueError, KeyError, IndexError) as e:
+        result = verify_capture(capture)
+        if result is None:
             continue
+        
+        total += 1
+        if result['match']:
+            matches += 1
+        results.append(result)
     
     print(f"\n{'='*60}")
     print(f"RESULTATS GENERALS")
@@ -202,9 +216,183 @@ def create_verification_table():
     return results
 
 
-def generate_markdown_table(results, output_file):
+# --- VERIFICACIÓ INCREMENTAL ---
+
+def generator_rule_hash():
+    """
+    Hash de la regla de generació (estructura de trama, checksum R1/M i get_p).
+    Si canvia, cal tornar a verificar totes les files.
+    """
+    src = inspect.getsource(generate_frame) + inspect.getsource(get_p)
+    return hashlib.sha1(src.encode()).hexdigest()[:16]
+
+def row_key(capture, seen):
+    """Clau estable d'una captura (les files idèntiques es numeren)."""
+    raw = '|'.join(str(capture[k]) for k in ('source', 'timestamp', 'house', 'channel', 'temp', 'payload'))
+    key = hashlib.sha1(raw.encode()).hexdigest()[:16]
+    seen[key] += 1
+    return key if seen[key] == 1 else f"{key}#{seen[key]}"
+
+def row_dependencies(capture, lut_keys):
+    """
+    Entrades de les taules del generador que fa servir una captura:
+    [índex de P_LUT_BASE usat, valor, XOR de NIB7_XOR_TABLE].
+    Mateixa resolució de l'índex més proper que get_p().
+    None si la captura no es pot verificar (nibble no hex, temperatura NaN/inf).
+    """
+    try:
+        payload = capture['payload']
+        nib7 = int(payload[7], 16) if len(payload) > 7 else 0x2
+        temp_idx = int(round((capture['temp'] + 40) * 10))
+    except (ValueError, KeyError, TypeError, OverflowError):
+        return None
+    
+    if temp_idx in P_LUT_BASE:
+        idx = temp_idx
+    else:
+        pos = bisect.bisect_left(lut_keys, temp_idx)
+        lo = lut_keys[max(pos - 1, 0)]
+        hi = lut_keys[min(pos, len(lut_keys) - 1)]
+        idx = lo if abs(lo - temp_idx) <= abs(hi - temp_idx) else hi
+    
+    return [idx, P_LUT_BASE[idx], NIB7_XOR_TABLE.get(nib7, 0x0)]
+
+def empty_stats():
+    return {'source': {}, 'house': {}, 'nib7': {}, 'error_pos': {}}
+
+def accumulate_stats(stats, result, sign=1):
+    """Suma (sign=1) o resta (sign=-1) la contribució d'una fila a les estadístiques."""
+    for group in ('source', 'house', 'nib7'):
+        entry = stats[group].setdefault(result[group], [0, 0])
+        entry[0] += sign
+        entry[1] += sign * int(result['match'])
+        if entry[0] == 0:
+            del stats[group][result[group]]
+    
+    for diff in result['diffs']:
+        pos = diff['pos']
+        stats['error_pos'][pos] = stats['error_pos'].get(pos, 0) + sign
+        if stats['error_pos'][pos] == 0:
+            del stats['error_pos'][pos]
+
+def compute_stats(results):
+    stats = empty_stats()
+    for r in results:
+        accumulate_stats(stats, r)
+    return stats
+
+def load_cache():
+    if not CACHE_FILE.exists():
+        return None
+    try:
+        with open(CACHE_FILE, 'r') as f:
+            cache = json.load(f)
+    except (ValueError, OSError):
+        return None
+    
+    # JSON guarda les claus com a text
+    stats = cache['stats']
+    for group in ('house', 'nib7', 'error_pos'):
+        stats[group] = {int(k): v for k, v in stats[group].items()}
+    return cache
+
+def save_cache(rule_hash, rows, stats):
+    tmp = CACHE_FILE.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump({'rule_hash': rule_hash, 'rows': rows, 'stats': stats}, f)
+    tmp.replace(CACHE_FILE)
+
+def create_verification_table_incremental(full=False):
+    """
+    Com create_verification_table(), però reaprofitant els resultats de
+    l'execució anterior: només es tornen a verificar les captures noves i les
+    que depenen d'entrades de P_LUT_BASE / NIB7_XOR_TABLE que han canviat.
+    Les estadístiques per font/house/nib7 es corregeixen fila a fila.
+    
+    Returns:
+        (results, stats, changed)
+    """
+    print("=" * 60)
+    print("VERIFICACIÓ INCREMENTAL AMB TOTES LES CAPTURES")
+    print("=" * 60)
+    
+    all_captures = load_all_captures()
+    if not all_captures:
+        print("❌ No s'han trobat captures!")
+        return [], empty_stats(), False
+    
+    rule_hash = generator_rule_hash()
+    cache = None if full else load_cache()
+    
+    if cache is None or cache['rule_hash'] != rule_hash:
+        if cache is not None:
+            print("⚠️  Regla de generació modificada: es reverifica tot")
+        old_rows, stats = {}, empty_stats()
+    else:
+        old_rows, stats = cache['rows'], cache['stats']
+    
+    lut_keys = sorted(P_LUT_BASE)
+    seen = Counter()
+    rows = {}
+    results = []
+    reused = 0
+    reverified = 0
+    
+    for capture in all_captures:
+        key = row_key(capture, seen)
+        deps = row_dependencies(capture, lut_keys)
+        cached = old_rows.pop(key, None)
+        
+        if deps is None:
+            # No verificable, com a verify_capture()
+            if cached is not None:
+                accumulate_stats(stats, cached, -1)
+            continue
+        
+        if cached is not None and cached['deps'] == deps:
+            result = cached
+            reused += 1
+        else:
+            result = verify_capture(capture)
+            if cached is not None:
+                accumulate_stats(stats, cached, -1)
+            if result is None:
+                continue
+            result['deps'] = deps
+            accumulate_stats(stats, result)
+            reverified += 1
+        
+        rows[key] = result
+        results.append(result)
+    
+    # Captures que ja no hi són
+    for gone in old_rows.values():
+        accumulate_stats(stats, gone, -1)
+    
+    changed = reverified > 0 or len(old_rows) > 0
+    save_cache(rule_hash, rows, stats)
+    
+    total = len(results)
+    matches = sum(1 for r in results if r['match'])
+    
+    print(f"\nReaprofitades: {reused}  Reverificades: {reverified}  Eliminades: {len(old_rows)}")
+    print(f"\n{'='*60}")
+    print(f"RESULTATS GENERALS")
+    print(f"{'='*60}")
+    print(f"Total trames processades: {total}")
+    print(f"Matches: {matches} ({matches/total*100:.2f}%)")
+    print(f"Errors: {total-matches} ({(total-matches)/total*100:.2f}%)")
+    print(f"{'='*60}\n")
+    
+    return results, stats, changed
+
+
+def generate_markdown_table(results, output_file, stats=None):
     """Genera taula en format Markdown."""
     
+    if stats is None:
+        stats = compute_stats(results)
+    
     with open(output_file, 'w') as f:
         f.write("# Taula de Verificació - Captures vs Generador\n\n")
         f.write(f"**Total trames**: {len(results)}\n")
@@ -214,19 +402,14 @@ def generate_markdown_table(results, output_file):
         f.write(f"**Errors**: {len(results)-matches}\n\n")
         
         # Estadístiques per font CSV
-        from collections import defaultdict, Counter
-        
-        by_source = defaultdict(list)
-        for r in results:
-            by_source[r['source']].append(r['match'])
+        by_source = stats['source']
         
         f.write("## Estadístiques per Font de Dades\n\n")
         f.write("| Font CSV | Total | Matches | Errors | Precisió |\n")
         f.write("|----------|-------|---------|--------|----------|\n")
         
         for source in sorted(by_source.keys()):
-            total_s = len(by_source[source])
-            matches_s = sum(by_source[source])
+            total_s, matches_s = by_source[source]
             errors_s = total_s - matches_s
             pct = matches_s / total_s * 100
             
@@ -234,17 +417,14 @@ def generate_markdown_table(results, output_file):
             f.write(f"| {source} | {total_s} | {matches_s} | {errors_s} | {pct:.1f}% {status} |\n")
         
         # Estadístiques per House
-        by_house = defaultdict(list)
-        for r in results:
-            by_house[r['house']].append(r['match'])
+        by_house = stats['house']
         
         f.write("\n## Estadístiques per House\n\n")
         f.write("| House | Total | Matches | Errors | Precisió |\n")
         f.write("|-------|-------|---------|--------|----------|\n")
         
         for house in sorted(by_house.keys()):
-            total_h = len(by_house[house])
-            matches_h = sum(by_house[house])
+            total_h, matches_h = by_house[house]
             errors_h = total_h - matches_h
             pct = matches_h / total_h * 100
             
@@ -252,17 +432,14 @@ def generate_markdown_table(results, output_file):
             f.write(f"| {house} | {total_h} | {matches_h} | {errors_h} | {pct:.1f}% {status} |\n")
         
         # Estadístiques per Nib7
-        by_nib7 = defaultdict(list)
-        for r in results:
-            by_nib7[r['nib7']].append(r['match'])
+        by_nib7 = stats['nib7']
         
         f.write("\n## Estadístiques per Rolling Code (Nib7)\n\n")
         f.write("| Nib7 | Total | Matches | Errors | Precisió |\n")
         f.write("|------|-------|---------|--------|----------|\n")
         
         for nib7 in sorted(by_nib7.keys()):
-            total_n = len(by_nib7[nib7])
-            matches_n = sum(by_nib7[nib7])
+            total_n, matches_n = by_nib7[nib7]
             errors_n = total_n - matches_n
             pct = matches_n / total_n * 100
             
@@ -276,10 +453,7 @@ def generate_markdown_table(results, output_file):
             f.write(f"\n## Anàlisi d'Errors ({len(errors_only)} total)\n\n")
             
             # Errors per posició
-            error_positions = Counter()
-            for r in errors_only:
-                for diff in r['diffs']:
-                    error_positions[diff['pos']] += 1
+            error_positions = stats['error_pos']
             
             f.write("### Errors per Posició de Nibble\n\n")
             f.write("| Posició | Descripció | Errors | % |\n")
@@ -325,19 +499,14 @@ def generate_markdown_table(results, output_file):
         f.write(f"**Errors**: {len(results)-matches}\n\n")
         
         # Estadístiques per House
-        from collections import defaultdict, Counter
-        
-        by_house = defaultdict(list)
-        for r in results:
-            by_house[r['house']].append(r['match'])
+        by_house = stats['house']
         
         f.write("## Estadístiques per House\n\n")
         f.write("| House | Total | Matches | Errors | Precisió |\n")
         f.write("|-------|-------|---------|--------|----------|\n")
         
         for house in sorted(by_house.keys()):
-            total_h = len(by_house[house])
-            matches_h = sum(by_house[house])
+            total_h, matches_h = by_house[house]
             errors_h = total_h - matches_h
             pct = matches_h / total_h * 100
             
@@ -345,17 +514,14 @@ def generate_markdown_table(results, output_file):
             f.write(f"| {house} | {total_h} | {matches_h} | {errors_h} | {pct:.1f}% {status} |\n")
         
         # Estadístiques per Nib7
-        by_nib7 = defaultdict(list)
-        for r in results:
-            by_nib7[r['nib7']].append(r['match'])
+        by_nib7 = stats['nib7']
         
         f.write("\n## Estadístiques per Rolling Code (Nib7)\n\n")
         f.write("| Nib7 | Total | Matches | Errors | Precisió |\n")
         f.write("|------|-------|---------|--------|----------|\n")
         
         for nib7 in sorted(by_nib7.keys()):
-            total_n = len(by_nib7[nib7])
-            matches_n = sum(by_nib7[nib7])
+            total_n, matches_n = by_nib7[nib7]
             errors_n = total_n - matches_n
             pct = matches_n / total_n * 100
             
@@ -369,10 +535,7 @@ def generate_markdown_table(results, output_file):
             f.write(f"\n## Anàlisi d'Errors ({len(errors_only)} total)\n\n")
             
             # Errors per posició
-            error_positions = Counter()
-            for r in errors_only:
-                for diff in r['diffs']:
-                    error_positions[diff['pos']] += 1
+            error_positions = stats['error_pos']
             
             f.write("### Errors per Posició de Nibble\n\n")
             f.write("| Posició | Descripció | Errors | % |\n")
@@ -433,17 +596,20 @@ def generate_csv_table(results, output_file):
             ])
 
 if __name__ == "__main__":
-    # Crear taula de verificació
-    results = create_verification_table()
-    
-    # Generar documents
+    # Crear taula de verificació (--full ignora la cache i ho reverifica tot)
     OUTPUT_DIR.mkdir(exist_ok=True)
+    results, stats, changed = create_verification_table_incremental(full='--full' in sys.argv)
     
     md_file = OUTPUT_DIR / "verification_table.md"
     csv_file = OUTPUT_DIR / "verification_table.csv"
     
+    if not changed and md_file.exists() and csv_file.exists():
+        print("✅ Cap canvi des de l'última verificació: documents al dia")
+        sys.exit(0)
+    
+    # Generar documents
     print(f"\nGenerant documents...")
-    generate_markdown_table(results, md_file)
+    generate_markdown_table(results, md_file, stats)
     generate_csv_table(results, csv_file)
     
     print(f"\n✅ Documents generats:")
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Cerca per programació genètica (regressió simbòlica) de fórmules per M i P.
+
+En lloc de graelles fixes (fit_m_functions: shift 3-7 x offset -300..300),
+evoluciona expressions del DSL (investigation_scripts/expr_dsl.py) sobre els
+primitius de nibble / house / temp_idx:
+
+    T, H, M (només per P), H_lo, H_hi, nibbles de T, constants 0-15
+    operadors ^ & | + - >> <<
+
+Fitness = percentatge d'encerts exactes del nibble a golden_master.csv.
+Les poblacions es canonicalitzen (s'eliminen duplicats) i s'avaluen en lots
+vectoritzats repartits en un pool de processos. Es conserva l'elit de cada
+generació i es guarda un checkpoint JSON per poder reprendre la cerca.
+
+El checkpoint recorda la versió del golden master puntuada: si n'hi ha una
+de nova, --resume només reavalua la caché de fitness sobre les cel·les que
+han canviat (prepare_data.changes_since) en lloc de començar de zero.
+
+Ús:
+    python3 gp_search.py --target m --gens 50 --pop 400
+    python3 gp_search.py --target p --workers 8 --resume
+    python3 gp_search.py --target m --group 0x3   # només houses amb H & 0x0B == 3
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent / "investigation_scripts"))
+
+from expr_dsl import Expr, var, const, parse, canonicalize, evaluate
+from prepare_data import current_version, changes_since
+
+BASE_DIR = Path(__file__).parent
+DATA_FILE = BASE_DIR / "golden_master.csv"
+CHECKPOINT_DIR = BASE_DIR / "gp_checkpoints"
+
+BINARY_OPS = ('^', '&', '|', '+', '-')
+SHIFT_OPS = ('>>', '<<')
+MAX_DEPTH = 6
+MAX_SIZE = 40
+
+
+def _columns(rows):
+    data = np.array(rows, dtype=np.int64).reshape(-1, 4)
+    return {'T': data[:, 0], 'H': data[:, 1], 'M': data[:, 2], 'P': data[:, 3]}
+
+
+def load_columns(group=None):
+    """Carrega golden_master.csv com a columnes per al DSL."""
+    rows = []
+    with open(DATA_FILE, 'r') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            h = int(row['house'])
+            if group is not None and (h & 0x0B) != group:
+                continue
+            rows.append((int(row['temp_idx']), h, int(row['m']), int(row['p'])))
+
+    return _columns(rows)
+
+
+def rescore_changes(fitness, since, n_old, target, group=None):
+    """
+    Actualitza la caché de fitness (puntuada sobre la versió `since`, n_old
+    files) a la versió actual avaluant només les cel·les canviades.
+    Retorna el nombre de files de la versió actual.
+    """
+    old_rows, new_rows = [], []
+    for (h, t), (old, new) in changes_since(since).items():
+        if group is not None and (h & 0x0B) != group:
+            continue
+        if old is not None:
+            old_rows.append((t, h) + old)
+        if new is not None:
+            new_rows.append((t, h) + new)
+
+    n_new = n_old - len(old_rows) + len(new_rows)
+    old_cols, new_cols = _columns(old_rows), _columns(new_rows)
+    old_target, new_target = old_cols.pop(target.upper()), new_cols.pop(target.upper())
+    old_cols.pop('P', None)
+    new_cols.pop('P', None)
+
+    for src, score in fitness.items():
+        e = parse(src)
+        hits = round(score * n_old) - evaluate(e, old_cols, old_target) + evaluate(e, new_cols, new_target)
+        fitness[src] = hits / max(n_new, 1)
+    return n_new
+
+
+# --- PRIMITIVES ---
+
+def terminals(target):
+    """Terminals disponibles per a l'objectiu (M no pot dependre de si mateix)."""
+    t = var('T')
+    h = var('H')
+    terms = [
+        t, h,
+        t & 0xF, (t >> 4) & 0xF, t >> 8,
+        h & 0xF, h >> 4, h & 0x0B,
+    ]
+    if target == 'p':
+        terms.append(var('M'))
+    return terms
+
+
+def size(e):
+    if e.op in ('var', 'const'):
+        return 1
+    return 1 + sum(size(a) for a in e.args if isinstance(a, Expr))
+
+
+def depth(e):
+    if e.op in ('var', 'const'):
+        return 1
+    return 1 + max(depth(a) for a in e.args if isinstance(a, Expr))
+
+
+def random_expr(rng, terms, max_depth, full=False):
+    """Arbre aleatori (mètode 'grow' o 'full')."""
+    if max_depth <= 1 or (not full and rng.random() < 0.3):
+        if rng.random() < 0.25:
+            return const(rng.randrange(16))
+        return rng.choice(terms)
+
+    if rng.random() < 0.2:
+        op = rng.choice(SHIFT_OPS)
+        shift = rng.randint(1, 8) if op == '>>' else rng.randint(1, 3)
+        return Expr(op, (random_expr(rng, terms, max_depth - 1, full), shift))
+
+    op = rng.choice(BINARY_OPS)
+    return Expr(op, (random_expr(rng, terms, max_depth - 1, full),
+                     random_expr(rng, terms, max_depth - 1, full)))
+
+
+def _paths(e, prefix=()):
+    """Camins a tots els subarbres (índexs dins de args)."""
+    yield prefix
+    if e.op in ('var', 'const'):
+        return
+    for i, a in enumerate(e.args):
+        if isinstance(a, Expr):
+            yield from _paths(a, prefix + (i,))
+
+
+def _get(e, path):
+    for i in path:
+        e = e.args[i]
+    return e
+
+
+def _replace(e, path, new):
+    if not path:
+        return new
+    args = list(e.args)
+    args[path[0]] = _replace(args[path[0]], path[1:], new)
+    return Expr(e.op, args)
+
+
+def mutate(rng, e, terms):
+    """Substitueix un subarbre, ajusta una constant o un desplaçament."""
+    path = rng.choice(list(_paths(e)))
+    node = _get(e, path)
+
+    if node.op == 'const' and rng.random() < 0.5:
+        return _replace(e, path, const(node.args[0] ^ (1 << rng.randrange(4))))
+    if node.op in SHIFT_OPS and rng.random() < 0.5:
+        shift = max(1, node.args[1] + rng.choice((-1, 1)))
+        return _replace(e, path, Expr(node.op, (node.args[0], shift)))
+
+    return _replace(e, path, random_expr(rng, terms, rng.randint(1, 3)))
+
+
+def crossover(rng, a, b):
+    """Intercanvia un subarbre de `b` dins de `a`."""
+    path_a = rng.choice(list(_paths(a)))
+    path_b = rng.choice(list(_paths(b)))
+    return _replace(a, path_a, _get(b, path_b))
+
+
+# --- AVALUACIÓ EN PARAL·LEL ---
+
+_COLUMNS = None
+_TARGET = None
+
+
+def _init_worker(group, target):
+    global _COLUMNS, _TARGET
+    _COLUMNS = load_columns(group)
+    _TARGET = _COLUMNS.pop(target.upper())
+    # P mai és una entrada
+    _COLUMNS.pop('P', None)
+
+
+def _score_batch(sources):
+    """Avalua un lot d'expressions (codi font canònic) al worker."""
+    n = len(_TARGET)
+    return [evaluate(parse(src), _COLUMNS, _TARGET) / n for src in sources]
+
+
+def _chunks(items, n):
+    size_ = max(1, (len(items) + n - 1) // n)
+    return [items[i:i + size_] for i in range(0, len(items), size_)]
+
+
+# --- CHECKPOINT ---
+
+def checkpoint_path(target, group):
+    suffix = f"_g{group:X}" if group is not None else ""
+    return CHECKPOINT_DIR / f"gp_{target}{suffix}.json"
+
+
+def save_checkpoint(path, generation, population, best, fitness_cache, data_version, n_rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump({
+            'generation': generation,
+            'population': [e.source for e in population],
+            'best': best,
+            'fitness': fitness_cache,
+            'data_version': data_version,
+            'n_rows': n_rows,
+        }, f)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path):
+    with open(path, 'r') as f:
+        state = json.load(f)
+    state['population'] = [parse(src) for src in state['population']]
+    return state
+
+
+# --- MOTOR EVOLUTIU ---
+
+def tournament(rng, population, fitness, k=4):
+    contenders = rng.sample(population, min(k, len(population)))
+    # Desempat per mida (parsimònia)
+    return max(contenders, key=lambda e: (fitness[e.source], -size(e)))
+
+
+def evolve(target='m', group=None, pop_size=400, generations=50, elite=10,
+           workers=None, seed=None, resume=False, p_crossover=0.7):
+    rng = random.Random(seed)
+    terms = terminals(target)
+    ckpt = checkpoint_path(target, group)
+
+    fitness = {}
+    start_gen = 0
+    best = None
+    data_version = current_version()
+    n_rows = len(load_columns(group)['T'])
+
+    if resume and ckpt.exists():
+        state = load_checkpoint(ckpt)
+        population = state['population']
+        fitness = state['fitness']
+        start_gen = state['generation'] + 1
+        best = state['best']
+        print(f"Reprenent des de la generació {start_gen} ({ckpt})")
+
+        since = state.get('data_version', data_version)
+        if since != data_version:
+            t0 = time.time()
+            rescore_changes(fitness, since, state['n_rows'], target, group)
+            best['score'] = fitness.get(best['expr'], 0.0)
+            print(f"Golden master v{since} -> v{data_version}: {len(fitness)} fórmules "
+                  f"repuntuades sobre les cel·les canviades ({time.time() - t0:.2f}s)")
+    else:
+        # Ramped half-and-half
+        population = [random_expr(rng, terms, 2 + i % (MAX_DEPTH - 1), full=(i % 2 == 0))
+                      for i in range(pop_size)]
+
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(group, target)) as pool:
+        for gen in range(start_gen, start_gen + generations):
+            t0 = time.time()
+
+            # Canonicalitzar i eliminar duplicats: cada fórmula s'avalua una vegada
+            population = [canonicalize(e) for e in population]
+            pending = sorted({e.source for e in population} - fitness.keys())
+
+            for chunk, scores in zip(_chunks(pending, workers * 4),
+                                     pool.map(_score_batch, _chunks(pending, workers * 4))):
+                fitness.update(zip(chunk, scores))
+
+            ranked = sorted({e.source: e for e in population}.values(),
+                            key=lambda e: (-fitness[e.source], size(e)))
+            leader = ranked[0]
+            if best is None or fitness[leader.source] > best['score']:
+                best = {'expr': leader.source, 'score': fitness[leader.source], 'generation': gen}
+
+            print(f"Gen {gen:3d}: millor {fitness[leader.source]*100:5.1f}% "
+                  f"[{leader.source}]  noves={len(pending)}  ({time.time() - t0:.2f}s)")
+
+            save_checkpoint(ckpt, gen, population, best, fitness, data_version, n_rows)
+
+            if best['score'] >= 1.0:
+                print("Fórmula perfecta trobada!")
+                break
+
+            # Nova generació: elit + descendents
+            children = ranked[:elite]
+            while len(children) < pop_size:
+                parent = tournament(rng, population, fitness)
+                if rng.random() < p_crossover:
+                    child = crossover(rng, parent, tournament(rng, population, fitness))
+                else:
+                    child = mutate(rng, parent, terms)
+                if depth(child) <= MAX_DEPTH and size(child) <= MAX_SIZE:
+                    children.append(child)
+            population = children
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cerca GP de fórmules M/P")
+    parser.add_argument('--target', choices=('m', 'p'), default='m')
+    parser.add_argument('--group', type=lambda s: int(s, 0), default=None,
+                        help="Filtrar per grup de house (H & 0x0B)")
+    parser.add_argument('--pop', type=int, default=400)
+    parser.add_argument('--gens', type=int, default=50)
+    parser.add_argument('--elite', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--resume', action='store_true', help="Reprendre des del checkpoint")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"CERCA GENÈTICA DE FÓRMULA PER {args.target.upper()}")
+    print("=" * 70)
+
+    best = evolve(args.target, args.group, args.pop, args.gens, args.elite,
+                  args.workers, args.seed, args.resume)
+
+    print("\n" + "=" * 70)
+    print(f"Millor fórmula: {args.target.upper()} = {best['expr']}")
+    print(f"Precisió: {best['score']*100:.1f}% (generació {best['generation']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,39 +3,20 @@
 Analitza House 247: Quan usa cada valor de nibble 7?
 """
 
-import csv
+import sys
 from pathlib import Path
 
 BASE_DIR = Path(__file__).parent.parent
-DATA_FILE = BASE_DIR / "ec40_capturas_merged.csv"
+DATA_FILE = BASE_DIR.parent / "ec40_capturas_merged.csv"
+sys.path.insert(0, str(BASE_DIR.parent / "02_table_analysis"))
+
+from capture_index import CaptureIndex, format_epoch
 
 def analyze_house247_nib7():
-    data_247 = []
-    
-    with open(DATA_FILE, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                house = int(row['house'])
-                if house != 247:
-                    continue
-                
-                temp_c = float(row['temperature_C'])
-                channel = int(row['channel'])
-                payload_hex = row['payload64_hex']
-                
-                nibbles = [int(c, 16) for c in payload_hex]
-                nib7 = nibbles[7]
-                
-                data_247.append({
-                    'temp': temp_c,
-                    'channel': channel,
-                    'nib7': nib7,
-                    'payload': payload_hex
-                })
-                
-            except (ValueError, KeyError):
-                continue
+    index = CaptureIndex.from_csv([DATA_FILE])
+    sl = index.window(247)
+    data_247 = [{'temp': t, 'nib7': n, 'payload': p}
+                for t, n, p in zip(index.temp[sl], index.nib7[sl], index.payload[sl])]
     
     print(f"House 247: {len(data_247)} mostres\n")
     
@@ -72,6 +53,12 @@ def analyze_house247_nib7():
         unique_decimals = sorted(set(decimals))
         
         print(f"  Nib7={val:X}: Decimals={unique_decimals}")
+    
+    # Quan: sessions contigües de cada valor (RLE sobre l'índex temporal)
+    runs = index.runs(sl)
+    print(f"\nSessions per Nibble 7:")
+    for nib7, length, t0, t1 in zip(runs.nib7, runs.length, runs.t_start, runs.t_end):
+        print(f"  Nib7={nib7:X}: {length:4d} mostres, {format_epoch(t0)} -> {format_epoch(t1)}")
 
 if __name__ == "__main__":
     analyze_house247_nib7()
@@ -6,12 +6,13 @@ Genera i avalua milers d'hipòtesis matemàtiques.
 
 import csv
 import time
-import operator
 from pathlib import Path
 from collections import namedtuple
-import itertools
 
-BASE_DIR = Path(__file__).parent.parent
+from expr_dsl import T, M, H_LO, H_HI, H_KEY, dedup, evaluate, predict, columns_from_records
+from hypothesis_registry import HypothesisRegistry, dataset_fingerprint
+
+BASE_DIR = Path(__file__).parent.parent.parent
 DATA_FILE = BASE_DIR / "04_universal_mp_analysis" / "golden_master.csv"
 
 # Estructura de dades
@@ -31,33 +32,26 @@ def load_data():
     return data
 
 # --- PRIMITIVES ---
+# Les hipòtesis s'expressen amb el DSL d'expr_dsl:
+#   T = temp_idx, H = house, M = nibble M, H_LO/H_HI/H_KEY derivades de H
 
-def get_h_key(h): return h & 0x0B
-def get_h_lo(h): return h & 0x0F
-def get_h_hi(h): return (h >> 4) & 0xF
-
-# Operacions
-OPS = {
-    'XOR': operator.xor,
-    'AND': operator.and_,
-    'OR': operator.or_,
-    'ADD': lambda a, b: (a + b) & 0xF, # Modulo 16 per resultats de 4 bits
-    'SUB': lambda a, b: (a - b) & 0xF,
-}
+# Columnes del dataset per a l'avaluació vectoritzada
+COLUMNS = {'T': 't', 'H': 'h', 'M': 'm'}
 
 # --- GENERADOR D'HIPÒTESIS ---
 
 class Hypothesis:
-    def __init__(self, name, func):
+    def __init__(self, name, expr):
         self.name = name
-        self.func = func
+        self.expr = expr
+
+    def evaluate(self, columns, target):
+        """Nombre d'encerts sobre totes les files alhora."""
+        return evaluate(self.expr, columns, target)
 
-    def evaluate(self, record, target_attr):
-        try:
-            val = self.func(record)
-            return (val & 0xF) == getattr(record, target_attr)
-        except:
-            return False
+    def misses(self, columns, target):
+        """Màscara de les files on la hipòtesi falla."""
+        return predict(self.expr, columns) != target
 
 def generate_m_hypotheses():
     """Genera hipòtesis per M"""
@@ -67,25 +61,20 @@ def generate_m_hypotheses():
     # M sovint és una part alta de la temperatura
     for shift in range(1, 9):
         # Directe: M = (T >> shift)
-        hyps.append(Hypothesis(f"(T >> {shift})", 
-                               lambda r, s=shift: (r.t >> s)))
+        hyps.append(Hypothesis(f"(T >> {shift})", T >> shift))
         
         # Amb XOR House Key: M = (T >> shift) ^ H_key
-        hyps.append(Hypothesis(f"(T >> {shift}) ^ H_key", 
-                               lambda r, s=shift: (r.t >> s) ^ get_h_key(r.h)))
+        hyps.append(Hypothesis(f"(T >> {shift}) ^ H_key", (T >> shift) ^ H_KEY))
         
         # Amb XOR House Lo: M = (T >> shift) ^ H_lo
-        hyps.append(Hypothesis(f"(T >> {shift}) ^ H_lo", 
-                               lambda r, s=shift: (r.t >> s) ^ get_h_lo(r.h)))
+        hyps.append(Hypothesis(f"(T >> {shift}) ^ H_lo", (T >> shift) ^ H_LO))
                                
         # Amb XOR Constant: M = (T >> shift) ^ K
         for k in range(16):
-            hyps.append(Hypothesis(f"(T >> {shift}) ^ {k}", 
-                                   lambda r, s=shift, k=k: (r.t >> s) ^ k))
+            hyps.append(Hypothesis(f"(T >> {shift}) ^ {k}", (T >> shift) ^ k))
             
             # Combinat: M = (T >> shift) ^ H_key ^ K
-            hyps.append(Hypothesis(f"(T >> {shift}) ^ H_key ^ {k}", 
-                                   lambda r, s=shift, k=k: (r.t >> s) ^ get_h_key(r.h) ^ k))
+            hyps.append(Hypothesis(f"(T >> {shift}) ^ H_key ^ {k}", (T >> shift) ^ H_KEY ^ k))
 
     return hyps
 
@@ -96,39 +85,56 @@ def generate_p_hypotheses():
     # P pot dependre de M
     # P = M ^ K
     for k in range(16):
-        hyps.append(Hypothesis(f"M ^ {k}", lambda r, k=k: r.m ^ k))
-        hyps.append(Hypothesis(f"M ^ H_lo ^ {k}", lambda r, k=k: r.m ^ get_h_lo(r.h) ^ k))
-        hyps.append(Hypothesis(f"M ^ H_hi ^ {k}", lambda r, k=k: r.m ^ get_h_hi(r.h) ^ k))
+        hyps.append(Hypothesis(f"M ^ {k}", M ^ k))
+        hyps.append(Hypothesis(f"M ^ H_lo ^ {k}", M ^ H_LO ^ k))
+        hyps.append(Hypothesis(f"M ^ H_hi ^ {k}", M ^ H_HI ^ k))
     
     # P = (T >> S) ^ ...
     for shift in range(1, 9):
         for k in range(16):
-            hyps.append(Hypothesis(f"(T >> {shift}) ^ {k}", 
-                                   lambda r, s=shift, k=k: (r.t >> s) ^ k))
-            hyps.append(Hypothesis(f"(T >> {shift}) ^ M ^ {k}", 
-                                   lambda r, s=shift, k=k: (r.t >> s) ^ r.m ^ k))
-            hyps.append(Hypothesis(f"(T >> {shift}) ^ H_lo ^ {k}", 
-                                   lambda r, s=shift, k=k: (r.t >> s) ^ get_h_lo(r.h) ^ k))
+            hyps.append(Hypothesis(f"(T >> {shift}) ^ {k}", (T >> shift) ^ k))
+            hyps.append(Hypothesis(f"(T >> {shift}) ^ M ^ {k}", (T >> shift) ^ M ^ k))
+            hyps.append(Hypothesis(f"(T >> {shift}) ^ H_lo ^ {k}", (T >> shift) ^ H_LO ^ k))
 
     return hyps
 
+def dedup_hypotheses(hypotheses):
+    """Descarta hipòtesis algebraicament equivalents (forma canònica del DSL)."""
+    unique = dedup((h.name, h.expr) for h in hypotheses)
+    return [Hypothesis(name, expr) for name, expr in unique]
+
 # --- SOLVER ---
 
-def solve(data, target='m', hypotheses=None):
+def solve(data, target='m', hypotheses=None, registry=None):
     print(f"\nBuscant fórmula per '{target.upper()}' amb {len(hypotheses)} hipòtesis...")
     
+    hypotheses = dedup_hypotheses(hypotheses)
+    print(f"  {len(hypotheses)} hipòtesis úniques després de canonicalitzar")
+    
+    columns = columns_from_records(data, COLUMNS)
+    target_col = columns_from_records(data, {target: target})[target]
+    dataset = dataset_fingerprint(columns, target_col)
+    skipped = 0
+    
     best_score = -1
     best_hyps = []
     
     start_time = time.time()
     
     for i, hyp in enumerate(hypotheses):
-        matches = 0
-        for record in data:
-            if hyp.evaluate(record, target):
-                matches += 1
-        
-        score = matches / len(data)
+        cached = registry.lookup(hyp.expr, dataset, target) if registry else None
+        if cached is not None:
+            # Ja provada amb aquest mateix dataset
+            matches, score = cached
+            skipped += 1
+        elif registry:
+            t0 = time.perf_counter()
+            miss_mask = hyp.misses(columns, target_col)
+            matches, score = registry.record(hyp.expr, dataset, target, miss_mask,
+                                             time.perf_counter() - t0, hyp.name)
+        else:
+            matches = hyp.evaluate(columns, target_col)
+            score = matches / len(data)
         
         if score > best_score:
             best_score = score
@@ -142,10 +148,13 @@ def solve(data, target='m', hypotheses=None):
             
     elapsed = time.time() - start_time
     print(f"\nFinalitzat en {elapsed:.2f}s.")
+    if registry:
+        print(f"Dataset {dataset}: {skipped} hipòtesis ja registrades, "
+              f"{len(hypotheses) - skipped} noves avaluades.")
     print(f"Millor puntuació: {best_score*100:.1f}%")
     print("Millors fórmules:")
     for h in best_hyps[:5]:
-        print(f"  - {h.name}")
+        print(f"  - {h.name}  [{h.expr.source}]")
         
     return best_hyps
 
@@ -153,13 +162,15 @@ def main():
     data = load_data()
     print(f"Carregats {len(data)} registres.")
     
-    # 1. Buscar M
-    m_hyps = generate_m_hypotheses()
-    solve(data, 'm', m_hyps)
-    
-    # 2. Buscar P
-    p_hyps = generate_p_hypotheses()
-    solve(data, 'p', p_hyps)
+    # Les hipòtesis ja provades amb el mateix dataset no es tornen a avaluar
+    with HypothesisRegistry() as registry:
+        # 1. Buscar M
+        m_hyps = generate_m_hypotheses()
+        solve(data, 'm', m_hyps, registry)
+        
+        # 2. Buscar P
+        p_hyps = generate_p_hypotheses()
+        solve(data, 'p', p_hyps, registry)
 
 if __name__ == "__main__":
     main()
@@ -3,76 +3,42 @@
 Força bruta: Analitza la seqüència temporal EXACTA del nibble 7.
 """
 
-import csv
+import sys
 from pathlib import Path
-from datetime import datetime
 from collections import Counter
 
+import numpy as np
+
 BASE_DIR = Path(__file__).parent.parent
-DATA_FILE = BASE_DIR / "ec40_capturas_merged.csv"
+DATA_FILE = BASE_DIR.parent / "ec40_capturas_merged.csv"
+sys.path.insert(0, str(BASE_DIR.parent / "02_table_analysis"))
+
+from capture_index import CaptureIndex, format_epoch
 
 def discover_rolling_code_pattern():
-    # Carregar dades de House 247 amb timestamps
-    data_247 = []
-    
-    with open(DATA_FILE, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                house = int(row['house'])
-                if house != 247:
-                    continue
-                
-                timestamp_str = row['timestamp']
-                payload_hex = row['payload64_hex']
-                
-                nibbles = [int(c, 16) for c in payload_hex]
-                nib7 = nibbles[7]
-                
-                try:
-                    ts = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                except:
-                    continue
-                
-                data_247.append({
-                    'timestamp': ts,
-                    'nib7': nib7,
-                    'payload': payload_hex
-                })
-                
-            except (ValueError, KeyError):
-                continue
+    # Índex temporal: House 247 és un bloc contigu ja ordenat per timestamp
+    index = CaptureIndex.from_csv([DATA_FILE])
+    sl = index.window(247)
+    ts = index.ts[sl]
+    nib7_seq = index.nib7[sl]
     
-    # Ordenar per timestamp
-    data_247.sort(key=lambda x: x['timestamp'])
-    
-    print(f"House 247: {len(data_247)} mostres ordenades temporalment\n")
+    print(f"House 247: {len(nib7_seq)} mostres ordenades temporalment\n")
     
     # Mostrar seqüència temporal
     print("Seqüència temporal del nibble 7:")
     print("Timestamp           | Nib7 | Delta_seg")
     print("--------------------|------|----------")
     
-    prev_ts = None
-    sequence = []
+    deltas = np.diff(ts[:100], prepend=ts[:1])
     
-    for i, d in enumerate(data_247[:100]):  # Primeres 100 mostres
-        delta_sec = (d['timestamp'] - prev_ts).total_seconds() if prev_ts else 0
-        print(f"{d['timestamp']} |  {d['nib7']:X}   | {delta_sec:6.0f}s")
-        
-        sequence.append(d['nib7'])
-        prev_ts = d['timestamp']
+    for t, nib7, delta_sec in zip(ts[:100], nib7_seq[:100], deltas):  # Primeres 100 mostres
+        print(f"{format_epoch(t)} |  {nib7:X}   | {delta_sec:6.0f}s")
     
     # Analitzar transicions
     print(f"\nAnàlisi de transicions:")
     
-    transitions = {}
-    for i in range(1, len(data_247)):
-        prev_nib7 = data_247[i-1]['nib7']
-        curr_nib7 = data_247[i]['nib7']
-        
-        key = f"{prev_nib7:X} -> {curr_nib7:X}"
-        transitions[key] = transitions.get(key, 0) + 1
+    pairs, counts = np.unique(nib7_seq[:-1].astype(np.int16) * 16 + nib7_seq[1:], return_counts=True)
+    transitions = {f"{pair >> 4:X} -> {pair & 0xF:X}": int(c) for pair, c in zip(pairs, counts)}
     
     print("\nTransició           | Count")
     print("--------------------|------")
@@ -82,9 +48,6 @@ def discover_rolling_code_pattern():
     # Buscar patrons cíclics
     print(f"\nBuscant patrons cíclics...")
     
-    # Extreure només la seqüència de nibble 7
-    nib7_seq = [d['nib7'] for d in data_247]
-    
     # Buscar patró repetit
     for pattern_len in range(2, 20):
         # Comprovar si es repeteix
@@ -99,8 +62,19 @@ def discover_rolling_code_pattern():
             print(f"  ✓ Patró de longitud {pattern_len}: {[f'{n:X}' for n in pattern]}")
     
     # Comprovar si simplement rota entre els valors
-    print(f"\nValors únics: {sorted(set(nib7_seq))}")
-    print(f"Distribució: {Counter(nib7_seq)}")
+    print(f"\nValors únics: {sorted(set(nib7_seq.tolist()))}")
+    print(f"Distribució: {Counter(nib7_seq.tolist())}")
+    
+    # Sessions (RLE) i canvis de rolling code
+    runs = index.runs(sl)
+    print(f"\nSessions de nibble 7 (runs): {len(runs.nib7)}")
+    for nib7, length, a, b in zip(runs.nib7, runs.length, runs.t_start, runs.t_end):
+        print(f"  {nib7:X}: {length:4d} mostres  {format_epoch(a)} -> {format_epoch(b)}")
+    
+    events = index.transitions(sl=sl)
+    print(f"\nCanvis de rolling code: {len(events)}")
+    for e in events:
+        print(f"  {e.old:X} -> {e.new:X}  a {format_epoch(e.t_first)} (buit de {e.gap_s} s)")
 
 if __name__ == "__main__":
     discover_rolling_code_pattern()
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+DSL d'expressions per a la generació d'hipòtesis M/P.
+
+Cada hipòtesi és un AST petit sobre les variables del dataset (T, H, M, ...)
+amb els operadors ^ & | + - >> <<. Abans d'avaluar-les es canonicalitzen
+algebraicament perquè fórmules equivalents ((T >> 4) ^ H_lo vs H_lo ^ (T >> 4),
+màscares aplicades dues vegades, XOR amb 0, ...) quedin amb la mateixa clau i
+només s'avaluïn una vegada.
+
+Cada expressió canònica es compila a un kernel Python que opera sobre columnes
+NumPy senceres (una sola crida per hipòtesi) i es guarda en cache pel hash de
+l'expressió.
+
+Ús:
+    from expr_dsl import T, H, H_LO, parse, dedup, evaluate
+
+    e = (T >> 4) ^ H_LO
+    e2 = parse("H_lo ^ (T >> 4) & 0xFF")
+    assert canonicalize(e).key == canonicalize(e2).key
+"""
+
+import ast
+import hashlib
+
+import numpy as np
+
+# Bits que pot tenir cada variable (per eliminar màscares redundants).
+# T = temp_idx ((temp + 40) * 10, < 2048), H = house (8 bits), la resta nibbles.
+VAR_BITS = {
+    'T': 0x7FF,
+    'H': 0xFF,
+    'M': 0xF,
+    'P': 0xF,
+    'N7': 0xF,
+    'C': 0xF,
+}
+
+# Els resultats sempre es comparen amb un nibble
+RESULT_MASK = 0xF
+
+ALL_BITS = -1
+
+SHIFT_OPS = ('>>', '<<')
+
+
+class Expr:
+    """Node immutable de l'AST. `op` és 'var', 'const' o un operador."""
+
+    __slots__ = ('op', 'args', '_src')
+
+    def __init__(self, op, args):
+        self.op = op
+        self.args = tuple(args)
+        self._src = None
+
+    # --- Construcció amb operadors Python ---
+
+    def __xor__(self, other): return Expr('^', (self, _wrap(other)))
+    def __rxor__(self, other): return Expr('^', (_wrap(other), self))
+    def __and__(self, other): return Expr('&', (self, _wrap(other)))
+    def __rand__(self, other): return Expr('&', (_wrap(other), self))
+    def __or__(self, other): return Expr('|', (self, _wrap(other)))
+    def __ror__(self, other): return Expr('|', (_wrap(other), self))
+    def __add__(self, other): return Expr('+', (self, _wrap(other)))
+    def __radd__(self, other): return Expr('+', (_wrap(other), self))
+    def __sub__(self, other): return Expr('-', (self, _wrap(other)))
+    def __rsub__(self, other): return Expr('-', (_wrap(other), self))
+
+    def __rshift__(self, shift):
+        return Expr('>>', (self, int(shift)))
+
+    def __lshift__(self, shift):
+        return Expr('<<', (self, int(shift)))
+
+    # --- Representació ---
+
+    @property
+    def source(self):
+        """Codi font Python de l'expressió (també és la clau canònica)."""
+        if self._src is None:
+            self._src = _to_source(self, top=True)
+        return self._src
+
+    @property
+    def key(self):
+        return self.source
+
+    @property
+    def variables(self):
+        if self.op == 'var':
+            return {self.args[0]}
+        if self.op == 'const':
+            return set()
+        found = set()
+        for a in self.args:
+            if isinstance(a, Expr):
+                found |= a.variables
+        return found
+
+    def __eq__(self, other):
+        return isinstance(other, Expr) and self.source == other.source
+
+    def __hash__(self):
+        return hash(self.source)
+
+    def __repr__(self):
+        return f"Expr({self.source})"
+
+
+def var(name):
+    return Expr('var', (name,))
+
+
+def const(value):
+    return Expr('const', (int(value),))
+
+
+def _wrap(value):
+    return value if isinstance(value, Expr) else const(value)
+
+
+# Variables i derivades habituals
+T = var('T')
+H = var('H')
+M = var('M')
+P = var('P')
+N7 = var('N7')
+C = var('C')
+
+H_LO = H & 0x0F
+H_HI = (H >> 4) & 0x0F
+H_KEY = H & 0x0B
+
+ALIASES = {
+    'H_lo': H_LO,
+    'H_hi': H_HI,
+    'H_key': H_KEY,
+}
+
+
+def _fmt_const(value):
+    return str(value) if -10 < value < 10 else (f"0x{value:X}" if value > 0 else f"-0x{-value:X}")
+
+
+def _to_source(e, top=False):
+    if e.op == 'var':
+        return e.args[0]
+    if e.op == 'const':
+        return _fmt_const(e.args[0])
+    if e.op in SHIFT_OPS:
+        body = f"{_to_source(e.args[0])} {e.op} {e.args[1]}"
+    else:
+        body = f" {e.op} ".join(_to_source(a) for a in e.args)
+    return body if top else f"({body})"
+
+
+# --- PARSER ---
+
+_AST_OPS = {
+    ast.BitXor: '^',
+    ast.BitAnd: '&',
+    ast.BitOr: '|',
+    ast.Add: '+',
+    ast.Sub: '-',
+    ast.RShift: '>>',
+    ast.LShift: '<<',
+}
+
+
+def parse(text):
+    """Converteix una fórmula en text (sintaxi Python) a Expr."""
+    return _from_ast(ast.parse(text, mode='eval').body)
+
+
+def _from_ast(node):
+    if isinstance(node, ast.Name):
+        if node.id in ALIASES:
+            return ALIASES[node.id]
+        if node.id not in VAR_BITS:
+            raise ValueError(f"Variable desconeguda: {node.id}")
+        return var(node.id)
+    if isinstance(node, ast.Constant) and isinstance(node.value, int):
+        return const(node.value)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        inner = _from_ast(node.operand)
+        if inner.op == 'const':
+            return const(-inner.args[0])
+        return const(0) - inner
+    if isinstance(node, ast.BinOp) and type(node.op) in _AST_OPS:
+        op = _AST_OPS[type(node.op)]
+        left = _from_ast(node.left)
+        if op in SHIFT_OPS:
+            right = _from_ast(node.right)
+            if right.op != 'const':
+                raise ValueError("El desplaçament ha de ser constant")
+            return Expr(op, (left, right.args[0]))
+        return Expr(op, (left, _from_ast(node.right)))
+    raise ValueError(f"Expressió no suportada: {ast.dump(node)}")
+
+
+# --- CANONICALITZACIÓ ---
+
+def _known_bits(e):
+    """Màscara dels bits que poden valer 1 (ALL_BITS si no se sap)."""
+    op = e.op
+    if op == 'var':
+        return VAR_BITS.get(e.args[0], ALL_BITS)
+    if op == 'const':
+        return e.args[0] if e.args[0] >= 0 else ALL_BITS
+    if op == '&':
+        bits = ALL_BITS
+        for a in e.args:
+            bits &= _known_bits(a)
+        return bits
+    if op in ('^', '|'):
+        bits = 0
+        for a in e.args:
+            bits |= _known_bits(a)
+        return bits
+    if op == '>>':
+        return _known_bits(e.args[0]) >> e.args[1]
+    if op == '<<':
+        return _known_bits(e.args[0]) << e.args[1]
+    if op == '+':
+        masks = [_known_bits(a) for a in e.args]
+        if any(m < 0 for m in masks):
+            return ALL_BITS
+        width = max(m.bit_length() for m in masks) + (len(masks) - 1).bit_length()
+        return (1 << width) - 1
+    return ALL_BITS
+
+
+def _low_closure(need):
+    """Bits baixos dels quals depenen els bits `need` d'una suma/resta."""
+    if need < 0:
+        return ALL_BITS
+    return (1 << need.bit_length()) - 1
+
+
+def _sort_args(args):
+    return sorted(args, key=lambda a: (a.op == 'const', a.source))
+
+
+def _flatten(op, args):
+    flat = []
+    for a in args:
+        if a.op == op:
+            flat.extend(a.args)
+        else:
+            flat.append(a)
+    return flat
+
+
+def _canon(e, need):
+    if need == 0:
+        return const(0)
+
+    op = e.op
+    if op == 'var':
+        return e
+    if op == 'const':
+        return const(e.args[0] & need)
+
+    if op in ('^', '|'):
+        kids = _flatten(op, [_canon(a, need) for a in e.args])
+        consts = [k.args[0] for k in kids if k.op == 'const']
+        others = [k for k in kids if k.op != 'const']
+
+        if op == '^':
+            c = 0
+            for v in consts:
+                c ^= v
+            # x ^ x = 0
+            counts = {}
+            for k in others:
+                counts.setdefault(k.source, [k, 0])[1] += 1
+            others = [k for k, n in counts.values() if n % 2 == 1]
+        else:
+            c = 0
+            for v in consts:
+                c |= v
+            if need >= 0 and c & need == need:
+                return const(need)
+            others = list({k.source: k for k in others}.values())
+
+        c &= need
+        args = _sort_args(others) + ([const(c)] if c else [])
+        if not args:
+            return const(0)
+        if len(args) == 1:
+            return args[0]
+        return Expr(op, args)
+
+    if op == '&':
+        kids = _flatten('&', [_canon(a, need) for a in e.args])
+        mask = ALL_BITS
+        for k in kids:
+            if k.op == 'const':
+                mask &= k.args[0]
+        sub_need = need & mask
+        if sub_need == 0:
+            return const(0)
+        others = [k for k in kids if k.op != 'const']
+        if sub_need != need:
+            others = _flatten('&', [_canon(k, sub_need) for k in others])
+            others = [k for k in others if k.op != 'const'] + \
+                [k for k in others if k.op == 'const']
+            for k in others:
+                if k.op == 'const':
+                    mask &= k.args[0]
+            others = [k for k in others if k.op != 'const']
+        others = list({k.source: k for k in others}.values())
+        if not others:
+            return const(mask & need)
+
+        known = ALL_BITS
+        for k in others:
+            known &= _known_bits(k)
+        # La màscara sobra si no esborra cap bit que pugui valer 1 i es necessiti
+        if known & need & ~mask == 0:
+            args = _sort_args(others)
+        else:
+            args = _sort_args(others) + [const(mask & need if need >= 0 else mask)]
+        return args[0] if len(args) == 1 else Expr('&', args)
+
+    if op == '+':
+        low = _low_closure(need)
+        kids = _flatten('+', [_canon(a, low) for a in e.args])
+        c = sum(k.args[0] for k in kids if k.op == 'const') & low
+        others = [k for k in kids if k.op != 'const']
+        args = _sort_args(others) + ([const(c)] if c else [])
+        if not args:
+            return const(0)
+        return args[0] if len(args) == 1 else Expr('+', args)
+
+    if op == '-':
+        low = _low_closure(need)
+        a = _canon(e.args[0], low)
+        b = _canon(e.args[1], low)
+        if a.source == b.source:
+            return const(0)
+        if a.op == 'const' and b.op == 'const':
+            return const((a.args[0] - b.args[0]) & low)
+        if b.op == 'const':
+            return _canon(Expr('+', (a, const(-b.args[0]))), need)
+        return Expr('-', (a, b))
+
+    if op == '>>':
+        inner, shift = e.args
+        if inner.op == '>>':
+            return _canon(Expr('>>', (inner.args[0], inner.args[1] + shift)), need)
+        child_need = need << shift if need >= 0 else ALL_BITS
+        a = _canon(inner, child_need)
+        if shift == 0:
+            return a
+        if a.op == 'const':
+            return const((a.args[0] >> shift) & need)
+        if a.op == '>>':
+            return _canon(Expr('>>', (a.args[0], a.args[1] + shift)), need)
+        if _known_bits(a) >> shift == 0:
+            return const(0)
+        return Expr('>>', (a, shift))
+
+    if op == '<<':
+        inner, shift = e.args
+        if inner.op == '<<':
+            return _canon(Expr('<<', (inner.args[0], inner.args[1] + shift)), need)
+        child_need = need >> shift if need >= 0 else ALL_BITS
+        if child_need == 0:
+            return const(0)
+        a = _canon(inner, child_need)
+        if shift == 0:
+            return a
+        if a.op == 'const':
+            return const((a.args[0] << shift) & need)
+        return Expr('<<', (a, shift))
+
+    raise ValueError(f"Operador desconegut: {op}")
+
+
+def canonicalize(e, need=RESULT_MASK):
+    """
+    Forma canònica d'una expressió quan només importen els bits `need`
+    del resultat (per defecte el nibble baix).
+    """
+    prev = None
+    cur = e
+    # Algunes simplificacions n'habiliten d'altres: iterar fins a punt fix
+    while prev is None or cur.source != prev.source:
+        prev = cur
+        cur = _canon(cur, need)
+    return cur
+
+
+def expr_id(e):
+    """Identificador estable (hash) de l'expressió canònica."""
+    return hashlib.sha1(canonicalize(e).source.encode()).hexdigest()[:16]
+
+
+def dedup(hypotheses):
+    """
+    Elimina hipòtesis equivalents.
+
+    Args:
+        hypotheses: iterable de (nom, Expr)
+
+    Returns:
+        Llista de (nom, Expr canònica) sense duplicats (es conserva el primer nom)
+    """
+    seen = {}
+    for name, e in hypotheses:
+        ce = canonicalize(e)
+        if ce.source not in seen:
+            seen[ce.source] = (name, ce)
+    return list(seen.values())
+
+
+# --- COMPILADOR ---
+
+_KERNEL_CACHE = {}
+
+
+def compile_expr(e):
+    """
+    Compila l'expressió canònica a una funció vectoritzada.
+    El kernel rep les columnes (arrays NumPy) en l'ordre de `kernel.variables`.
+    """
+    ce = canonicalize(e)
+    kid = expr_id(ce)
+    kernel = _KERNEL_CACHE.get(kid)
+    if kernel is None:
+        names = sorted(ce.variables)
+        code = compile(f"lambda {', '.join(names)}: {ce.source}", f"<expr {kid}>", 'eval')
+        kernel = eval(code, {'__builtins__': {}})
+        kernel.variables = names
+        kernel.source = ce.source
+        _KERNEL_CACHE[kid] = kernel
+    return kernel
+
+
+def columns_from_records(records, mapping):
+    """
+    Construeix columnes NumPy a partir de registres.
+
+    Args:
+        records: llista d'objectes/namedtuples
+        mapping: {variable DSL: atribut del registre}, p.ex. {'T': 't', 'H': 'h'}
+    """
+    return {
+        name: np.fromiter((getattr(r, attr) for r in records), dtype=np.int64, count=len(records))
+        for name, attr in mapping.items()
+    }
+
+
+def predict(e, columns):
+    """Valor (nibble) predit per l'expressió per a cada fila."""
+    kernel = compile_expr(e)
+    n = len(next(iter(columns.values())))
+    values = kernel(*(columns[v] for v in kernel.variables))
+    return np.broadcast_to(np.asarray(values, dtype=np.int64) & RESULT_MASK, (n,))
+
+
+def evaluate(e, columns, target):
+    """Nombre de files on l'expressió encerta el nibble `target`."""
+    return int(np.count_nonzero(predict(e, columns) == target))
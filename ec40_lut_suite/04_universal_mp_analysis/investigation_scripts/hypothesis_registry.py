@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Registre persistent d'hipòtesis ja provades.
+
+Cada resultat es guarda en una base SQLite local indexada per:
+    (id canònic de la hipòtesi, empremta del dataset, nibble objectiu)
+
+i conté la puntuació, el conjunt de fallades (bitmap de files) i el temps
+d'execució. Els solvers consulten el registre abans d'avaluar, de manera que
+només es tornen a puntuar hipòtesis noves o datasets que han canviat.
+
+Ús:
+    python3 hypothesis_registry.py            # resum de l'esforç acumulat
+    python3 hypothesis_registry.py --top 20   # millors hipòtesis registrades
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from expr_dsl import canonicalize, expr_id
+
+BASE_DIR = Path(__file__).parent.parent
+REGISTRY_FILE = BASE_DIR / "hypothesis_registry.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    hyp_id      TEXT NOT NULL,
+    dataset     TEXT NOT NULL,
+    target      TEXT NOT NULL,
+    expr        TEXT NOT NULL,
+    name        TEXT,
+    n_rows      INTEGER NOT NULL,
+    matches     INTEGER NOT NULL,
+    score       REAL NOT NULL,
+    misses      BLOB NOT NULL,
+    elapsed_s   REAL NOT NULL,
+    created_at  REAL NOT NULL,
+    PRIMARY KEY (hyp_id, dataset, target)
+);
+CREATE INDEX IF NOT EXISTS idx_results_score ON results (dataset, target, score DESC);
+"""
+
+
+def dataset_fingerprint(columns, target_col):
+    """Empremta (hash) de les columnes d'entrada i de l'objectiu."""
+    h = hashlib.sha1()
+    for name in sorted(columns):
+        h.update(name.encode())
+        h.update(np.ascontiguousarray(columns[name], dtype=np.int64).tobytes())
+    h.update(b'target')
+    h.update(np.ascontiguousarray(target_col, dtype=np.int64).tobytes())
+    return h.hexdigest()[:16]
+
+
+def pack_misses(miss_mask):
+    """Bitmap comprimit de les files on la hipòtesi falla."""
+    return zlib.compress(np.packbits(np.asarray(miss_mask, dtype=bool)).tobytes())
+
+
+def unpack_misses(blob, n_rows):
+    bits = np.unpackbits(np.frombuffer(zlib.decompress(blob), dtype=np.uint8))
+    return np.flatnonzero(bits[:n_rows])
+
+
+class HypothesisRegistry:
+    """Accés al registre SQLite (es pot usar com a context manager)."""
+
+    def __init__(self, path=REGISTRY_FILE):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(SCHEMA)
+        self.hits = 0
+        self.new = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def lookup(self, expr, dataset, target):
+        """Retorna (matches, score) si la hipòtesi ja s'ha provat, o None."""
+        row = self.conn.execute(
+            "SELECT matches, score FROM results WHERE hyp_id=? AND dataset=? AND target=?",
+            (expr_id(expr), dataset, target)
+        ).fetchone()
+        if row is not None:
+            self.hits += 1
+        return row
+
+    def record(self, expr, dataset, target, miss_mask, elapsed_s, name=None):
+        n_rows = len(miss_mask)
+        matches = n_rows - int(np.count_nonzero(miss_mask))
+        score = matches / n_rows if n_rows else 0.0
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (expr_id(expr), dataset, target, canonicalize(expr).source, name,
+             n_rows, matches, score, pack_misses(miss_mask), elapsed_s, time.time())
+        )
+        self.new += 1
+        return matches, score
+
+    def misses(self, expr, dataset, target):
+        """Índexs de les files on la hipòtesi falla (None si no registrada)."""
+        row = self.conn.execute(
+            "SELECT misses, n_rows FROM results WHERE hyp_id=? AND dataset=? AND target=?",
+            (expr_id(expr), dataset, target)
+        ).fetchone()
+        return None if row is None else unpack_misses(*row)
+
+    def top(self, target=None, dataset=None, limit=10):
+        query = "SELECT target, dataset, score, expr, name FROM results"
+        conds, params = [], []
+        if target:
+            conds.append("target=?")
+            params.append(target)
+        if dataset:
+            conds.append("dataset=?")
+            params.append(dataset)
+        if conds:
+            query += " WHERE " + " AND ".join(conds)
+        query += " ORDER BY score DESC LIMIT ?"
+        params.append(limit)
+        return self.conn.execute(query, params).fetchall()
+
+    def summary(self):
+        """Esforç acumulat per dataset i objectiu."""
+        return self.conn.execute(
+            "SELECT dataset, target, COUNT(*), SUM(elapsed_s), MAX(score), "
+            "MIN(created_at), MAX(created_at) FROM results "
+            "GROUP BY dataset, target ORDER BY MAX(created_at)"
+        ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta el registre d'hipòtesis")
+    parser.add_argument('--db', type=Path, default=REGISTRY_FILE)
+    parser.add_argument('--top', type=int, default=0, help="Mostra les N millors hipòtesis")
+    parser.add_argument('--target', help="Filtra per nibble objectiu (m, p, ...)")
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        print(f"No hi ha registre a {args.db}")
+        return
+
+    with HypothesisRegistry(args.db) as reg:
+        print("=" * 70)
+        print("REGISTRE D'HIPÒTESIS")
+        print("=" * 70)
+        print("Dataset          | Obj | Provades | Temps (s) | Millor")
+        print("-----------------|-----|----------|-----------|-------")
+        total = 0
+        for dataset, target, count, elapsed, best, _, _ in reg.summary():
+            if args.target and target != args.target:
+                continue
+            total += count
+            print(f"{dataset} | {target.upper():>3} | {count:8d} | {elapsed:9.3f} | {best*100:.1f}%")
+        print(f"\nTotal hipòtesis registrades: {total}")
+
+        if args.top:
+            print(f"\nMillors {args.top}:")
+            for target, dataset, score, expr, name in reg.top(args.target, limit=args.top):
+                print(f"  {target.upper()} {score*100:5.1f}%  {expr}  ({name}) [{dataset}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,14 @@ Format estàndard: timestamp,house,channel,temperature_C,payload64_hex
 """
 
 import csv
+import sys
 from pathlib import Path
 from datetime import datetime
 
 BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR / '02_table_analysis'))
+
+from check_os21 import split_rows, quarantine
 
 # Fitxers d'entrada i sortida
 CSV_SOURCES = {
@@ -169,6 +173,13 @@ def merge_and_normalize_all():
             continue
         
         rows = normalize_csv(source_path, column_map)
+        
+        # Checksum OS21: les trames corruptes van a quarantena
+        rows, bad = split_rows(rows, 'payload64_hex')
+        if bad:
+            quarantine(bad, name, 'payload64_hex')
+            print(f"   🚧 {len(bad)} trames amb checksum incorrecte a quarantena")
+        
         stats[name] = len(rows)
         all_rows.extend(rows)
         
@@ -2,27 +2,61 @@
 """
 Prepara el dataset 'Golden Master' per a l'anàlisi de força bruta.
 Llegeix els CSVs, filtra outliers, i guarda en format optimitzat.
+
+El golden master és un dataset versionat:
+    golden_master.csv       estat actual (una fila per cel·la house+temp_idx)
+    golden_master_log.csv   registre de deltes: cada versió hi afegeix les
+                            cel·les noves (add), canviades (update) o
+                            eliminades (remove), amb el valor anterior
+    golden_master_sources.txt  CSVs afegits amb --add; la reconstrucció els
+                            llegeix junt amb CSV_FILES perquè les seves
+                            cel·les no es registrin com a eliminades
+
+Afegir una font també reconstrueix de totes les fonts: una lectura nova en
+una cel·la que ja té conflicte no s'hi pot afegir (la propera reconstrucció
+l'eliminaria), i una que contradiu una cel·la neta la converteix en conflicte.
+
+Els solvers guarden la versió amb què han puntuat i, amb changes_since(N),
+només tornen a puntuar els registres afectats (vegeu gp_search --resume).
+
+Ús:
+    python3 prepare_data.py                    # reconstrueix de totes les fonts
+    python3 prepare_data.py --add nova.csv     # registra la font i reconstrueix
+    python3 prepare_data.py --since 3          # què ha canviat des de la v3
 """
 
+import argparse
 import csv
+import os
+import sys
+import time
 from pathlib import Path
-from collections import defaultdict
 
 BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR / "02_table_analysis"))
+
+from online_mode import OnlineModeDetector, temp_to_idx
+
 OUTPUT_FILE = BASE_DIR / "04_universal_mp_analysis" / "golden_master.csv"
+LOG_FILE = BASE_DIR / "04_universal_mp_analysis" / "golden_master_log.csv"
+SOURCES_FILE = BASE_DIR / "04_universal_mp_analysis" / "golden_master_sources.txt"
 
-def load_and_clean_data():
-    CSV_FILES = [
-        BASE_DIR / "ec40_live.csv",
-        BASE_DIR / "ec40_live_1.csv", 
-        BASE_DIR / "ec40_capturas_merged.csv"
-    ]
-    
-    # Utilitzem un diccionari per filtrar duplicats i conflictes
-    # Key: (house, temp_idx) -> Value: list of (m, p)
-    data_map = defaultdict(list)
+FIELDNAMES = ['house', 'temp_idx', 'temp_c', 'm', 'p']
+LOG_FIELDNAMES = ['version', 'timestamp', 'op', 'house', 'temp_idx', 'temp_c',
+                  'm', 'p', 'old_m', 'old_p']
+
+CSV_FILES = [
+    BASE_DIR / "ec40_live.csv",
+    BASE_DIR / "ec40_live_1.csv", 
+    BASE_DIR / "ec40_capturas_merged.csv"
+]
+
+def load_and_clean_data(csv_files=CSV_FILES):
+    # Detector online per cel·la: Key: (house, temp_idx) -> Value: (m, p)
+    # No guarda la llista de lectures, només uns quants comptadors per cel·la
+    detector = OnlineModeDetector()
     
-    for csv_file in CSV_FILES:
+    for csv_file in csv_files:
         if not csv_file.exists():
             continue
             
@@ -34,16 +68,14 @@ def load_and_clean_data():
                     temp = float(row['temp'])
                     
                     # Convertir temp a index (0.1ºC resolució, offset -40)
-                    # idx = (temp + 40) * 10
-                    # Arrodonim per evitar errors de float
-                    temp_idx = int(round((temp + 40) * 10))
+                    temp_idx = temp_to_idx(temp)
                     
                     checksum_str = row.get('checksum_hex', row.get('R12', ''))
                     r12 = int(checksum_str, 16) if isinstance(checksum_str, str) else int(checksum_str)
                     m = (r12 >> 4) & 0xF
                     p = r12 & 0xF
                     
-                    data_map[(house, temp_idx)].append((m, p))
+                    detector.add((house, temp_idx), (m, p))
                     
                 except (ValueError, KeyError, TypeError):
                     continue
@@ -52,12 +84,10 @@ def load_and_clean_data():
     clean_data = []
     conflicts = 0
     
-    for (house, temp_idx), values in data_map.items():
+    for (house, temp_idx) in detector.cells:
         # Comprovar si tots els valors són iguals
-        unique_values = set(values)
-        
-        if len(unique_values) == 1:
-            m, p = list(unique_values)[0]
+        if not detector.conflicted((house, temp_idx)):
+            (m, p), _ = detector.mode((house, temp_idx))
             clean_data.append({
                 'house': house,
                 'temp_idx': temp_idx,
@@ -71,9 +101,9 @@ def load_and_clean_data():
             # O soroll en P
             # Per ara, els descartem per no contaminar l'anàlisi
             conflicts += 1
-            # Opcional: Podríem agafar el valor més freqüent
+            # Opcional: Podríem agafar detector.mode() (el valor més freqüent)
             
-    print(f"Processats {len(data_map)} punts únics (House+Temp).")
+    print(f"Processats {len(detector.cells)} punts únics (House+Temp).")
     print(f"Descartats {conflicts} punts per conflictes/inconsistència.")
     print(f"Dataset final: {len(clean_data)} registres.")
     
@@ -84,18 +114,165 @@ def save_golden_master(data):
         print("No hi ha dades per guardar!")
         return
         
-    fieldnames = ['house', 'temp_idx', 'temp_c', 'm', 'p']
-    
     # Assegurar directori
     OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(OUTPUT_FILE, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+    # Escriptura atòmica: els solvers poden estar llegint la versió anterior
+    tmp = OUTPUT_FILE.with_suffix('.tmp')
+    with open(tmp, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
         writer.writeheader()
         writer.writerows(data)
+    os.replace(tmp, OUTPUT_FILE)
         
     print(f"Guardat a: {OUTPUT_FILE}")
 
+# --- FONTS ---
+
+def read_sources():
+    """CSVs afegits amb --add (relatius a BASE_DIR si hi són a dins)."""
+    if not SOURCES_FILE.exists():
+        return []
+    with open(SOURCES_FILE, 'r') as f:
+        return [BASE_DIR / line.strip() for line in f if line.strip()]
+
+def add_sources(csv_files):
+    """Registra els CSVs perquè les reconstruccions els tornin a llegir."""
+    known = {p.resolve() for p in CSV_FILES + read_sources()}
+    new = []
+    for csv_file in csv_files:
+        path = Path(csv_file).resolve()
+        if path in known:
+            continue
+        known.add(path)
+        try:
+            new.append(str(path.relative_to(BASE_DIR.resolve())))
+        except ValueError:
+            new.append(str(path))
+    if new:
+        with open(SOURCES_FILE, 'a') as f:
+            f.writelines(line + '\n' for line in new)
+    return new
+
+# --- VERSIONS ---
+
+def load_golden_master():
+    """Estat actual: {(house, temp_idx): fila}, en l'ordre del fitxer."""
+    cells = {}
+    if not OUTPUT_FILE.exists():
+        return cells
+    with open(OUTPUT_FILE, 'r') as f:
+        for row in csv.DictReader(f):
+            row = {'house': int(row['house']), 'temp_idx': int(row['temp_idx']),
+                   'temp_c': float(row['temp_c']), 'm': int(row['m']), 'p': int(row['p'])}
+            cells[(row['house'], row['temp_idx'])] = row
+    return cells
+
+def read_log():
+    if not LOG_FILE.exists():
+        return []
+    with open(LOG_FILE, 'r') as f:
+        return list(csv.DictReader(f))
+
+def current_version():
+    """Última versió registrada (0 = golden master sense historial)."""
+    log = read_log()
+    return int(log[-1]['version']) if log else 0
+
+def _opt_int(value):
+    return int(value) if value not in ('', None) else None
+
+def changes_since(version):
+    """
+    Canvis nets des de `version` fins a l'actual.
+
+    Returns:
+        {(house, temp_idx): (old, new)} on old/new són (m, p) o None
+        (old None = cel·la nova, new None = cel·la eliminada).
+    """
+    changes = {}
+    for entry in read_log():
+        if int(entry['version']) <= version:
+            continue
+        key = (int(entry['house']), int(entry['temp_idx']))
+        old = (_opt_int(entry['old_m']), _opt_int(entry['old_p'])) if entry['op'] != 'add' else None
+        new = (int(entry['m']), int(entry['p'])) if entry['op'] != 'remove' else None
+        # Es conserva el valor anterior més antic i el valor nou més recent
+        changes[key] = (changes[key][0] if key in changes else old, new)
+    return {k: v for k, v in changes.items() if v[0] != v[1]}
+
+def update_golden_master(data, replace=True):
+    """
+    Aplica un conjunt de cel·les netes al golden master com a nova versió.
+
+    replace=True: `data` és el dataset complet (les cel·les que hi falten
+    s'eliminen). replace=False: només afegeix o sobreescriu cel·les.
+    Retorna la versió resultant (igual a l'actual si no hi ha canvis).
+    """
+    current = load_golden_master()
+    incoming = {(row['house'], row['temp_idx']): row for row in data}
+
+    deltas = []
+    for key, row in incoming.items():
+        old = current.get(key)
+        if old is None:
+            deltas.append(('add', row, None))
+        elif (old['m'], old['p']) != (row['m'], row['p']):
+            deltas.append(('update', row, old))
+    if replace:
+        deltas += [('remove', old, old) for key, old in current.items() if key not in incoming]
+
+    version = current_version()
+    if not deltas:
+        print(f"Cap canvi: el golden master continua a la versió {version}.")
+        return version
+
+    version += 1
+    now = time.strftime("%Y-%m-%d %H:%M:%S")
+    new_file = not LOG_FILE.exists()
+    with open(LOG_FILE, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=LOG_FIELDNAMES)
+        if new_file:
+            writer.writeheader()
+        for op, row, old in deltas:
+            writer.writerow({
+                'version': version, 'timestamp': now, 'op': op,
+                'house': row['house'], 'temp_idx': row['temp_idx'], 'temp_c': row['temp_c'],
+                'm': row['m'] if op != 'remove' else '', 'p': row['p'] if op != 'remove' else '',
+                'old_m': old['m'] if old else '', 'old_p': old['p'] if old else '',
+            })
+
+    if replace:
+        merged = list(incoming.values())
+    else:
+        current.update(incoming)
+        merged = list(current.values())
+    save_golden_master(merged)
+
+    counts = {op: sum(1 for d in deltas if d[0] == op) for op in ('add', 'update', 'remove')}
+    print(f"Versió {version}: {counts['add']} noves, {counts['update']} canviades, "
+          f"{counts['remove']} eliminades.")
+    return version
+
+def rebuild_golden_master(extra_sources=()):
+    """Registra `extra_sources` i reconstrueix el golden master de totes les fonts."""
+    for source in add_sources(extra_sources):
+        print(f"Font registrada: {source}")
+    data = load_and_clean_data(CSV_FILES + read_sources())
+    return update_golden_master(data)
+
 if __name__ == "__main__":
-    data = load_and_clean_data()
-    save_golden_master(data)
+    parser = argparse.ArgumentParser(description="Golden master versionat")
+    parser.add_argument('--add', nargs='+', metavar='CSV',
+                        help="Registrar noves captures com a font i reconstruir")
+    parser.add_argument('--since', type=int, metavar='N',
+                        help="Mostrar els canvis des de la versió N")
+    args = parser.parse_args()
+
+    if args.since is not None:
+        changes = changes_since(args.since)
+        print(f"Versió actual: {current_version()}  ({len(changes)} cel·les canviades des de la v{args.since})")
+        for (house, temp_idx), (old, new) in sorted(changes.items()):
+            print(f"  house {house:3d}  temp_idx {temp_idx:4d}  {old} -> {new}")
+    else:
+        rebuild_golden_master(args.add or ())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Stand-in for arduino-cli used to exercise the build cache and pipelined
+tuner without a toolchain or a Digispark attached.
+
+Supports the two sub-commands the tuners use:
+  compile -b FQBN --output-dir DIR SKETCH_DIR   -> DIR/<sketch>.ino.hex
+  upload  -b FQBN --input-dir DIR SKETCH_DIR    -> checks the hex exists
+
+Every call is appended to $FAKE_ARDUINO_CLI_LOG (if set) and compile sleeps
+$FAKE_ARDUINO_CLI_DELAY seconds (default 0.5) to mimic a real build.
+
+Usage:
+  ARDUINO_CLI=./fake_arduino_cli.py python3 pipeline_tune_rf.py --simulate
+"""
+import os
+import sys
+import time
+import hashlib
+import argparse
+from pathlib import Path
+
+
+def log(*parts):
+    path = os.environ.get("FAKE_ARDUINO_CLI_LOG")
+    if path:
+        with open(path, "a") as f:
+            f.write(" ".join(parts) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="arduino-cli")
+    parser.add_argument("command", choices=("compile", "upload"))
+    parser.add_argument("sketch")
+    parser.add_argument("-b", "--fqbn", required=True)
+    parser.add_argument("--output-dir")
+    parser.add_argument("--input-dir")
+    parser.add_argument("--upload", action="store_true")
+    parser.add_argument("-p", "--port")
+    args = parser.parse_args()
+
+    sketch = Path(args.sketch)
+    ino = sketch / f"{sketch.name}.ino"
+    if not ino.exists():
+        print(f"Error: {ino} not found", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == "compile":
+        time.sleep(float(os.environ.get("FAKE_ARDUINO_CLI_DELAY", "0.5")))
+        out = Path(args.output_dir or sketch / "build")
+        out.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha1(ino.read_bytes() + args.fqbn.encode()).hexdigest()
+        (out / f"{ino.name}.hex").write_text(f":00000001FF ; {digest}\n")
+        log("compile", args.fqbn, digest[:16])
+        print(f"Sketch uses 4242 bytes. Build: {out}")
+    else:
+        hexfile = Path(args.input_dir) / f"{ino.name}.hex"
+        if not hexfile.exists():
+            print(f"Error: {hexfile} not found", file=sys.stderr)
+            sys.exit(1)
+        log("upload", args.fqbn, hexfile.read_text().split()[-1][:16])
+        print("Upload done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Memoized EC40 frame cache.
+A frame depends only on (house, channel, nib7, temp_idx), so instead of
+running the generator for every reading, each (house, channel, nib7) gets
+a "plane": one fixed-size record per temp_idx holding the 8-byte payload
+and the 21-byte RAW168. Planes are filled lazily (or all at once with
+--warm), kept in memory with LRU eviction, and persisted to one compact
+file per plane so every emulator process shares the work. In steady state
+a frame is a single slice of an in-memory bytearray.
+
+temp_idx = round((temp_c + 40) * 10), the index used by the P LUTs in
+04_universal_mp_analysis; `channel` is the channel nibble of the payload
+(1, 2 or 4), as in build_ec40_post.
+
+Records are written in place with os.pwrite, so concurrent processes can
+share a cache directory: a miss first re-reads the record from the file
+and only runs the generator when nobody has filled it yet. File names carry
+a hash of the generator source (which holds the P/M tables) and of the
+builder, so a changed generator starts new planes instead of serving stale
+frames.
+
+Usage:
+  python3 frame_cache.py --house 131 --channel 1 --warm
+  python3 frame_cache.py --house 131 --channel 1 21.5 -3.2
+  python3 frame_cache.py --stats
+"""
+import os
+import sys
+import time
+import inspect
+import hashlib
+import argparse
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR / "ec40_lut_suite" / "02_table_analysis"))
+
+from gen_tramas_thn132n import build_ec40_post, build_raw_batch, build_raw_bytes_from_ec40_post, RAW_LEN_BYTES
+
+# --- CONFIGURATION ---
+CACHE_DIR = BASE_DIR / ".frame_cache"
+
+TEMP_MIN = -40.0
+TEMP_MAX = 60.0
+N_TEMPS = int(round((TEMP_MAX - TEMP_MIN) * 10)) + 1
+
+PAYLOAD_LEN = 8
+RECORD_LEN = PAYLOAD_LEN + RAW_LEN_BYTES   # 29 bytes
+MAX_PLANES = 64
+
+
+def temp_to_idx(temp_c):
+    idx = int(round((temp_c - TEMP_MIN) * 10))
+    if not 0 <= idx < N_TEMPS:
+        raise ValueError(f"temperature {temp_c} outside {TEMP_MIN}..{TEMP_MAX} C")
+    return idx
+
+
+def idx_to_temp(idx):
+    return round(idx / 10.0 + TEMP_MIN, 1)
+
+
+def builder_version(builder):
+    """Short hash of gen_tramas_thn132n (generator + P/M tables) and the builder's source."""
+    h = hashlib.sha1(Path(inspect.getsourcefile(build_ec40_post)).read_bytes())
+    try:
+        h.update(inspect.getsource(builder).encode())
+    except (OSError, TypeError):
+        h.update(getattr(builder, "__qualname__", repr(builder)).encode())
+    return h.hexdigest()[:8]
+
+
+def ec40_builder(house, channel, nib7, temp_c):
+    """gen_tramas_thn132n: nib7 follows from the P/M tables, so it must be None."""
+    if nib7 is not None:
+        raise ValueError("the ec40 builder derives nib7 itself; use nib7=None")
+    return build_ec40_post(temp_c, channel, house)
+
+
+BUILDERS = {"ec40": ec40_builder}
+
+
+class FrameCache:
+    """
+    frame(house, channel, nib7, temp_c) -> (payload, raw168) as bytes.
+
+    `builder(house, channel, nib7, temp_c)` returns the 8-byte post-reflect
+    payload; its name and builder_version() are part of the file names so
+    planes made by different generators, or by an older version of one,
+    never mix. cache_dir=None keeps everything in memory.
+    """
+
+    def __init__(self, builder="ec40", cache_dir=CACHE_DIR, max_planes=MAX_PLANES):
+        self.name = builder if isinstance(builder, str) else getattr(builder, "__name__", "custom")
+        self.builder = BUILDERS[builder] if isinstance(builder, str) else builder
+        self.version = builder_version(self.builder)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_planes = max_planes
+        self.planes = OrderedDict()
+        self.hits = 0
+        self.file_hits = 0
+        self.builds = 0
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def path(self, house, channel, nib7):
+        n = "x" if nib7 is None else f"{nib7:x}"
+        return self.cache_dir / f"{self.name}_{self.version}_h{house}_c{channel}_n{n}.bin"
+
+    def _plane(self, key):
+        plane = self.planes.get(key)
+        if plane is not None:
+            self.planes.move_to_end(key)
+            return plane
+
+        plane = bytearray(N_TEMPS * RECORD_LEN)
+        if self.cache_dir:
+            path = self.path(*key)
+            try:
+                # O_EXCL: only the process that creates the file sizes it, so a
+                # plane another process is filling is never truncated
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                with open(path, "rb") as f:
+                    data = f.read(len(plane))
+                plane[:len(data)] = data
+            else:
+                try:
+                    os.ftruncate(fd, N_TEMPS * RECORD_LEN)
+                finally:
+                    os.close(fd)
+        self.planes[key] = plane
+        if len(self.planes) > self.max_planes:
+            self.planes.popitem(last=False)
+        return plane
+
+    def _store(self, key, rows, records):
+        """Write records for the given temp indexes to memory and to the file."""
+        plane = self._plane(key)
+        fd = os.open(self.path(*key), os.O_WRONLY) if self.cache_dir else None
+        try:
+            for row, rec in zip(rows, records):
+                off = int(row) * RECORD_LEN
+                plane[off:off + RECORD_LEN] = rec.tobytes()
+                if fd is not None:
+                    os.pwrite(fd, rec.tobytes(), off)
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def _reload(self, key, idx):
+        """Pick up a record another process may have written since we loaded."""
+        if not self.cache_dir:
+            return False
+        fd = os.open(self.path(*key), os.O_RDONLY)
+        try:
+            rec = os.pread(fd, RECORD_LEN, idx * RECORD_LEN)
+        finally:
+            os.close(fd)
+        if len(rec) == RECORD_LEN and rec[0] == 0xEC:
+            self.planes[key][idx * RECORD_LEN:(idx + 1) * RECORD_LEN] = rec
+            return True
+        return False
+
+    def _build(self, key, rows):
+        house, channel, nib7 = key
+        payloads = [bytes(self.builder(house, channel, nib7, idx_to_temp(i))) for i in rows]
+        records = np.empty((len(rows), RECORD_LEN), dtype=np.uint8)
+        records[:, :PAYLOAD_LEN] = np.frombuffer(b"".join(payloads), dtype=np.uint8).reshape(-1, PAYLOAD_LEN)
+        records[:, PAYLOAD_LEN:] = build_raw_batch(records[:, :PAYLOAD_LEN])
+        self.builds += len(rows)
+        self._store(key, np.asarray(rows), records)
+
+    def record(self, house, channel, nib7, temp_c):
+        """Raw 29-byte record: payload followed by raw168."""
+        key = (house, channel, nib7)
+        off = temp_to_idx(temp_c) * RECORD_LEN
+        plane = self._plane(key)
+        # Every EC40 payload starts with 0xEC; zeros mean "not built yet"
+        if plane[off] != 0xEC:
+            if self._reload(key, off // RECORD_LEN):
+                self.file_hits += 1
+            else:
+                self._build(key, [off // RECORD_LEN])
+        else:
+            self.hits += 1
+        return plane[off:off + RECORD_LEN]
+
+    def frame(self, house, channel, nib7, temp_c):
+        rec = self.record(house, channel, nib7, temp_c)
+        return bytes(rec[:PAYLOAD_LEN]), bytes(rec[PAYLOAD_LEN:])
+
+    def payload(self, house, channel, nib7, temp_c):
+        return bytes(self.record(house, channel, nib7, temp_c)[:PAYLOAD_LEN])
+
+    def warm(self, house, channel, nib7=None):
+        """Precompute every missing temp_idx of a plane in one batch."""
+        key = (house, channel, nib7)
+        plane = np.frombuffer(self._plane(key), dtype=np.uint8).reshape(N_TEMPS, RECORD_LEN)
+        missing = np.flatnonzero(plane[:, 0] != 0xEC)
+        if len(missing):
+            self._build(key, missing)
+        return len(missing)
+
+    def stats(self):
+        return {"planes": len(self.planes), "hits": self.hits,
+                "file_hits": self.file_hits, "builds": self.builds}
+
+
+def list_planes(cache_dir=CACHE_DIR):
+    """(file name, filled records) for every plane on disk."""
+    planes = []
+    for path in sorted(Path(cache_dir).glob("*.bin")):
+        data = np.fromfile(path, dtype=np.uint8)
+        n = len(data) // RECORD_LEN
+        filled = int(np.count_nonzero(data[:n * RECORD_LEN].reshape(n, RECORD_LEN)[:, 0] == 0xEC))
+        planes.append((path.name, filled))
+    return planes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoized EC40 frame cache")
+    parser.add_argument("temp", nargs="*", type=float, help="Temperatures to look up")
+    parser.add_argument("--house", type=int, default=247)
+    parser.add_argument("--channel", type=int, default=1, help="Channel nibble (1, 2 or 4)")
+    parser.add_argument("--builder", default="ec40", choices=sorted(BUILDERS))
+    parser.add_argument("--cache-dir", default=str(CACHE_DIR))
+    parser.add_argument("--warm", action="store_true", help="Precompute the whole plane")
+    parser.add_argument("--stats", action="store_true", help="List planes on disk")
+    parser.add_argument("--bench", type=int, metavar="N", help="Time N random lookups")
+    args = parser.parse_args()
+
+    cache = FrameCache(args.builder, args.cache_dir)
+
+    if args.stats:
+        for name, filled in list_planes(args.cache_dir):
+            print(f"  {name:32} {filled:5d}/{N_TEMPS} temps")
+        return
+
+    if args.warm:
+        t0 = time.perf_counter()
+        built = cache.warm(args.house, args.channel)
+        print(f"✓ House {args.house} ch {args.channel}: {built} frames built in "
+              f"{(time.perf_counter() - t0)*1000:.1f} ms -> {cache.path(args.house, args.channel, None)}")
+
+    for t in args.temp:
+        payload, raw = cache.frame(args.house, args.channel, None, t)
+        print(f"{t:6.1f} C  {payload.hex()}  {raw.hex()}")
+
+    if args.bench:
+        temps = np.round(np.random.default_rng(0).uniform(15, 30, args.bench), 1)
+        t0 = time.perf_counter()
+        for t in temps:
+            cache.frame(args.house, args.channel, None, float(t))
+        cached = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for t in temps:
+            build_raw_bytes_from_ec40_post(build_ec40_post(float(t), args.channel, args.house))
+        fresh = time.perf_counter() - t0
+        print(f"📊 {args.bench} frames: cache {args.bench/cached:.0f}/s, "
+              f"generator {args.bench/fresh:.0f}/s  {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Model-based RF tuning script.
+Instead of damped proportional steps, fits a per-device linear model
+measured = A * configured + b over every flashed iteration and jumps
+straight to the configuration that predicts the target widths
+(see tune_rf.PulseModel). Typical run: measure -> jump -> refine once.
+
+Usage:
+  python3 model_tune_rf.py
+  python3 model_tune_rf.py --no-initial-flash --steps 3
+  python3 model_tune_rf.py --strategy simulate     # synthetic device, no hardware
+"""
+import sys
+
+from tune_rf import main
+
+if __name__ == "__main__":
+    main(["--strategy", "auto", "--profile", "reference", "--controller", "model",
+          "--steps", "3"] + sys.argv[1:])
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Concurrent multi-device RF tuning.
+Several Digisparks are tuned at once: each board gets its own house code
+and channel (patched into a per-board copy of the sketch), all builds are
+compiled in the background, and a single rtl_433 listener is shared. Its
+stream is demultiplexed by the decoded house/channel of each packet, so every
+board gets its own pulse statistics and its own model-based adjustment.
+
+Uploads are serialized: every board's bootloader has the same VID/PID
+(16d0:0753), so each upload is preceded by a reset of that board's own hub
+port (usb_reset --digispark --port/--name) and only that board is in the
+bootloader when micronucleus runs. The hub port is the optional fourth field
+of --board; without it usb_reset uses the port remembered under the board
+name (usb_reset.py --learn --name NAME).
+
+Usage:
+  python3 multi_tune_rf.py --board a:131:1:1-1.2 --board b:132:2:1-1.3 --board c:133:3:1-1.4
+  python3 multi_tune_rf.py --board a:131:1 --board b:132:2 --simulate
+  python3 multi_tune_rf.py --board a:131:1 --board b:132:2 --replay multi.txt
+  python3 multi_tune_rf.py --board a:131:1 --board b:132:2 --record-synthetic multi.txt
+"""
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import subprocess
+from collections import namedtuple
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "ec40_lut_suite" / "02_table_analysis"))
+
+from gen_tramas_thn132n import CHANNEL_CODES
+from build_cache import BuildCache, ARDUINO_CLI, FQBN
+from rf_measure import PulseEstimator, iter_packets
+from tune_rf import (
+    INO_FILE,
+    HISTORY_FILE,
+    PulseModel,
+    SimulatedDevice,
+    within_tolerance,
+    load_profiles,
+    load_history,
+    save_history,
+    warm_start,
+    read_current_values,
+    reset_usb,
+)
+
+WORK_DIR = Path(__file__).parent / ".multi_tune"
+RTL_433_CMD = ["rtl_433", "-R", "12", "-A", "-F", "json", "-T", "90"]
+
+Board = namedtuple("Board", ["name", "house", "channel", "usb_port"])
+
+EVENT_KV_RE = re.compile(r"House Code\s*:\s*(\d+).*?Channel\s*:\s*(\d+)", re.S)
+
+
+def parse_board(text):
+    try:
+        name, house, channel, *port = text.split(":")
+        if len(port) > 1:
+            raise ValueError
+        board = Board(name, int(house), int(channel), port[0] if port else None)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected NAME:HOUSE:CHANNEL[:USBPORT], got {text}")
+    if board.channel not in CHANNEL_CODES or not 0 <= board.house <= 255:
+        raise argparse.ArgumentTypeError(f"invalid house/channel in {text}")
+    return board
+
+
+def board_sketch(board, ino_file=INO_FILE):
+    """Per-board copy of the sketch with its own house code and channel."""
+    with open(ino_file, "r") as f:
+        content = f.read()
+    for name, value in (("g_channel", CHANNEL_CODES[board.channel]), ("g_device_id", board.house)):
+        content, n = re.subn(rf"(const\s+uint8_t\s+{name}\s*=\s*)(\d+);", f"\\g<1>{value};", content)
+        if n != 1:
+            raise ValueError(f"{name} not found in {ino_file}")
+    path = WORK_DIR / board.name / Path(ino_file).name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return path
+
+
+# --- DEMULTIPLEXING ---
+
+def event_key(lines):
+    """(house, channel) of the decoded THN132N event in a packet segment."""
+    for line in lines:
+        line = line.strip()
+        if line.startswith("{"):
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "id" in event and "channel" in event:
+                return int(event["id"]), int(event["channel"])
+    m = EVENT_KV_RE.search("\n".join(lines))
+    return (int(m.group(1)), int(m.group(2))) if m else None
+
+
+def iter_tagged_packets(lines):
+    """
+    Yield ((house, channel), packet) from a shared rtl_433 -A stream.
+    Output is split into segments at each "Detected OOK package"; the decoded
+    event and the pulse analysis of one transmission share a segment
+    regardless of the order they were printed in.
+    """
+    segment = []
+
+    def flush():
+        key = event_key(segment)
+        for packet in iter_packets(segment):
+            yield key, packet
+
+    for line in lines:
+        if "Detected OOK package" in line and segment:
+            yield from flush()
+            segment = []
+        segment.append(line)
+    if segment:
+        yield from flush()
+
+
+def listen(lines, boards, estimators, on_stop=None):
+    """Feed tagged packets to each board's estimator until all have converged."""
+    by_key = {(b.house, b.channel): b.name for b in boards}
+    unknown = 0
+    for key, packet in iter_tagged_packets(lines):
+        name = by_key.get(key)
+        if name is None:
+            unknown += 1
+            continue
+        estimators[name].add(packet)
+        if all(e.converged() for e in estimators.values()):
+            if on_stop:
+                on_stop()
+            break
+    return unknown
+
+
+# --- SYNTHETIC STREAM (replay stand-in) ---
+
+def synthetic_stream(boards, devices, configs, packets_per_board=8, seed=None):
+    """rtl_433-like interleaved output for simulated boards."""
+    rng = random.Random(seed)
+    order = [b for b in boards for _ in range(packets_per_board)]
+    rng.shuffle(order)
+    for board in order:
+        devices[board.name].flash(configs[board.name])
+        h, l, g = devices[board.name].measure()
+        event = {"model": "Oregon-THN132N", "id": board.house, "channel": board.channel,
+                 "temperature_C": round(rng.uniform(15, 25), 1)}
+        yield "Detected OOK package\t@0.0s"
+        # The decoded event may be printed before or after the analysis
+        event_first = rng.random() < 0.5
+        if event_first:
+            yield json.dumps(event)
+        yield "Analyzing pulses..."
+        yield "Pulse width distribution:"
+        yield " [ 0] count:  132,  width: 1008 us [1000;1020]\t( 252 S)"
+        yield f" [ 1] count:   63,  width:  {h} us [{h-8};{h+8}]\t( 124 S)"
+        yield "Gap width distribution:"
+        yield " [ 0] count:  129,  width:  960 us [948;972]\t( 240 S)"
+        yield f" [ 1] count:   64,  width:  {l} us [{l-8};{l+8}]\t( 118 S)"
+        yield f" [ 2] count:    1,  width: {g} us [{g};{g}]\t(2197 S)"
+        yield "Level estimates [high, low]:  15901,     13"
+        if not event_first:
+            yield json.dumps(event)
+
+
+# --- ORCHESTRATION ---
+
+def flash_all(boards, caches, configs):
+    """
+    Upload the boards one at a time, each right after resetting its own hub
+    port, so the single bootloader on the bus is always the intended board.
+    The build is awaited before the reset: the bootloader window is too short
+    to compile in.
+    """
+    flashed = {}
+    for board in boards:
+        flashed[board.name] = False
+        try:
+            caches[board.name].build(*configs[board.name])
+        except Exception as e:
+            print(f"✗ {board.name}: build failed: {e}")
+            continue
+        print(f"\n🔌 {board.name}: port {board.usb_port or '(remembered)'}")
+        if not reset_usb(board.usb_port, board.name):
+            print(f"✗ {board.name}: bootloader not reached, skipping upload")
+            continue
+        try:
+            caches[board.name].upload(*configs[board.name])
+            flashed[board.name] = True
+        except Exception as e:
+            print(f"✗ {board.name}: flash failed: {e}")
+    return flashed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent multi-device RF tuner")
+    parser.add_argument("--board", type=parse_board, action="append", required=True,
+                        help="NAME:HOUSE:CHANNEL[:USBPORT] (repeat per board)")
+    parser.add_argument("--profile", default="reference")
+    parser.add_argument("--rounds", type=int, default=3, help="Max flash/listen rounds")
+    parser.add_argument("--cli", default=ARDUINO_CLI)
+    parser.add_argument("--fqbn", default=FQBN)
+    parser.add_argument("--simulate", action="store_true", help="Synthetic boards and stream")
+    parser.add_argument("--replay", help="Replay a recorded shared rtl_433 stream")
+    parser.add_argument("--replay-config", type=int, nargs=3, metavar=("HIGH", "LOW", "GAP"),
+                        help="Firmware values the replay was recorded with")
+    parser.add_argument("--record-synthetic", help="Write a synthetic shared stream and exit")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    boards = args.board
+    keys = [(b.house, b.channel) for b in boards]
+    if len(set(keys)) != len(keys):
+        print("✗ Every board needs a distinct house/channel pair")
+        sys.exit(1)
+
+    profile = load_profiles()[args.profile]
+    target = (profile.high, profile.low, profile.gap)
+    base = read_current_values(INO_FILE)
+    offline = args.simulate or args.replay or args.record_synthetic
+    strategy = "multi-simulate" if args.simulate else "multi-replay" if args.replay else "multi"
+    devices = {b.name: SimulatedDevice(None if args.seed is None else args.seed + i)
+               for i, b in enumerate(boards)}
+
+    if args.record_synthetic:
+        configs = {b.name: base for b in boards}
+        with open(args.record_synthetic, "w") as f:
+            for line in synthetic_stream(boards, devices, configs, seed=args.seed):
+                f.write(line + "\n")
+        print(f"✓ Wrote synthetic stream for {len(boards)} boards to {args.record_synthetic}")
+        return
+
+    history = load_history(HISTORY_FILE)
+    configs, models, sessions = {}, {}, {}
+    for b in boards:
+        start, observations = warm_start(history, b.name, profile, not offline, strategy)
+        configs[b.name] = start or base
+        models[b.name] = PulseModel(configs[b.name], profile.min_val, profile.max_val)
+        for obs in observations:
+            models[b.name].add(*obs)
+        sessions[b.name] = {
+            "device": b.name, "profile": profile.name, "strategy": strategy,
+            "controller": "model", "hardware": not offline,
+            "started": time.strftime("%Y-%m-%d %H:%M:%S"), "target": list(target),
+            "house": b.house, "channel": b.channel,
+            "iterations": [], "final": None, "converged": False,
+        }
+        history.append(sessions[b.name])
+
+    caches = {} if offline else {
+        b.name: BuildCache(sketch=board_sketch(b), fqbn=args.fqbn, cli=args.cli) for b in boards
+    }
+    pending = list(boards)
+    print(f"🎯 Profile {profile.name}: High={target[0]}, Low={target[1]}, Gap={target[2]}")
+    print(f"📡 Boards: {', '.join(f'{b.name} (house {b.house}, ch {b.channel})' for b in boards)}")
+
+    t_start = time.time()
+    for rnd in range(args.rounds):
+        print(f"\n--- Round {rnd+1}/{args.rounds}: {len(pending)} board(s) ---")
+        for b in pending:
+            print(f"📋 {b.name}: High={configs[b.name][0]}, Low={configs[b.name][1]}, Gap={configs[b.name][2]}")
+
+        if not offline:
+            for b in pending:
+                caches[b.name].submit(*configs[b.name])
+            flashed = flash_all(pending, caches, configs)
+            pending = [b for b in pending if flashed[b.name]]
+
+        # One shared listener for all boards
+        estimators = {b.name: PulseEstimator() for b in pending}
+        if args.simulate:
+            unknown = listen(synthetic_stream(pending, devices, configs, seed=rnd), pending, estimators)
+        elif args.replay:
+            with open(args.replay, "r") as f:
+                unknown = listen(f, pending, estimators)
+        else:
+            print("⏱  Listening with rtl_433 (shared, adaptive)...")
+            proc = subprocess.Popen(RTL_433_CMD, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    text=True, bufsize=1)
+            try:
+                unknown = listen(proc.stdout, pending, estimators, on_stop=proc.terminate)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=5)
+        if unknown:
+            print(f"   ({unknown} packets from other sensors ignored)")
+
+        still_pending = []
+        for b in pending:
+            est = estimators[b.name]
+            measured = (est.estimate("pulse"), est.estimate("gap"), est.estimate("frame_gap"))
+            if args.replay:
+                replay_config = tuple(args.replay_config or base)
+                measured = tuple(None if m is None else m + c - r
+                                 for m, c, r in zip(measured, configs[b.name], replay_config))
+            print(f"\n📊 {b.name}: High={measured[0]}, Low={measured[1]}, Gap={measured[2]} "
+                  f"({est.packets} packets)")
+            if measured[0] is None or measured[1] is None:
+                print(f"   ✗ No frames from house {b.house} ch {b.channel}")
+                continue
+
+            session = sessions[b.name]
+            models[b.name].add(configs[b.name], measured)
+            session["iterations"].append({"config": list(configs[b.name]), "measured": list(measured),
+                                          "t": round(time.time() - t_start, 1)})
+            session["final"] = list(configs[b.name])
+
+            err = tuple(None if m is None else t - m for t, m in zip(target, measured))
+            if within_tolerance(err):
+                session["converged"] = True
+                print(f"   ✅ CONVERGED: High={configs[b.name][0]}, Low={configs[b.name][1]}, "
+                      f"Gap={configs[b.name][2]}")
+                continue
+            configs[b.name] = models[b.name].solve(target, configs[b.name])
+            print(f"   🔄 Next: High={configs[b.name][0]}, Low={configs[b.name][1]}, Gap={configs[b.name][2]}")
+            still_pending.append(b)
+
+        save_history(history, HISTORY_FILE)
+        pending = still_pending
+        if not pending:
+            break
+
+    for cache in caches.values():
+        cache.close()
+
+    done = sum(s["converged"] for s in sessions.values())
+    print(f"\n🏁 {done}/{len(boards)} boards converged in {time.time() - t_start:.1f}s")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠  Interrupted by user.")
+        sys.exit(0)
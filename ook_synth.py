@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Host-side OOK pulse-train synthesizer.
+Turns EC40 payloads into the same waveform the firmware transmits
+(send_bits_ook / build_raw_ook_frame) and exports it for rtl_433:
+
+  .ook  pulse text  ->  rtl_433 -r frames.ook
+  .cu8  IQ samples  ->  rtl_433 -r frames_433.92M_250k.cu8
+
+Each of the 168 RAW bits is one symbol: bit 1 = HIGH then LOW, bit 0 = LOW
+then HIGH, with HIGH_UNIT_US / LOW_UNIT_US taken from the tuned .ino.
+The frame is sent twice, separated by INTER_FRAME_GAP_US.
+"""
+import re
+import sys
+import time
+import argparse
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR / "ec40_lut_suite" / "02_table_analysis"))
+
+from gen_tramas_thn132n import build_ec40_post, build_raw_batch
+
+# --- CONFIGURATION ---
+INO_FILE = BASE_DIR / "attiny" / "attiny85THN132N_aht20.ino"
+
+REPEATS = 2
+SAMPLE_RATE = 250000
+CENTER_FREQ = 433920000
+
+Timings = namedtuple("Timings", ["high_us", "low_us", "gap_us"])
+PulseTrain = namedtuple("PulseTrain", ["pulses", "gaps"])
+
+# ESP32 RMT firmware: symmetric T_UNIT and delay(10) between repeats
+ESP32_TIMINGS = Timings(488, 488, 10000)
+
+
+def read_timings(filename=INO_FILE):
+    with open(filename, "r") as f:
+        content = f.read()
+
+    values = []
+    for name in ("HIGH_UNIT_US", "LOW_UNIT_US", "INTER_FRAME_GAP_US"):
+        match = re.search(rf"const\s+uint16_t\s+{name}\s*=\s*(\d+);", content)
+        if not match:
+            raise ValueError(f"{name} not found in {filename}")
+        values.append(int(match.group(1)))
+    return Timings(*values)
+
+
+def half_symbols(raw):
+    """N x 21 RAW bytes -> N x 336 carrier levels (two half-symbols per bit)."""
+    bits = np.unpackbits(raw, axis=1)  # MSB-first, same as hex_string_to_bits
+    levels = np.empty((len(bits), bits.shape[1] * 2), dtype=np.uint8)
+    levels[:, 0::2] = bits
+    levels[:, 1::2] = 1 - bits
+    return levels
+
+
+def synthesize_batch(payloads, timings, repeats=REPEATS, jitter_us=0.0, tail_us=None, seed=None):
+    """
+    Synthesize one PulseTrain per EC40 post-reflect payload.
+
+    pulses[i] is a carrier-on width and gaps[i] the carrier-off time that
+    follows it (µs). Consecutive half-symbols at the same level are merged,
+    so a train has ~100 pulses per frame copy. The last gap is `tail_us`
+    (defaults to the inter-frame gap).
+    """
+    rng = np.random.default_rng(seed)
+    tail_us = timings.gap_us if tail_us is None else tail_us
+
+    levels = half_symbols(build_raw_batch(payloads))
+    n, width = levels.shape
+
+    # Run-length encode every frame at once (each row starts a new run)
+    starts = np.ones(levels.shape, dtype=bool)
+    starts[:, 1:] = levels[:, 1:] != levels[:, :-1]
+    flat_starts = np.flatnonzero(starts)
+    run_len = np.diff(np.append(flat_starts, levels.size))
+    run_level = levels.ravel()[flat_starts]
+    run_dur = run_len * np.where(run_level, timings.high_us, timings.low_us)
+    bounds = np.searchsorted(flat_starts // width, np.arange(n + 1))
+
+    trains = []
+    for i in range(n):
+        lv = run_level[bounds[i]:bounds[i + 1]]
+        dur = run_dur[bounds[i]:bounds[i + 1]]
+
+        # Leading carrier-off time is silence before the first pulse
+        lead = 0
+        if lv[0] == 0:
+            lead = dur[0]
+            dur = dur[1:]
+
+        pulses = dur[0::2]
+        gaps = dur[1::2]
+        if len(gaps) < len(pulses):
+            gaps = np.append(gaps, 0)
+
+        all_pulses = np.tile(pulses, repeats)
+        all_gaps = np.tile(gaps, repeats)
+        ends = np.arange(1, repeats + 1) * len(gaps) - 1
+        all_gaps[ends[:-1]] += timings.gap_us + lead
+        all_gaps[ends[-1]] += tail_us
+
+        if jitter_us:
+            all_pulses = all_pulses + rng.normal(0, jitter_us, len(all_pulses))
+            all_gaps = all_gaps + rng.normal(0, jitter_us, len(all_gaps))
+        trains.append(PulseTrain(np.maximum(np.rint(all_pulses), 1).astype(np.int32),
+                                 np.maximum(np.rint(all_gaps), 1).astype(np.int32)))
+    return trains
+
+
+def synthesize(payload, timings, **kwargs):
+    return synthesize_batch([bytes(payload)], timings, **kwargs)[0]
+
+
+# --- EXPORT ---
+
+def write_ook(filename, trains, sample_rate=SAMPLE_RATE, freq=CENTER_FREQ):
+    """rtl_433 pulse data file: one ;ook ... ;end block per train."""
+    with open(filename, "w") as f:
+        f.write(";pulse data\n")
+        f.write(";version 1\n")
+        f.write(";timescale 1us\n")
+        f.write(f";created {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        for train in trains:
+            f.write(f";ook {len(train.pulses)} pulses\n")
+            f.write(f";freq1 {freq}\n")
+            f.write(f";samplerate {sample_rate} Hz\n")
+            f.write("".join(f"{p} {g}\n" for p, g in zip(train.pulses.tolist(), train.gaps.tolist())))
+            f.write(";end\n")
+
+
+def render_iq(train, sample_rate=SAMPLE_RATE, freq_offset=0.0, amplitude=0.8, lead_us=10000):
+    """Complex baseband samples of a pulse train (carrier at freq_offset Hz)."""
+    durations = np.empty(2 * len(train.pulses), dtype=np.int64)
+    durations[0::2] = train.pulses
+    durations[1::2] = train.gaps
+    edges = np.rint((lead_us + np.concatenate(([0], np.cumsum(durations)))) * sample_rate / 1e6).astype(np.int64)
+
+    n_samples = edges[-1]
+    env = np.zeros(n_samples + 1, dtype=np.float32)
+    np.add.at(env, edges[0:-1:2], 1.0)
+    np.add.at(env, edges[1::2], -1.0)
+    env = np.cumsum(env[:-1])
+
+    if freq_offset:
+        phase = np.exp(2j * np.pi * freq_offset / sample_rate * np.arange(n_samples))
+        return (amplitude * env * phase).astype(np.complex64)
+    return (amplitude * env).astype(np.complex64)
+
+
+def iq_to_cu8(iq):
+    out = np.empty(2 * len(iq), dtype=np.uint8)
+    out[0::2] = np.clip(np.rint(127.5 + 127.5 * iq.real), 0, 255)
+    out[1::2] = np.clip(np.rint(127.5 + 127.5 * iq.imag), 0, 255)
+    return out
+
+
+def write_cu8(filename, trains, sample_rate=SAMPLE_RATE, freq_offset=0.0):
+    """
+    Raw interleaved uint8 I/Q. Name the file like frames_433.92M_250k.cu8
+    so rtl_433 picks up frequency and sample rate from it.
+    """
+    with open(filename, "wb") as f:
+        for train in trains:
+            f.write(iq_to_cu8(render_iq(train, sample_rate, freq_offset)).tobytes())
+
+
+# --- CLI ---
+
+def payloads_from_args(args):
+    if args.payload:
+        return [bytes.fromhex(p) for p in args.payload]
+    if args.sweep:
+        start, stop, step = args.sweep
+        temps = np.round(np.arange(start, stop + step / 2, step), 1)
+    else:
+        temps = args.temp or [21.5]
+    return [build_ec40_post(float(t), args.channel, args.house) for t in temps]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthesize EC40 OOK pulse trains for rtl_433")
+    parser.add_argument("temp", nargs="*", type=float, help="Temperatures in C (default 21.5)")
+    parser.add_argument("--payload", nargs="+", help="EC40 post-reflect payloads (16 hex chars)")
+    parser.add_argument("--sweep", nargs=3, type=float, metavar=("START", "STOP", "STEP"),
+                        help="Temperature sweep")
+    parser.add_argument("--house", type=int, default=247)
+    parser.add_argument("--channel", type=int, default=1)
+    parser.add_argument("--ino", default=str(INO_FILE), help="Firmware to read timings from")
+    parser.add_argument("--esp32", action="store_true", help="Use ESP32 RMT timings instead")
+    parser.add_argument("--high", type=int, help="Override HIGH_UNIT_US")
+    parser.add_argument("--low", type=int, help="Override LOW_UNIT_US")
+    parser.add_argument("--gap", type=int, help="Override INTER_FRAME_GAP_US")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Gaussian edge jitter (us, std)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--rate", type=int, default=SAMPLE_RATE, help="cu8 sample rate")
+    parser.add_argument("--ook", help="Write rtl_433 pulse data file")
+    parser.add_argument("--cu8", help="Write cu8 IQ file")
+    args = parser.parse_args()
+
+    timings = ESP32_TIMINGS if args.esp32 else read_timings(args.ino)
+    timings = Timings(args.high or timings.high_us, args.low or timings.low_us, args.gap or timings.gap_us)
+
+    payloads = payloads_from_args(args)
+    t0 = time.perf_counter()
+    trains = synthesize_batch(payloads, timings, jitter_us=args.jitter, seed=args.seed)
+    elapsed = time.perf_counter() - t0
+
+    print(f"Timings: High={timings.high_us}us, Low={timings.low_us}us, Gap={timings.gap_us}us"
+          + (f", jitter={args.jitter}us" if args.jitter else ""))
+    print(f"✓ Synthesized {len(trains)} trains in {elapsed*1000:.1f} ms "
+          f"({len(trains)/elapsed:.0f} frames/s)")
+    if len(trains) == 1:
+        train = trains[0]
+        print(f"  Payload: {payloads[0].hex()}")
+        print(f"  Pulses: {len(train.pulses)}, duration: {(train.pulses.sum() + train.gaps.sum())/1000:.1f} ms")
+
+    if args.ook:
+        write_ook(args.ook, trains, args.rate)
+        print(f"✓ Wrote {args.ook}  (rtl_433 -r {args.ook})")
+    if args.cu8:
+        write_cu8(args.cu8, trains, args.rate)
+        print(f"✓ Wrote {args.cu8}  (rtl_433 -r {args.cu8})")
+
+
+if __name__ == "__main__":
+    main()
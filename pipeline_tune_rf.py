@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Pipelined RF tuning script.
+Same model-based search as model_tune_rf, but firmware builds come from the
+content-addressed build cache (build_cache.py): while one candidate is being
+measured, a background worker compiles the candidates the model would pick
+for the most likely measurement outcomes. Flashing then only uploads an
+already-built hex instead of rewriting the .ino and compiling from scratch.
+
+Usage:
+  python3 pipeline_tune_rf.py --stream
+  ARDUINO_CLI=./fake_arduino_cli.py python3 pipeline_tune_rf.py --simulate
+"""
+import copy
+import time
+import argparse
+
+import numpy as np
+
+from build_cache import BuildCache, ARDUINO_CLI, FQBN
+from rf_measure import measure_rf_streaming
+from tune_rf import (
+    INO_FILE,
+    RTL_433_CMD,
+    PulseModel,
+    SimulatedDevice,
+    within_tolerance,
+    load_profiles,
+    read_current_values,
+    update_values,
+    reset_usb,
+    measure_rf,
+    parse_analysis,
+)
+
+# Candidates to pre-compile per cycle: a 3x3 High/Low grid around the
+# predicted measurement, nearest first
+PREFETCH = 9
+SPREAD = 5
+GRID = sorted(((dh, dl) for dh in (0, SPREAD, -SPREAD) for dl in (0, SPREAD, -SPREAD)),
+              key=lambda d: abs(d[0]) + abs(d[1]))
+
+# A prebuilt candidate replaces the solved config when the model expects it
+# this close (us) to the target; half the grid spacing, so the grid tiles
+SNAP_TOL = np.array([SPREAD / 2, SPREAD / 2, 25.0])
+
+
+def next_candidates(model, config, target, limit=PREFETCH):
+    """
+    Configurations the model would choose next if the pending measurement
+    lands on its prediction or a few us either side of it. Before the first
+    measurement the prediction comes from the model prior (PRIOR_OFFSET).
+    """
+    expected = model.predict(config)
+
+    candidates = []
+    for dh, dl in GRID:
+        hypothetical = copy.deepcopy(model)
+        hypothetical.add(config, (int(round(expected[0])) + dh, int(round(expected[1])) + dl,
+                                  int(round(expected[2]))))
+        candidate = hypothetical.solve(target, config)
+        if candidate != tuple(config) and candidate not in candidates:
+            candidates.append(candidate)
+    return candidates[:limit]
+
+
+def prefer_prebuilt(model, cache, solved, candidates, target):
+    """
+    `solved`, or the closest already-built candidate the updated model expects
+    within SNAP_TOL of the target (the next measurement checks it anyway).
+    """
+    if cache.is_built(cache.key(*solved)):
+        return solved
+    _, _, known = model.fit()
+    best = None
+    for candidate in candidates:
+        if not cache.is_built(cache.key(*candidate)):
+            continue
+        err = np.abs(np.asarray(target, dtype=float) - model.predict(candidate))
+        if np.all((err <= SNAP_TOL) | ~known):
+            dist = np.abs(np.subtract(candidate, solved)).sum()
+            if best is None or dist < best[0]:
+                best = (dist, candidate)
+    return best[1] if best else solved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipelined model-based RF tuner")
+    parser.add_argument("--profile", default="reference", help="Target profile (tuning_profiles.json)")
+    parser.add_argument("--cycles", type=int, default=3, help="Max flash/measure cycles")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stop listening as soon as the widths are stable (rf_measure)")
+    parser.add_argument("--cli", default=ARDUINO_CLI, help="arduino-cli binary (or a stand-in)")
+    parser.add_argument("--fqbn", default=FQBN)
+    parser.add_argument("--cache-dir", default=None, help="Build cache directory")
+    parser.add_argument("--prefetch", type=int, default=PREFETCH)
+    parser.add_argument("--simulate", action="store_true",
+                        help="Synthetic device; builds/uploads still go through --cli")
+    parser.add_argument("--sim-listen", type=float, default=2.0,
+                        help="Simulated measurement time (s)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    profile = load_profiles()[args.profile]
+    target = (profile.high, profile.low, profile.gap)
+    sim = SimulatedDevice(args.seed) if args.simulate else None
+    config = read_current_values(INO_FILE)
+    if sim:
+        config = (config[0] + 15, config[1] - 5, config[2])
+    model = PulseModel(config, profile.min_val, profile.max_val)
+    print(f"🎯 Target: High={target[0]}, Low={target[1]}, Gap={target[2]}")
+
+    start = time.time()
+    ready = 0
+    cache_args = {"cache_dir": args.cache_dir} if args.cache_dir else {}
+    with BuildCache(fqbn=args.fqbn, cli=args.cli, **cache_args) as cache:
+        cache.submit(*config)
+
+        for cycle in range(args.cycles):
+            print(f"\n--- Cycle {cycle+1}/{args.cycles} ---")
+            key = cache.key(*config)
+            prebuilt = cache.is_built(key) or (key in cache.pending and cache.pending[key].done())
+            ready += prebuilt
+            print(f"Config: High={config[0]}, Low={config[1]}, Gap={config[2]} "
+                  f"[{'prebuilt' if prebuilt else 'building'} {key}]")
+
+            # 1. Flash (upload only); the hex must be ready before the reset,
+            # the bootloader window is too short to compile in
+            t0 = time.time()
+            try:
+                cache.build(*config)
+                if not sim:
+                    reset_usb()
+                cache.upload(*config)
+            except Exception as e:
+                print(f"Flash failed: {e}")
+                break
+            print(f"Flash took {time.time() - t0:.1f}s")
+
+            # 2. Pre-compile likely next candidates while measuring
+            candidates = next_candidates(model, config, target, args.prefetch)
+            cache.prefetch(candidates)
+            print(f"Prefetching {len(candidates)} candidates: {candidates}")
+
+            # 3. Measure
+            if sim:
+                sim.flash(config)
+                time.sleep(args.sim_listen)
+                measured = sim.measure()
+            elif args.stream:
+                result = measure_rf_streaming(RTL_433_CMD)
+                if result is None or result.packets == 0:
+                    print("No data received.")
+                    break
+                measured = (result.pulse, result.gap, result.frame_gap)
+            else:
+                output = measure_rf()
+                if not output:
+                    print("No data received.")
+                    break
+                measured = parse_analysis(output)
+
+            print(f"Measured: High={measured[0]}, Low={measured[1]}, Gap={measured[2]}")
+            if measured[0] is None or measured[1] is None:
+                print("Could not parse Pulse/Gap widths. Signal too weak or garbage?")
+                break
+
+            # 4. Model update and jump
+            model.add(config, measured)
+            err = tuple(None if m is None else t - m for t, m in zip(target, measured))
+            print(f"Errors: High={err[0]}, Low={err[1]}, Gap={err[2]}")
+            if within_tolerance(err):
+                print(f"✅ CONVERGED in {cycle+1} cycle(s), {time.time()-start:.1f}s")
+                if not sim:
+                    update_values(INO_FILE, *config)
+                break
+
+            new_config = prefer_prebuilt(model, cache, model.solve(target, config), candidates, target)
+            if new_config == tuple(config):
+                print("Model predicts no change; stopping.")
+                break
+            print(f"Jumping: High {config[0]}->{new_config[0]}, Low {config[1]}->{new_config[1]}, "
+                  f"Gap {config[2]}->{new_config[2]}")
+            config = new_config
+            cache.cancel_prefetch()
+            cache.submit(*config)
+        else:
+            print(f"⚠ Not converged after {args.cycles} cycles")
+
+        print(f"\n📦 Build cache: {cache.builds} compiled, {cache.hits} reused, "
+              f"{ready} flashes from prebuilt hex")
+    return ready
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Offline RF round-trip bench: generator -> IQ (cu8) -> decode -> compare.
+Replaces flash + dongle sessions when validating generator changes.
+
+Frames are synthesized with ook_synth (tuned firmware timings plus an
+offset), rendered to IQ at the chosen sample rate and SNR, quantized to cu8
+and decoded either by the bundled OOK/Manchester demodulator or by a local
+`rtl_433 -r file.cu8`. A sweep over timing offsets and SNRs runs in
+parallel across cores.
+
+Usage:
+  python3 rf_bench.py
+  python3 rf_bench.py --snr 0 3 6 10 20 --offset -60 -30 0 30 60 --frames 50
+  python3 rf_bench.py --rtl433 --snr 10 --frames 20
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR / "ec40_lut_suite" / "02_table_analysis"))
+
+from ook_synth import (INO_FILE, SAMPLE_RATE, Timings, read_timings,
+                       synthesize_batch, render_iq, iq_to_cu8)
+from gen_tramas_thn132n import CHANNEL_CODES, build_ec40_post
+from decode_raw168 import decode_batch, RAW_LEN_BYTES
+
+RTL_433_CMD = ["rtl_433", "-R", "12", "-F", "json", "-r"]
+
+HOUSES = [3, 27, 71, 152, 247]
+# Logical channels as rtl_433 reports them (the payload nibble is CHANNEL_CODES)
+CHANNELS = [1, 2, 3]
+
+# Frames are separated by gaps well above two half-symbols
+SEPARATOR_UNITS = 4
+
+
+# --- IQ ---
+
+def add_noise(iq, snr_db, rng, amplitude=0.8):
+    """Complex AWGN so that carrier power / noise power = snr_db."""
+    sigma = amplitude / np.sqrt(2 * 10 ** (snr_db / 10))
+    noise = rng.normal(0, sigma, (2, len(iq))).astype(np.float32)
+    return iq + noise[0] + 1j * noise[1]
+
+
+def cu8_to_iq(data):
+    samples = (np.asarray(data, dtype=np.float32) - 127.5) / 127.5
+    return samples[0::2] + 1j * samples[1::2]
+
+
+# --- DEMODULATOR ---
+
+def _two_means(values, lo, hi, iterations=8):
+    """1-D two-cluster split (returns both centroids)."""
+    for _ in range(iterations):
+        thr = (lo + hi) / 2
+        below = values[values <= thr]
+        above = values[values > thr]
+        if len(below) == 0 or len(above) == 0:
+            break
+        lo, hi = below.mean(), above.mean()
+    return lo, hi
+
+
+def envelope_runs(iq, sample_rate):
+    """Slice the magnitude envelope into (level, duration_us) runs."""
+    mag = np.abs(iq)
+    # ~40us moving average before slicing
+    win = max(1, int(sample_rate * 40e-6))
+    if win > 1:
+        mag = np.convolve(mag, np.ones(win, dtype=np.float32) / win, mode="same")
+
+    lo, hi = _two_means(mag, float(mag.min()), float(mag.max()))
+    binary = (mag > (lo + hi) / 2).astype(np.int8)
+
+    edges = np.flatnonzero(np.diff(binary)) + 1
+    starts = np.concatenate(([0], edges))
+    lengths = np.diff(np.concatenate((starts, [len(binary)])))
+    return binary[starts], lengths * (1e6 / sample_rate)
+
+
+def runs_to_raw(levels, durations):
+    """
+    Recover RAW168 frames from envelope runs.
+    Each run is 1 or 2 half-symbols; the half-symbol width is estimated
+    from the data, so small timing offsets are tolerated.
+    """
+    inner = durations[(levels == 1) & (durations < 3000)]
+    if len(inner) < 10:
+        return []
+    short, long_ = _two_means(inner, inner.min(), inner.max())
+    half = (short + long_ / 2) / 2
+
+    # Noise glitches: fold runs shorter than ~half a half-symbol into the previous run
+    merged = []
+    for level, dur in zip(levels.tolist(), durations.tolist()):
+        if merged and (dur < 0.4 * half or merged[-1][0] == level):
+            merged[-1][1] += dur
+        else:
+            merged.append([level, dur])
+
+    frames = []
+    current = []
+    for level, dur in merged:
+        count = int(round(dur / half))
+        if level == 0 and count >= SEPARATOR_UNITS:
+            frames.append(current)
+            current = []
+            continue
+        current.extend([level] * max(1, min(count, 2)))
+    frames.append(current)
+
+    raws = []
+    for halves in frames:
+        if sum(halves) < 40:
+            continue
+        # First bit is 0 (LOW, HIGH): its LOW half is part of the leading gap
+        halves = [0] + halves
+        halves = halves[:336] + [0] * max(0, 336 - len(halves))
+        bits = np.array(halves[0::2], dtype=np.uint8)
+        raws.append(np.packbits(bits).tobytes())
+    return raws
+
+
+def demodulate(iq, sample_rate=SAMPLE_RATE):
+    """Bundled decoder: IQ -> list of EC40 payload hex strings (valid frames)."""
+    raws = runs_to_raw(*envelope_runs(iq, sample_rate))
+    raws = [r for r in raws if len(r) == RAW_LEN_BYTES]
+    if not raws:
+        return []
+    result = decode_batch(raws)
+    return [bytes(p).hex() for p, err in zip(result.payloads, result.errors) if err == 0]
+
+
+# --- rtl_433 ---
+
+def rtl433_available():
+    return shutil.which(RTL_433_CMD[0]) is not None
+
+
+def decode_rtl433(cu8_data, sample_rate=SAMPLE_RATE):
+    """Run rtl_433 on a cu8 buffer; returns its JSON events."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"bench_433.92M_{sample_rate // 1000}k.cu8"
+        path.write_bytes(cu8_data.tobytes())
+        result = subprocess.run(RTL_433_CMD + [str(path)], capture_output=True, text=True, timeout=60)
+    events = []
+    for line in result.stdout.splitlines():
+        try:
+            events.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return events
+
+
+def rtl433_matches(event, house, channel, temp):
+    return (event.get("id") == house and event.get("channel") == channel
+            and abs(event.get("temperature_C", 1e9) - temp) < 0.05)
+
+
+# --- BENCH ---
+
+def run_cell(cell):
+    """One sweep point: (offset_us, snr_db, frames, seed, timings, rate, use_rtl433)."""
+    offset, snr_db, n_frames, seed, base, sample_rate, use_rtl433 = cell
+    rng = np.random.default_rng(seed)
+    timings = Timings(base.high_us + offset, base.low_us + offset, base.gap_us)
+
+    cases = [(int(rng.choice(HOUSES)), int(rng.choice(CHANNELS)),
+              round(float(rng.uniform(-20, 45)), 1)) for _ in range(n_frames)]
+    payloads = [build_ec40_post(t, CHANNEL_CODES[c], h) for h, c, t in cases]
+    trains = synthesize_batch(payloads, timings, jitter_us=5, seed=seed)
+
+    ok = 0
+    copies = 0
+    for (house, channel, temp), payload, train in zip(cases, payloads, trains):
+        iq = add_noise(render_iq(train, sample_rate), snr_db, rng)
+        cu8 = iq_to_cu8(iq)
+        if use_rtl433:
+            hits = sum(rtl433_matches(e, house, channel, temp) for e in decode_rtl433(cu8, sample_rate))
+        else:
+            hits = demodulate(cu8_to_iq(cu8), sample_rate).count(payload.hex())
+        copies += hits
+        ok += hits > 0
+    return offset, snr_db, ok, copies, n_frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline generator -> IQ -> decoder bench")
+    parser.add_argument("--snr", nargs="+", type=float, default=[0, 5, 10, 20], help="SNR points (dB)")
+    parser.add_argument("--offset", nargs="+", type=int, default=[-40, 0, 40],
+                        help="Offsets added to HIGH/LOW_UNIT_US (us)")
+    parser.add_argument("--frames", type=int, default=30, help="Frames per sweep point")
+    parser.add_argument("--rate", type=int, default=SAMPLE_RATE, help="Sample rate (Hz)")
+    parser.add_argument("--ino", default=str(INO_FILE))
+    parser.add_argument("--rtl433", action="store_true", help="Decode with local rtl_433 -r")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.rtl433 and not rtl433_available():
+        print("✗ rtl_433 not found in PATH")
+        sys.exit(1)
+
+    base = read_timings(args.ino)
+    decoder = "rtl_433" if args.rtl433 else "bundled demodulator"
+    print(f"Base timings: High={base.high_us}us, Low={base.low_us}us, Gap={base.gap_us}us")
+    print(f"Decoder: {decoder}, {args.frames} frames/point @ {args.rate} Hz")
+
+    cells = [(off, snr, args.frames, args.seed + i, base, args.rate, args.rtl433)
+             for i, (off, snr) in enumerate((o, s) for o in args.offset for s in args.snr)]
+
+    t0 = time.time()
+    with ProcessPoolExecutor(max_workers=args.workers or os.cpu_count()) as pool:
+        results = list(pool.map(run_cell, cells))
+    elapsed = time.time() - t0
+
+    print(f"\n{'Offset':>7} | {'SNR dB':>6} | {'Decoded':>9} | {'Copies':>6}")
+    print("-" * 40)
+    failures = 0
+    for offset, snr_db, ok, copies, total in results:
+        mark = "✓" if ok == total else "✗"
+        failures += ok < total
+        print(f"{offset:+6d}us | {snr_db:6.1f} | {ok:4d}/{total:<4d} | {copies:6d} {mark}")
+    print(f"\n⏱  {len(cells)} points in {elapsed:.1f}s")
+    if failures:
+        print(f"⚠  {failures} points with undecoded frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Streaming RF measurement with adaptive early stop.
+Reads rtl_433 -A pulse analysis line by line, keeps running means and
+confidence intervals of the short pulse, short gap and frame gap widths
+(one sample per received packet) and stops rtl_433 as soon as every
+interval is within tolerance at the requested confidence.
+The -T limit still bounds the worst case.
+
+Usage:
+  python3 rf_measure.py                     # live, rtl_433 -A -T 60
+  python3 rf_measure.py capture.txt         # replay a saved rtl_433 -A output
+"""
+import re
+import time
+import argparse
+import subprocess
+from collections import namedtuple
+from statistics import NormalDist
+
+RTL_433_CMD = ["rtl_433", "-A", "-T", "60"]
+
+# Stop criteria: CI half-width (us) per metric
+TOL_PULSE = 2.0
+TOL_GAP = 2.0
+TOL_FRAME_GAP = 20.0
+CONFIDENCE = 0.95
+MIN_PACKETS = 5
+
+# Histogram buckets: short pulse/gap range, frame gap minimum, and the count
+# a short pulse/gap bucket needs to not be noise (frame gaps appear once)
+SHORT_MIN = 300
+SHORT_MAX = 700
+FRAME_GAP_MIN = 6000
+MIN_BUCKET_COUNT = 5
+
+# "[ 0] count:  140,  width: 1012 us [1000;1020]"
+BUCKET_RE = re.compile(r"count:\s+(\d+),\s+width:\s+(\d+)\s+us")
+
+Measurement = namedtuple("Measurement", ["pulse", "gap", "frame_gap", "packets", "elapsed", "converged", "stats"])
+
+
+def classify(section, count, width):
+    """Metric ('pulse', 'gap' or 'frame_gap') a histogram bucket belongs to, or None."""
+    if SHORT_MIN < width < SHORT_MAX and count > MIN_BUCKET_COUNT:
+        return section
+    if section == "gap" and width > FRAME_GAP_MIN:
+        return "frame_gap"
+    return None
+
+
+def _best(candidates):
+    """Width of the most frequent bucket per metric."""
+    return {key: max(buckets)[1] for key, buckets in candidates.items()}
+
+
+def iter_packets(lines):
+    """Yield one {'pulse', 'gap', 'frame_gap'} dict per analysed packet."""
+    candidates = {}
+    section = None
+    for line in lines:
+        if "Analyzing pulses" in line:
+            if candidates:
+                yield _best(candidates)
+            candidates = {}
+            section = None
+        elif "Pulse width distribution" in line:
+            section = "pulse"
+        elif "Gap width distribution" in line:
+            section = "gap"
+        elif "distribution" in line or "Level estimates" in line:
+            section = None
+        elif section:
+            m = BUCKET_RE.search(line)
+            if m:
+                count, width = int(m.group(1)), int(m.group(2))
+                key = classify(section, count, width)
+                if key:
+                    candidates.setdefault(key, []).append((count, width))
+    if candidates:
+        yield _best(candidates)
+
+
+class RunningStat:
+    """Welford running mean / variance."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def std(self):
+        return (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else float("inf")
+
+    def half_width(self, z):
+        return z * self.std / self.n ** 0.5 if self.n > 1 else float("inf")
+
+
+class PulseEstimator:
+    """
+    Per-metric running statistics and the stop rule.
+    Confidence intervals use the normal approximation, which is why at
+    least MIN_PACKETS samples are required before stopping.
+    """
+
+    def __init__(self, tolerances=None, confidence=CONFIDENCE, min_packets=MIN_PACKETS):
+        self.tolerances = tolerances or {"pulse": TOL_PULSE, "gap": TOL_GAP, "frame_gap": TOL_FRAME_GAP}
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.confidence = confidence
+        self.min_packets = min_packets
+        self.stats = {k: RunningStat() for k in self.tolerances}
+        self.packets = 0
+
+    def add(self, packet):
+        self.packets += 1
+        for key, value in packet.items():
+            if key in self.stats:
+                self.stats[key].add(value)
+
+    def converged(self):
+        if self.stats["pulse"].n < self.min_packets or self.stats["gap"].n < self.min_packets:
+            return False
+        for key, stat in self.stats.items():
+            # Frame gap is optional: single-frame receptions never show it
+            if stat.n == 0 and key == "frame_gap":
+                continue
+            if stat.n < self.min_packets or stat.half_width(self.z) > self.tolerances[key]:
+                return False
+        return True
+
+    def estimate(self, key):
+        stat = self.stats[key]
+        return int(round(stat.mean)) if stat.n else None
+
+    def report(self):
+        return {
+            key: {"n": s.n, "mean": s.mean if s.n else None,
+                  "ci": s.half_width(self.z) if s.n > 1 else None}
+            for key, s in self.stats.items()
+        }
+
+
+def measure_stream(lines, estimator=None, on_stop=None):
+    """Consume rtl_433 lines until the estimator converges (or input ends)."""
+    estimator = estimator or PulseEstimator()
+    start = time.time()
+    converged = False
+    for packet in iter_packets(lines):
+        estimator.add(packet)
+        if estimator.converged():
+            converged = True
+            if on_stop:
+                on_stop()
+            break
+    return Measurement(
+        estimator.estimate("pulse"),
+        estimator.estimate("gap"),
+        estimator.estimate("frame_gap"),
+        estimator.packets,
+        time.time() - start,
+        converged,
+        estimator.report(),
+    )
+
+
+def measure_rf_streaming(cmd=RTL_433_CMD, estimator=None):
+    """Live measurement: rtl_433 is terminated as soon as the estimate is good enough."""
+    print(f"⏱  Listening with rtl_433 (adaptive, max {cmd[cmd.index('-T') + 1]}s)..."
+          if "-T" in cmd else "⏱  Listening with rtl_433 (adaptive)...")
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True, bufsize=1)
+    except Exception as e:
+        print(f"✗ rtl_433 failed: {e}")
+        return None
+
+    try:
+        result = measure_stream(proc.stdout, estimator, on_stop=proc.terminate)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=5)
+    print_report(result)
+    return result
+
+
+def print_report(result):
+    status = "✓ converged" if result.converged else "⚠ window ended before convergence"
+    print(f"{status} after {result.packets} packets ({result.elapsed:.1f}s)")
+    for key, s in result.stats.items():
+        if s["n"]:
+            ci = f"±{s['ci']:.1f}us" if s["ci"] is not None else "±?"
+            print(f"   {key:9s}: {s['mean']:.1f}us {ci} (n={s['n']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive rtl_433 pulse measurement")
+    parser.add_argument("replay", nargs="?", help="Saved rtl_433 -A output to replay")
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE)
+    parser.add_argument("--tol", type=float, default=TOL_PULSE, help="Pulse/gap tolerance (us)")
+    parser.add_argument("--tol-frame-gap", type=float, default=TOL_FRAME_GAP)
+    parser.add_argument("--min-packets", type=int, default=MIN_PACKETS)
+    args = parser.parse_args()
+
+    estimator = PulseEstimator(
+        {"pulse": args.tol, "gap": args.tol, "frame_gap": args.tol_frame_gap},
+        args.confidence, args.min_packets)
+
+    if args.replay:
+        with open(args.replay, "r") as f:
+            print_report(measure_stream(f, estimator))
+    else:
+        measure_rf_streaming(RTL_433_CMD, estimator)
+
+
+if __name__ == "__main__":
+    main()
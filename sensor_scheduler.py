@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Host-side multi-sensor scheduler.
+Drives many virtual THN132N sensors (house, channel, temperature source)
+from one process through a single shared transmitter. Every sensor keeps
+the console's receive period for its channel (39/41/43 s, see
+docs/RF_TUNING_KNOWLEDGE.md section 4) and transmit slots are booked on a
+timing wheel so that no two bursts (two frame copies plus the inter-frame
+gap) ever overlap on air. A burst that would collide is pushed to the next
+free slot; the sensor's nominal grid is not shifted, so delays never
+accumulate.
+
+Frames come from the Python generator (gen_tramas_thn132n) through the
+memoized frame cache (frame_cache.py) and pulse trains from ook_synth,
+with the timings of the tuned .ino.
+
+With --simulate the clock is virtual and hours of schedule run in seconds.
+
+Usage:
+  python3 sensor_scheduler.py --sensor a:131:1:21.5 --sensor b:132:2:walk --simulate --hours 6
+  python3 sensor_scheduler.py --sensor a:131:1 --sensor b:131:3 --ook out.ook --simulate --hours 0.1
+  python3 sensor_scheduler.py --sensor a:131:1 --tx-cmd "./send_raw.sh {raw}"
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import shlex
+from collections import namedtuple
+
+from frame_cache import FrameCache
+from gen_tramas_thn132n import CHANNEL_CODES
+from ook_synth import INO_FILE, REPEATS, ESP32_TIMINGS, read_timings, synthesize, write_ook
+
+# --- CONFIGURATION ---
+# Console receive period per channel (seconds)
+CHANNEL_PERIODS = {1: 39.0, 2: 41.0, 3: 43.0}
+
+RAW_BITS = 168
+SLOT_US = 10000          # timing wheel resolution
+WHEEL_SLOTS = 8192       # ~82 s, more than two of the longest periods
+GUARD_US = 20000         # silence kept around every burst
+MAX_SHIFT_US = 5000000   # give up on a burst rather than delay it further
+
+Sensor = namedtuple("Sensor", ["name", "house", "channel", "temp"])
+
+
+def burst_airtime_us(timings, repeats=REPEATS):
+    """Every RAW bit is one HIGH + one LOW half-symbol, whatever its value."""
+    return repeats * RAW_BITS * (timings.high_us + timings.low_us) + (repeats - 1) * timings.gap_us
+
+
+def air_load(sensors, airtime_us):
+    """Fraction of the air the sensors need, guards included (>= 1 cannot fit)."""
+    return sum((airtime_us + 2 * GUARD_US) / (CHANNEL_PERIODS[s.channel] * 1e6) for s in sensors)
+
+
+# --- TEMPERATURE SOURCES ---
+
+class ConstantTemp:
+    def __init__(self, value):
+        self.value = value
+
+    def read(self, t_us):
+        return self.value
+
+
+class RandomWalkTemp:
+    """Slow indoor-like drift, one 0.1 C step at most per reading."""
+
+    def __init__(self, start=21.5, low=15.0, high=30.0, seed=None):
+        self.value = start
+        self.low, self.high = low, high
+        self.rng = random.Random(seed)
+
+    def read(self, t_us):
+        self.value = min(self.high, max(self.low, self.value + self.rng.choice((-0.1, 0.0, 0.0, 0.1))))
+        return round(self.value, 1)
+
+
+def parse_sensor(text):
+    """NAME:HOUSE:CHANNEL[:TEMP], TEMP is a number or 'walk' (default 21.5)."""
+    parts = text.split(":")
+    try:
+        name, house, channel = parts[0], int(parts[1]), int(parts[2])
+        temp = parts[3] if len(parts) > 3 else "21.5"
+        if len(parts) > 4:
+            raise ValueError
+        source = RandomWalkTemp(seed=name) if temp == "walk" else ConstantTemp(float(temp))
+    except (ValueError, IndexError):
+        raise argparse.ArgumentTypeError(f"expected NAME:HOUSE:CHANNEL[:TEMP], got {text}")
+    if channel not in CHANNEL_PERIODS or not 0 <= house <= 255:
+        raise argparse.ArgumentTypeError(f"invalid house/channel in {text}")
+    return Sensor(name, house, channel, source)
+
+
+# --- CLOCKS ---
+
+class RealClock:
+    """Monotonic wall clock in µs."""
+
+    def now_us(self):
+        return time.monotonic_ns() // 1000
+
+    async def sleep_until(self, t_us):
+        delay = (t_us - self.now_us()) / 1e6
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class SimulatedClock:
+    """Virtual time: sleeping jumps straight to the deadline."""
+
+    def __init__(self, start_us=0):
+        self.t_us = start_us
+
+    def now_us(self):
+        return self.t_us
+
+    async def sleep_until(self, t_us):
+        self.t_us = max(self.t_us, t_us)
+        await asyncio.sleep(0)
+
+    async def hold(self, duration_us):
+        self.t_us += duration_us
+        await asyncio.sleep(0)
+
+
+# --- TIMING WHEEL ---
+
+class TimingWheel:
+    """
+    Hashed timing wheel of transmit reservations.
+
+    Due events live in bucket (slot % n_slots); `busy` maps absolute slots
+    to the sensor holding the air, so finding a collision-free start is a
+    scan of a few slots rather than a search over every other sensor.
+    `flags` marks non-empty buckets so the cursor skips idle air in C.
+    """
+
+    def __init__(self, start_us=0, slot_us=SLOT_US, n_slots=WHEEL_SLOTS):
+        self.slot_us = slot_us
+        self.n_slots = n_slots
+        self.buckets = [[] for _ in range(n_slots)]
+        self.flags = bytearray(n_slots)
+        self.busy = {}
+        self.cursor = start_us // slot_us
+        self.count = 0
+
+    def _span(self, start_us, duration_us):
+        first = (start_us - GUARD_US) // self.slot_us
+        last = (start_us + duration_us + GUARD_US - 1) // self.slot_us
+        return range(first, last + 1)
+
+    def _conflict(self, start_us, duration_us):
+        """Last busy slot overlapping the burst, or None if the air is free."""
+        taken = [s for s in self._span(start_us, duration_us) if s in self.busy]
+        return taken[-1] if taken else None
+
+    def reserve(self, due_us, duration_us, owner, max_shift_us=MAX_SHIFT_US):
+        """
+        Book the first collision-free start at or after `due_us`; None if that
+        is more than max_shift_us away or past the wheel horizon.
+        """
+        start = due_us
+        while True:
+            blocker = self._conflict(start, duration_us)
+            if blocker is None:
+                break
+            start = (blocker + 1) * self.slot_us + GUARD_US
+            if start - due_us > max_shift_us:
+                return None
+
+        slot = start // self.slot_us
+        if slot - self.cursor >= self.n_slots:
+            return None
+        for s in self._span(start, duration_us):
+            self.busy[s] = owner
+        self.buckets[slot % self.n_slots].append((start, duration_us, owner))
+        self.flags[slot % self.n_slots] = 1
+        self.count += 1
+        return start
+
+    def horizon_us(self):
+        """First instant the wheel cannot hold yet."""
+        return (self.cursor + self.n_slots) * self.slot_us
+
+    def release(self, start_us, duration_us):
+        for s in self._span(start_us, duration_us):
+            self.busy.pop(s, None)
+
+    def pop_next(self):
+        """Earliest reservation (start_us, duration_us, owner), or None."""
+        if not self.count:
+            return None
+        while True:
+            idx = self.cursor % self.n_slots
+            nxt = self.flags.find(1, idx)
+            if nxt < 0:
+                nxt = self.flags.find(1) + self.n_slots
+            self.cursor += nxt - idx
+            bucket = self.buckets[nxt % self.n_slots]
+            due = [e for e in bucket if e[0] // self.slot_us == self.cursor]
+            if due:
+                event = min(due)
+                bucket.remove(event)
+                if not bucket:
+                    self.flags[nxt % self.n_slots] = 0
+                self.count -= 1
+                return event
+            self.cursor += 1
+
+
+# --- TRANSMITTERS ---
+
+class LogTransmitter:
+    """No radio: the burst simply occupies the (virtual or real) air time."""
+
+    def __init__(self, clock):
+        self.clock = clock
+
+    async def send(self, sensor, payload, raw, train, airtime_us):
+        if isinstance(self.clock, SimulatedClock):
+            await self.clock.hold(airtime_us)
+        else:
+            await self.clock.sleep_until(self.clock.now_us() + airtime_us)
+
+
+class CommandTransmitter(LogTransmitter):
+    """Hands the RAW frame to an external sender, e.g. a serial bridge script."""
+
+    def __init__(self, clock, template):
+        super().__init__(clock)
+        self.template = template
+
+    async def send(self, sensor, payload, raw, train, airtime_us):
+        cmd = shlex.split(self.template.format(raw=raw.hex().upper(), payload=payload.hex(), house=sensor.house,
+                                               channel=sensor.channel))
+        proc = await asyncio.create_subprocess_exec(*cmd)
+        await proc.wait()
+
+
+# --- SCHEDULER ---
+
+class Scheduler:
+    def __init__(self, sensors, timings, clock, transmitter, phase_us=None, log=None, frames=None):
+        self.sensors = {s.name: s for s in sensors}
+        self.frames = frames or FrameCache(cache_dir=None)
+        self.timings = timings
+        self.clock = clock
+        self.tx = transmitter
+        self.wheel = TimingWheel(clock.now_us())
+        self.airtime_us = burst_airtime_us(timings)
+        self.log = log
+        self.records = []
+        self.trains = []
+        self.keep_trains = False
+        self.verbose = True
+        self.next_nominal = {}
+        self.skipped = 0
+        self.t0_us = clock.now_us()
+
+        # Stagger the first bursts so that equal periods never start together
+        start = clock.now_us() + SLOT_US
+        step = phase_us if phase_us is not None else self.airtime_us + 2 * GUARD_US
+        for i, s in enumerate(sensors):
+            self.next_nominal[s.name] = start + i * step
+            self._book(s.name)
+
+    def _book(self, name):
+        period_us = int(CHANNEL_PERIODS[self.sensors[name].channel] * 1e6)
+        while True:
+            due = self.next_nominal[name]
+            if due >= self.wheel.horizon_us():
+                # Later periods are further out still: only a huge --phase gets here
+                self.skipped += 1
+                print(f"⚠ {name}: next burst at {due/1e6:.3f}s is past the timing wheel, sensor stopped")
+                return
+            self.next_nominal[name] += period_us
+            if self.wheel.reserve(due, self.airtime_us, name) is not None:
+                return
+            self.skipped += 1
+            print(f"⚠ {name}: no free slot near {due/1e6:.3f}s, burst skipped")
+
+    def _frame(self, sensor, t_us):
+        temp = sensor.temp.read(t_us)
+        payload, raw = self.frames.frame(sensor.house, CHANNEL_CODES[sensor.channel], None, temp)
+        return temp, payload, raw
+
+    async def run(self, until_us):
+        while True:
+            event = self.wheel.pop_next()
+            if event is None or event[0] >= until_us:
+                return
+            start_us, duration_us, name = event
+            sensor = self.sensors[name]
+            nominal = self.next_nominal[name] - int(CHANNEL_PERIODS[sensor.channel] * 1e6)
+
+            temp, payload, raw = self._frame(sensor, start_us)
+            train = synthesize(payload, self.timings, tail_us=0)
+            await self.clock.sleep_until(start_us)
+            t_tx = self.clock.now_us()
+            await self.tx.send(sensor, payload, raw, train, duration_us)
+            t_end = self.clock.now_us()
+
+            record = {
+                "sensor": name, "house": sensor.house, "channel": sensor.channel,
+                "nominal_us": nominal, "start_us": t_tx, "end_us": t_end,
+                "late_us": t_tx - start_us, "shift_us": start_us - nominal,
+                "temp": temp, "payload": payload.hex(),
+            }
+            self.records.append(record)
+            if self.keep_trains:
+                self.trains.append(train)
+            if self.verbose:
+                self.print_event(record)
+            if self.log:
+                self.log.write(json.dumps(record) + "\n")
+
+            self.wheel.release(start_us, duration_us)
+            self._book(name)
+
+    def print_event(self, r):
+        print(f"t={(r['start_us'] - self.t0_us)/1e6:12.6f}s  late={r['late_us']:+6d}µs  shift={r['shift_us']/1000:+7.1f}ms  "
+              f"{r['sensor']:>6} h{r['house']:<3} ch{r['channel']}  {r['temp']:5.1f}°C  {r['payload']}")
+
+
+# --- VERIFICATION ---
+
+def verify(records, airtime_us):
+    """Overlaps on air and per-sensor period statistics."""
+    ordered = sorted(records, key=lambda r: r["start_us"])
+    overlaps = sum(1 for a, b in zip(ordered, ordered[1:]) if b["start_us"] < a["start_us"] + airtime_us)
+
+    per_sensor = {}
+    for r in ordered:
+        per_sensor.setdefault(r["sensor"], []).append(r)
+    stats = {}
+    for name, rs in per_sensor.items():
+        intervals = [(b["start_us"] - a["start_us"]) / 1e6 for a, b in zip(rs, rs[1:])]
+        stats[name] = {
+            "bursts": len(rs),
+            "mean_period": sum(intervals) / len(intervals) if intervals else None,
+            "shifted": sum(1 for r in rs if r["shift_us"] > 0),
+            "max_shift_ms": max(r["shift_us"] for r in rs) / 1000,
+            "max_late_us": max(r["late_us"] for r in rs),
+        }
+    return overlaps, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-sensor THN132N emulation scheduler")
+    parser.add_argument("--sensor", type=parse_sensor, action="append", required=True,
+                        help="NAME:HOUSE:CHANNEL[:TEMP|walk] (repeat per sensor)")
+    parser.add_argument("--ino", default=str(INO_FILE), help="Firmware to read timings from")
+    parser.add_argument("--esp32", action="store_true", help="Use ESP32 RMT timings")
+    parser.add_argument("--hours", type=float, default=1.0, help="Schedule length")
+    parser.add_argument("--simulate", action="store_true", help="Virtual clock (runs instantly)")
+    parser.add_argument("--phase", type=float, help="Initial stagger between sensors (s)")
+    parser.add_argument("--tx-cmd", help="Command per burst; {raw}, {payload}, {house}, {channel}")
+    parser.add_argument("--log", help="Write one JSON line per burst")
+    parser.add_argument("--frame-cache", help="Share frames through a frame_cache.py directory")
+    parser.add_argument("--ook", help="Write all bursts as an rtl_433 pulse data file")
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    args = parser.parse_args()
+
+    names = [s.name for s in args.sensor]
+    if len(set(names)) != len(names):
+        print("✗ Sensor names must be unique")
+        sys.exit(1)
+
+    timings = ESP32_TIMINGS if args.esp32 else read_timings(args.ino)
+    load = air_load(args.sensor, burst_airtime_us(timings))
+    if load >= 1:
+        print(f"✗ {len(args.sensor)} sensors need {load:.0%} of the air time "
+              f"(burst + {2 * GUARD_US // 1000} ms guard every period); remove some sensors")
+        sys.exit(1)
+    clock = SimulatedClock() if args.simulate else RealClock()
+    tx = CommandTransmitter(clock, args.tx_cmd) if args.tx_cmd else LogTransmitter(clock)
+    phase_us = None if args.phase is None else int(args.phase * 1e6)
+
+    log = open(args.log, "w") if args.log else None
+    frames = FrameCache(cache_dir=args.frame_cache)
+    sched = Scheduler(args.sensor, timings, clock, tx, phase_us, log, frames)
+    sched.keep_trains = bool(args.ook)
+    sched.verbose = not args.quiet
+
+    print(f"Timings: High={timings.high_us}us, Low={timings.low_us}us, Gap={timings.gap_us}us "
+          f"-> burst {sched.airtime_us/1000:.1f} ms")
+    for s in args.sensor:
+        print(f"📡 {s.name}: house {s.house}, ch {s.channel}, every {CHANNEL_PERIODS[s.channel]:.0f}s")
+
+    until = clock.now_us() + int(args.hours * 3600e6)
+    t0 = time.perf_counter()
+    try:
+        asyncio.run(sched.run(until))
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        if log:
+            log.close()
+    elapsed = time.perf_counter() - t0
+
+    overlaps, stats = verify(sched.records, sched.airtime_us)
+    print(f"\n📊 {len(sched.records)} bursts in {args.hours:g} h of schedule "
+          f"({elapsed:.2f}s wall clock)")
+    for name, st in stats.items():
+        period = f"{st['mean_period']:.3f}s" if st["mean_period"] else "-"
+        print(f"  {name:>6}: {st['bursts']} bursts, mean period {period}, "
+              f"{st['shifted']} shifted (max {st['max_shift_ms']:.0f} ms), max late {st['max_late_us']} µs")
+    if sched.skipped:
+        print(f"  ⚠ {sched.skipped} bursts skipped (no free slot)")
+    print("✅ No overlapping bursts" if overlaps == 0 else f"✗ {overlaps} overlapping bursts")
+
+    if args.ook:
+        write_ook(args.ook, sched.trains)
+        print(f"✓ Wrote {args.ook}  (rtl_433 -r {args.ook})")
+    sys.exit(0 if overlaps == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
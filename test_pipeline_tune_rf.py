@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Pipelined tuner against fake_arduino_cli.py and the simulated device:
+the prefetched candidates are centred on the model prior, and a second
+cycle flashes a hex that was built while the first one was measured.
+
+Usage:
+  python3 test_pipeline_tune_rf.py
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+sys.path.insert(0, str(BASE_DIR))
+
+from pipeline_tune_rf import main, next_candidates
+from tune_rf import PRIOR_OFFSET, PulseModel
+
+FAKE_CLI = str(BASE_DIR / "fake_arduino_cli.py")
+
+
+def test_first_candidates_use_prior():
+    config, target = (522, 464, 8764), (492, 476, 8784)
+    candidates = next_candidates(PulseModel(config), config, target)
+    expected = tuple(int(t - o) for t, o in zip(target, PRIOR_OFFSET))
+    assert candidates[0] == expected, candidates
+
+
+def test_prefetch_hits():
+    os.environ["FAKE_ARDUINO_CLI_DELAY"] = "0"
+    with tempfile.TemporaryDirectory() as tmp:
+        ready = main(["--simulate", "--seed", "4", "--sim-listen", "3", "--cycles", "3",
+                      "--cli", FAKE_CLI, "--cache-dir", tmp])
+    assert ready >= 1, "no flash came from a prefetched build"
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✓ {name}")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Pruebas de usb_reset contra un árbol sysfs falso.
+
+Un hilo hace de kernel: al escribir `disable` en el puerto del hub retira el
+dispositivo y, al volver a 0, enumera en ese puerto el bootloader Digispark
+(16d0:0753) tras un pequeño retardo; al desautorizar un dispositivo retira
+sus interfaces y las vuelve a crear al autorizarlo.
+
+Uso:
+    python3 test_usb_reset.py
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import usb_reset
+from usb_reset import find_devices, port_disable_path, reset_port, main
+
+ENUM_DELAY = 0.2
+
+
+def make_device(root, port, vid, pid, serial=None):
+    path = os.path.join(root, port)
+    os.makedirs(os.path.join(path, f"{port}:1.0"), exist_ok=True)
+    for name, value in (("idVendor", vid), ("idProduct", pid), ("authorized", "1"), ("serial", serial)):
+        if value is not None:
+            with open(os.path.join(path, name), "w") as f:
+                f.write(value + "\n")
+    return path
+
+
+def make_hub_port(root, port):
+    disable = port_disable_path(root, port)
+    os.makedirs(os.path.dirname(disable), exist_ok=True)
+    with open(disable, "w") as f:
+        f.write("0\n")
+    return disable
+
+
+class FakeKernel(threading.Thread):
+    """Reacciona a `disable` y `authorized` como lo haría el kernel."""
+
+    def __init__(self, root, ports):
+        super().__init__(daemon=True)
+        self.root = root
+        self.ports = ports
+        self.stop = threading.Event()
+        self.enumerate_at = {}
+        self.mtimes = {}
+
+    def _value(self, path):
+        try:
+            with open(path) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def run(self):
+        while not self.stop.is_set():
+            for port in self.ports:
+                dev = os.path.join(self.root, port)
+                disable = port_disable_path(self.root, port)
+                # El kernel real actúa dentro del write(); aquí un 1 -> 0
+                # rápido se detecta por el cambio de mtime
+                mtime = os.stat(disable).st_mtime_ns
+                if mtime != self.mtimes.setdefault(port, mtime):
+                    self.mtimes[port] = mtime
+                    shutil.rmtree(dev, ignore_errors=True)
+                    self.enumerate_at[port] = None
+                if self._value(disable) == "0" and port in self.enumerate_at:
+                    if self.enumerate_at[port] is None:
+                        self.enumerate_at[port] = time.monotonic() + ENUM_DELAY
+                    elif time.monotonic() >= self.enumerate_at[port]:
+                        make_device(self.root, port, usb_reset.DIGISPARK_VID, usb_reset.DIGISPARK_PID)
+                        del self.enumerate_at[port]
+            for name in os.listdir(self.root):
+                auth = self._value(os.path.join(self.root, name, "authorized"))
+                iface = os.path.join(self.root, name, f"{name}:1.0")
+                if auth == "0" and os.path.isdir(iface):
+                    os.rmdir(iface)
+                elif auth == "1" and not os.path.isdir(iface):
+                    os.mkdir(iface)
+            time.sleep(0.01)
+
+
+class FakeSysfs:
+    """1-1.2: puerto del Digispark (vacío, sketch en marcha); 1-1.3: RTL-SDR."""
+
+    def __enter__(self):
+        self.root = tempfile.mkdtemp(prefix="sysfs_")
+        make_device(self.root, "1-1", "05e3", "0610")           # hub
+        make_device(self.root, "1-1.3", "0bda", "2838", "00000001")
+        make_hub_port(self.root, "1-1.2")
+        make_hub_port(self.root, "1-1.3")
+        self.kernel = FakeKernel(self.root, ["1-1.2", "1-1.3"])
+        self.kernel.start()
+        time.sleep(0.05)
+        return self.root
+
+    def __exit__(self, *exc):
+        self.kernel.stop.set()
+        self.kernel.join()
+        shutil.rmtree(self.root)
+
+
+def test_disable_paths():
+    assert port_disable_path("/s", "1-1.2") == "/s/1-1:1.0/1-1-port2/disable"
+    assert port_disable_path("/s", "3-2") == "/s/3-0:1.0/usb3-port2/disable"
+
+
+def test_find_devices():
+    with FakeSysfs() as root:
+        assert [d["port"] for d in find_devices(root, vid="0BDA")] == ["1-1.3"]
+        assert [d["port"] for d in find_devices(root, serial="00000001")] == ["1-1.3"]
+        assert find_devices(root, usb_reset.DIGISPARK_VID, usb_reset.DIGISPARK_PID) == []
+
+
+def test_reset_port_waits_for_bootloader():
+    with FakeSysfs() as root:
+        t0 = time.monotonic()
+        assert reset_port(root, "1-1.2", usb_reset.DIGISPARK_VID, usb_reset.DIGISPARK_PID, timeout=3)
+        assert time.monotonic() - t0 >= ENUM_DELAY
+        # El otro puerto del hub (RTL-SDR) no se toca
+        assert find_devices(root, port="1-1.3")[0]["authorized"] == "1"
+
+
+def test_reset_port_times_out():
+    with FakeSysfs() as root:
+        # En 1-1.3 vuelve a enumerarse algo, pero no el bootloader
+        assert not reset_port(root, "1-1.3", "ffff", "ffff", timeout=0.5)
+
+
+def test_reset_port_without_disable():
+    with FakeSysfs() as root:
+        make_device(root, "2-1", "1234", "5678")
+        assert reset_port(root, "2-1", "1234", "5678", timeout=3)
+
+
+def test_digispark_remembered_port():
+    with FakeSysfs() as root:
+        ports = os.path.join(root, "ports.json")
+        assert main(["--digispark", "--sysfs", root, "--ports-file", ports]) == 2
+        usb_reset.remember_port("placa_b", "1-1.2", ports)
+        assert main(["--digispark", "--name", "placa_b", "--sysfs", root,
+                     "--ports-file", ports, "--timeout", "3"]) == 0
+        assert find_devices(root, usb_reset.DIGISPARK_VID, usb_reset.DIGISPARK_PID)[0]["port"] == "1-1.2"
+
+
+def test_no_arguments_does_not_reset_bus():
+    with FakeSysfs() as root:
+        called = []
+        original = usb_reset.reset_usb_devices
+        usb_reset.reset_usb_devices = lambda *a: called.append(a)
+        try:
+            assert main(["--sysfs", root]) == 1
+            assert main(["--sysfs", root, "--all"]) == 0
+        finally:
+            usb_reset.reset_usb_devices = original
+        assert len(called) == 1
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✓ {name}")
@@ -0,0 +1,711 @@
+#!/usr/bin/env python3
+"""
+Unified RF tuning engine.
+One loop (flash -> measure -> adjust) with pluggable pieces:
+
+  strategies   how firmware reaches the board and how it is measured
+               auto     USB reset + arduino-cli compile --upload
+               replug   compile, countdown, upload while the user replugs
+               manual   rewrite the .ino and wait for a manual upload
+               cached   upload prebuilt hex from the build cache
+               dry-run  no hardware: replay a saved rtl_433 -A capture
+               simulate no hardware: synthetic linear device
+  controllers  damped (legacy proportional steps) or model (joint linear fit)
+  profiles     target widths per original sensor (tuning_profiles.json)
+
+Every session is appended to tuning_history.json; a new session for the
+same device and profile starts from the last tuned values and seeds the
+model with the earlier observations.
+
+Usage:
+  python3 tune_rf.py --strategy auto --profile reference
+  python3 tune_rf.py --strategy manual --profile original-ch1 --controller damped
+  python3 tune_rf.py --strategy dry-run --replay capture.txt
+  python3 tune_rf.py --history
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import subprocess
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+from build_cache import ARDUINO_CLI, FQBN
+from rf_measure import BUCKET_RE, classify, measure_rf_streaming
+
+# --- CONFIGURATION ---
+BASE_DIR = Path(__file__).parent
+INO_FILE = "attiny/attiny85THN132N_aht20.ino"
+SKETCH_PATH = os.path.abspath(INO_FILE)
+RTL_433_CMD = ["rtl_433", "-A", "-T", "60"]
+USB_RESET_CMD = ["sudo", "python3", "usb_reset.py", "--digispark"]
+PROFILES_FILE = BASE_DIR / "tuning_profiles.json"
+HISTORY_FILE = BASE_DIR / "tuning_history.json"
+
+# Convergence tolerances (us)
+TOL_PULSE = 4
+TOL_GAP = 50
+
+Profile = namedtuple("Profile", ["name", "high", "low", "gap", "min_val", "max_val", "description"])
+
+
+# --- FIRMWARE ---
+
+def read_current_values(filename):
+    with open(filename, "r") as f:
+        content = f.read()
+
+    high_match = re.search(r"const\s+uint16_t\s+HIGH_UNIT_US\s*=\s*(\d+);", content)
+    low_match = re.search(r"const\s+uint16_t\s+LOW_UNIT_US\s*=\s*(\d+);", content)
+    gap_match = re.search(
+        r"const\s+uint16_t\s+INTER_FRAME_GAP_US\s*=\s*(\d+);", content
+    )
+
+    if not (high_match and low_match and gap_match):
+        print("Error: Could not find constants in .ino file")
+        sys.exit(1)
+
+    return int(high_match.group(1)), int(low_match.group(1)), int(gap_match.group(1))
+
+
+def update_values(filename, new_high, new_low, new_gap):
+    with open(filename, "r") as f:
+        content = f.read()
+
+    content = re.sub(
+        r"(const\s+uint16_t\s+HIGH_UNIT_US\s*=\s*)(\d+);", f"\\g<1>{new_high};", content
+    )
+    content = re.sub(
+        r"(const\s+uint16_t\s+LOW_UNIT_US\s*=\s*)(\d+);", f"\\g<1>{new_low};", content
+    )
+    content = re.sub(
+        r"(const\s+uint16_t\s+INTER_FRAME_GAP_US\s*=\s*)(\d+);",
+        f"\\g<1>{new_gap};",
+        content,
+    )
+
+    with open(filename, "w") as f:
+        f.write(content)
+    print(f"✓ Updated firmware: High={new_high}, Low={new_low}, Gap={new_gap}")
+
+
+def reset_usb(usb_port=None, name=None):
+    """Put the Digispark in its bootloader; False if usb_reset could not."""
+    print("\n🔄 Resetting USB to trigger bootloader...")
+
+    # Reset USB with sudo (only this part needs sudo)
+    try:
+        # Only the Digispark's hub port (given or remembered by usb_reset);
+        # usb_reset waits for the bootloader to enumerate
+        result = subprocess.run(
+            USB_RESET_CMD + (["--port", usb_port] if usb_port else [])
+            + (["--name", name] if name else []),
+            capture_output=True,
+            text=True,
+            timeout=15,
+        )
+        if result.returncode == 0:
+            print(f"✓ USB reset successful {result.stdout.strip()}")
+            return True
+        print(f"⚠ USB reset failed: {(result.stdout + result.stderr).strip()}")
+        print("Continuing anyway...")
+    except Exception as e:
+        print(f"⚠ USB reset error: {e}")
+    return False
+
+
+class TempSketch:
+    """Arduino-cli requires the sketch folder name to match the .ino filename."""
+
+    def __init__(self, ino_file=SKETCH_PATH):
+        self.ino_file = ino_file
+        self.dir = Path(ino_file).stem
+
+    def __enter__(self):
+        if os.path.exists(self.dir):
+            shutil.rmtree(self.dir)
+        os.makedirs(self.dir, exist_ok=True)
+        os.symlink(self.ino_file, f"{self.dir}/{self.dir}.ino")
+        return self.dir
+
+    def __exit__(self, *exc):
+        if os.path.exists(self.dir):
+            shutil.rmtree(self.dir)
+
+
+# --- MEASUREMENT ---
+
+def measure_rf(cmd=RTL_433_CMD):
+    print("\n⏱  Listening with rtl_433 (60s)...")
+    try:
+        # Merge stderr into stdout to capture everything
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            timeout=65,
+        )
+        return result.stdout
+    except subprocess.TimeoutExpired:
+        print("⚠  Measurement timed out.")
+        return ""
+    except Exception as e:
+        print(f"✗ rtl_433 failed: {e}")
+        return ""
+
+
+def parse_analysis(output):
+    """
+    Short pulse, short gap and frame gap from rtl_433 -A output.
+    Picks the most frequent bucket in each range (ignores noise buckets).
+    """
+    candidates = {"pulse": [], "gap": [], "frame_gap": []}
+
+    section = None
+    for line in output.split("\n"):
+        if "Pulse width distribution" in line:
+            section = "pulse"
+            continue
+        if "Gap width distribution" in line:
+            section = "gap"
+            continue
+        if "distribution" in line:
+            section = None
+            continue
+
+        m = BUCKET_RE.search(line)
+        if not m or section is None:
+            continue
+        count, width = int(m.group(1)), int(m.group(2))
+
+        # Same bucket rules as the streaming measurement
+        key = classify(section, count, width)
+        if key:
+            candidates[key].append((count, width))
+
+    def best(buckets):
+        return max(buckets)[1] if buckets else None
+
+    return best(candidates["pulse"]), best(candidates["gap"]), best(candidates["frame_gap"])
+
+
+# --- PROFILES ---
+
+def load_profiles(filename=PROFILES_FILE):
+    with open(filename, "r") as f:
+        data = json.load(f)
+    return {
+        name: Profile(name, p["high"], p["low"], p["gap"], p.get("min_val", 400),
+                      p.get("max_val", 600), p.get("description", ""))
+        for name, p in data.items()
+    }
+
+
+# --- STRATEGIES ---
+
+class Strategy:
+    """Base: real hardware measured with rtl_433 (full window or adaptive)."""
+
+    name = None
+    hardware = True
+
+    def __init__(self, args):
+        self.stream = args.stream
+        self.ino_file = args.ino
+        self.port = args.port
+        self.usb_port = args.usb_port
+
+    def flash(self, config):
+        raise NotImplementedError
+
+    def measure(self):
+        if self.stream:
+            result = measure_rf_streaming(RTL_433_CMD)
+            if result is None or result.packets == 0:
+                return None
+            return result.pulse, result.gap, result.frame_gap
+        output = measure_rf()
+        return parse_analysis(output) if output else None
+
+
+class AutoFlash(Strategy):
+    name = "auto"
+
+    def flash(self, config):
+        update_values(self.ino_file, *config)
+        reset_usb(self.usb_port)
+        try:
+            with TempSketch(os.path.abspath(self.ino_file)) as sketch_dir:
+                flash_cmd = [ARDUINO_CLI, "compile", "--upload", "-b", FQBN, sketch_dir]
+                if self.port:
+                    flash_cmd[3:3] = ["-p", self.port]
+                print(f"Flashing firmware... Command: {' '.join(flash_cmd)}")
+                subprocess.run(flash_cmd, check=True, timeout=60)
+            print("Flash successful.")
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Flash failed: {e}")
+        except subprocess.TimeoutExpired:
+            print("Flash timed out. Did you replug the device?")
+        return False
+
+
+class ReplugFlash(Strategy):
+    """Compile first, then upload while the user unplugs/replugs the Digispark."""
+
+    name = "replug"
+
+    def flash(self, config):
+        update_values(self.ino_file, *config)
+        try:
+            with TempSketch(os.path.abspath(self.ino_file)) as sketch_dir:
+                print("\n⚙️  Compiling sketch...")
+                result = subprocess.run([ARDUINO_CLI, "compile", "-b", FQBN, sketch_dir],
+                                        capture_output=True, text=True, timeout=30)
+                if result.returncode != 0:
+                    print(f"❌ Compilation failed: {result.stderr}")
+                    return False
+                print("✓ Compilation successful!")
+
+                print("\n  ⚠️  GET READY TO UNPLUG/REPLUG DIGISPARK!")
+                for i in range(5, 0, -1):
+                    print(f"\n  Starting upload in {i} seconds...", end="", flush=True)
+                    time.sleep(1)
+                print("\n\n🚀 Starting upload NOW!")
+                print("   👉 UNPLUG and REPLUG the Digispark within the next 10 seconds!\n")
+
+                # Dummy port by default, micronucleus doesn't use it
+                result = subprocess.run(
+                    [ARDUINO_CLI, "upload", "-b", FQBN, "-p", self.port or "/dev/ttyACM0", sketch_dir],
+                    capture_output=True, text=True, timeout=90)
+        except Exception as e:
+            print(f"\n❌ Error: {e}")
+            return False
+
+        output = result.stdout + result.stderr
+        if "Aborted" in output or "Timeout" in output:
+            print("\n❌ Upload FAILED - Device not detected")
+            return False
+        print("\n✅ Upload successful!")
+        return True
+
+
+class ManualUpload(Strategy):
+    name = "manual"
+
+    def flash(self, config):
+        update_values(self.ino_file, *config)
+        print("\n🔧 MANUAL STEP:")
+        print("   1. Open Arduino IDE")
+        print(f"   2. Upload {self.ino_file}")
+        print("   3. Unplug/replug Digispark when prompted")
+        input("\n   Press ENTER when upload is complete...")
+        return True
+
+
+class CachedFlash(Strategy):
+    """Upload from the content-addressed build cache (see build_cache.py)."""
+
+    name = "cached"
+
+    def __init__(self, args):
+        super().__init__(args)
+        from build_cache import BuildCache
+        self.cache = BuildCache()
+
+    def flash(self, config):
+        # Compile before the reset: the bootloader window is only a few seconds
+        try:
+            self.cache.build(*config)
+        except Exception as e:
+            print(f"Build failed: {e}")
+            return False
+        reset_usb(self.usb_port)
+        try:
+            self.cache.upload(*config)
+        except Exception as e:
+            print(f"Flash failed: {e}")
+            return False
+        update_values(self.ino_file, *config)
+        return True
+
+
+class DryRun(Strategy):
+    """
+    Replays a saved rtl_433 -A capture recorded at `replay_config`. Other
+    configurations are answered by shifting the recorded widths 1:1, which
+    is enough to exercise the controllers and history without hardware.
+    """
+
+    name = "dry-run"
+    hardware = False
+
+    def __init__(self, args):
+        super().__init__(args)
+        if not args.replay:
+            raise ValueError("dry-run needs --replay <rtl_433 -A capture>")
+        with open(args.replay, "r") as f:
+            self.recorded = parse_analysis(f.read())
+        self.replay_config = tuple(args.replay_config or read_current_values(self.ino_file))
+        self.config = self.replay_config
+
+    def flash(self, config):
+        print(f"(dry-run) flash High={config[0]}, Low={config[1]}, Gap={config[2]}")
+        self.config = tuple(config)
+        return True
+
+    def measure(self):
+        if self.recorded[0] is None or self.recorded[1] is None:
+            return None
+        return tuple(None if m is None else m + c - r
+                     for m, c, r in zip(self.recorded, self.config, self.replay_config))
+
+
+class SimulatedDevice:
+    """Hidden linear device + measurement noise for dry runs."""
+
+    def __init__(self, seed=None):
+        rng = np.random.default_rng(seed)
+        self.A = np.array([[0.96, 0.04, 0.0],
+                           [-0.05, 1.02, 0.0],
+                           [0.3, 0.3, 1.0]]) + rng.normal(0, 0.01, (3, 3))
+        self.b = np.array([-21.0, 19.0, 140.0]) + rng.normal(0, 5, 3)
+        self.rng = rng
+        self.config = None
+
+    def flash(self, config):
+        self.config = np.asarray(config, dtype=float)
+        return True
+
+    def measure(self):
+        meas = self.A @ (self.config - np.array([500, 500, 9000])) + np.array([500, 500, 9000]) + self.b
+        meas += self.rng.normal(0, [1.0, 1.0, 8.0])
+        return tuple(int(round(v)) for v in meas)
+
+
+class Simulate(Strategy):
+    name = "simulate"
+    hardware = False
+
+    def __init__(self, args):
+        super().__init__(args)
+        self.device = SimulatedDevice(args.seed)
+
+    def flash(self, config):
+        return self.device.flash(config)
+
+    def measure(self):
+        return self.device.measure()
+
+
+STRATEGIES = {cls.name: cls for cls in (AutoFlash, ReplugFlash, ManualUpload, CachedFlash, DryRun, Simulate)}
+
+
+# --- CONTROLLERS ---
+
+def damped_step(config, measured, profile):
+    """Legacy proportional step (0.5 on pulses, 0.8 on gap)."""
+    curr_h, curr_l, curr_g = config
+    meas_h, meas_l, meas_g = measured
+    err_h = profile.high - meas_h
+    err_l = profile.low - meas_l
+    err_g = profile.gap - meas_g if meas_g else 0
+
+    # Damping factor 0.5 to avoid oscillation
+    adj_h = int(err_h * 0.5)
+    adj_l = int(err_l * 0.5)
+    adj_g = int(err_g * 0.8)  # Gap is usually linear
+
+    # Prevent stagnation (if error exists but 0.5 makes it 0)
+    if err_h != 0 and adj_h == 0:
+        adj_h = 1 if err_h > 0 else -1
+    if err_l != 0 and adj_l == 0:
+        adj_l = 1 if err_l > 0 else -1
+
+    new_h = max(profile.min_val, min(profile.max_val, curr_h + adj_h))
+    new_l = max(profile.min_val, min(profile.max_val, curr_l + adj_l))
+    new_g = curr_g + adj_g if meas_g else curr_g
+    return new_h, new_l, new_g
+
+
+# Prior: slope 1, no cross-coupling. Strength is expressed as "one extra
+# observation" displaced by these amounts (us) from the reference config.
+PRIOR_SCALE = np.array([10.0, 10.0, 100.0])
+PRIOR_WEIGHT = 1.0
+
+# Expected measured - configured (us) before any measurement: the Digispark
+# marks come out short and the spaces long (same offset as SimulatedDevice)
+PRIOR_OFFSET = np.array([-20.0, 20.0, 140.0])
+
+
+class PulseModel:
+    """
+    Joint linear model measured = A @ (config - ref) + b, fitted per device
+    from all (config, measurement) pairs with a ridge prior towards A = I.
+    A single observation therefore yields a pure offset correction; each
+    further observation refines the slopes.
+    """
+
+    def __init__(self, ref, min_val=400, max_val=600):
+        self.ref = np.asarray(ref, dtype=float)
+        self.min_val = min_val
+        self.max_val = max_val
+        self.history = []
+
+    def add(self, config, measured):
+        self.history.append((tuple(config), tuple(measured)))
+
+    def fit(self):
+        """Returns (A, b, known) where known[k] is False if output k was never measured."""
+        A = np.eye(3)
+        b = np.full(3, np.nan)
+        known = np.zeros(3, dtype=bool)
+        prior = np.diag(np.append(PRIOR_WEIGHT * PRIOR_SCALE ** 2, 0.0))
+
+        for k in range(3):
+            rows = [(c, m[k]) for c, m in self.history if m[k] is not None]
+            if not rows:
+                continue
+            known[k] = True
+            X = np.array([np.append(np.array(c) - self.ref, 1.0) for c, _ in rows])
+            y = np.array([m for _, m in rows], dtype=float)
+
+            # Ridge on slopes only: (X'X + P) theta = X'y + P theta0
+            theta0 = np.append(np.eye(3)[k], 0.0)
+            theta = np.linalg.lstsq(X.T @ X + prior, X.T @ y + prior @ theta0, rcond=None)[0]
+            A[k] = theta[:3]
+            b[k] = theta[3]
+        return A, b, known
+
+    def solve(self, target, current):
+        """Configuration predicted to hit `target` (unmeasured outputs keep their input)."""
+        A, b, known = self.fit()
+        target = np.asarray(target, dtype=float)
+        current = np.asarray(current, dtype=float)
+
+        x = current - self.ref
+        idx = np.flatnonzero(known)
+        if len(idx):
+            fixed = np.flatnonzero(~known)
+            rhs = target[idx] - b[idx] - A[np.ix_(idx, fixed)] @ x[fixed]
+            x[idx] = np.linalg.solve(A[np.ix_(idx, idx)], rhs)
+
+        config = np.rint(x + self.ref).astype(int)
+        config[:2] = np.clip(config[:2], self.min_val, self.max_val)
+        return tuple(int(v) for v in config)
+
+    def predict(self, config):
+        """Expected widths at `config`; unmeasured outputs use PRIOR_OFFSET."""
+        A, b, known = self.fit()
+        b = np.where(known, b, self.ref + PRIOR_OFFSET)
+        return A @ (np.asarray(config, dtype=float) - self.ref) + b
+
+
+def within_tolerance(err):
+    err_h, err_l, err_g = err
+    return abs(err_h) <= TOL_PULSE and abs(err_l) <= TOL_PULSE and (err_g is None or abs(err_g) <= TOL_GAP)
+
+
+# --- HISTORY ---
+
+def load_history(filename=HISTORY_FILE):
+    if not Path(filename).exists():
+        return []
+    with open(filename, "r") as f:
+        return json.load(f)
+
+
+def save_history(history, filename=HISTORY_FILE):
+    tmp = Path(filename).with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp, filename)
+
+
+def warm_start(history, device, profile, hardware=True, strategy=None):
+    """
+    (start config, earlier observations) from previous sessions of this
+    device and profile. Simulated/replayed sessions only warm-start
+    sessions of the same strategy.
+    """
+    sessions = [s for s in history
+                if s["device"] == device and s["profile"] == profile.name
+                and s.get("hardware", True) == hardware
+                and (hardware or s["strategy"] == strategy)]
+    observations = [(tuple(it["config"]), tuple(it["measured"]))
+                    for s in sessions for it in s["iterations"]]
+    start = None
+    for s in reversed(sessions):
+        if s.get("final"):
+            start = tuple(s["final"])
+            break
+    return start, observations
+
+
+# --- ENGINE ---
+
+def run_session(strategy, profile, controller="model", device="default", steps=10,
+                initial_flash=True, history=None, history_file=HISTORY_FILE):
+    history = load_history(history_file) if history is None else history
+    target = (profile.high, profile.low, profile.gap)
+
+    config = read_current_values(strategy.ino_file)
+    start, observations = warm_start(history, device, profile, strategy.hardware, strategy.name)
+    if start and start != config:
+        print(f"♻️  Warm start from previous session: High={start[0]}, Low={start[1]}, Gap={start[2]}")
+        config = start
+        initial_flash = True
+
+    model = PulseModel(config, profile.min_val, profile.max_val)
+    for obs in observations:
+        model.add(*obs)
+    if observations:
+        print(f"♻️  Model seeded with {len(observations)} earlier observation(s)")
+
+    session = {
+        "device": device,
+        "profile": profile.name,
+        "strategy": strategy.name,
+        "controller": controller,
+        "hardware": strategy.hardware,
+        "started": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "target": list(target),
+        "iterations": [],
+        "final": None,
+        "converged": False,
+    }
+    history.append(session)
+
+    print(f"🎯 Profile {profile.name}: High={profile.high}, Low={profile.low}, Gap={profile.gap}")
+    t_start = time.time()
+    for i in range(steps):
+        print(f"\n--- Iteration {i+1}/{steps} ---")
+        print(f"📋 Config: High={config[0]}, Low={config[1]}, Gap={config[2]}")
+
+        if (i > 0 or initial_flash) and not strategy.flash(config):
+            print("\n❌ Flash failed, stopping.")
+            break
+
+        measured = strategy.measure()
+        if not measured:
+            print("✗ No data received.")
+            break
+        print(f"📊 Measured: High={measured[0]}, Low={measured[1]}, Gap={measured[2]}")
+        if measured[0] is None or measured[1] is None:
+            print("✗ Could not parse Pulse/Gap widths. Signal too weak?")
+            break
+
+        model.add(config, measured)
+        session["iterations"].append({"config": list(config), "measured": list(measured),
+                                      "t": round(time.time() - t_start, 1)})
+        session["final"] = list(config)
+        save_history(history, history_file)
+
+        err = tuple(None if m is None else t - m for t, m in zip(target, measured))
+        print(f"📉 Errors: High={err[0]:+d}, Low={err[1]:+d}, Gap={err[2] if err[2] is None else f'{err[2]:+d}'}")
+        if within_tolerance(err):
+            session["converged"] = True
+            print(f"\n✅ CONVERGED in {i+1} iteration(s), {time.time()-t_start:.0f}s")
+            print(f"Final values: High={config[0]}, Low={config[1]}, Gap={config[2]}")
+            break
+
+        if controller == "model":
+            new_config = model.solve(target, config)
+        else:
+            new_config = damped_step(config, measured, profile)
+        if new_config == tuple(config):
+            print("Controller predicts no change; stopping.")
+            break
+        print(f"\n🔄 Next: High {config[0]}→{new_config[0]}, Low {config[1]}→{new_config[1]}, "
+              f"Gap {config[2]}→{new_config[2]}")
+        config = new_config
+
+        # Persist the adjustment now: with --steps 1 there is no next flash.
+        # Offline strategies keep it in the history only (warm start), so a
+        # simulation never rewrites the real firmware.
+        if strategy.hardware:
+            update_values(strategy.ino_file, *config)
+        session["final"] = list(config)
+        save_history(history, history_file)
+
+    session["elapsed_s"] = round(time.time() - t_start, 1)
+    save_history(history, history_file)
+    return session
+
+
+def print_history(history):
+    print(f"{'Started':19} | {'Device':12} | {'Profile':14} | {'Strategy':14} | It | Final")
+    print("-" * 80)
+    for s in history:
+        final = "/".join(map(str, s["final"])) if s["final"] else "-"
+        mark = "✓" if s["converged"] else "✗"
+        print(f"{s['started']:19} | {s['device']:12} | {s['profile']:14} | {s['strategy']:14} | "
+              f"{len(s['iterations']):2d} | {final} {mark}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Unified RF tuning engine")
+    parser.add_argument("--strategy", choices=list(STRATEGIES), default="auto")
+    parser.add_argument("--profile", default="reference", help="Target profile name")
+    parser.add_argument("--profiles", type=Path, default=PROFILES_FILE)
+    parser.add_argument("--controller", choices=("model", "damped"), default="model")
+    parser.add_argument("--device", default="default", help="Board identifier for the history")
+    parser.add_argument("--steps", type=int, default=10, help="Max tuning iterations")
+    parser.add_argument("--no-initial-flash", action="store_true",
+                        help="Device already runs the current .ino; measure it directly")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stop listening as soon as the widths are stable (rf_measure)")
+    parser.add_argument("--ino", default=INO_FILE)
+    parser.add_argument("--port", type=str, help="Serial port for upload")
+    parser.add_argument("--usb-port", help="Digispark hub port for usb_reset (e.g. 1-1.2); "
+                                           "default: the one remembered by usb_reset --learn")
+    parser.add_argument("--flash-only", action="store_true",
+                        help="Flash the current .ino (--steps times) without measuring")
+    parser.add_argument("--replay", help="rtl_433 -A capture for --strategy dry-run")
+    parser.add_argument("--replay-config", type=int, nargs=3, metavar=("HIGH", "LOW", "GAP"),
+                        help="Firmware values the replayed capture was recorded with")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for --strategy simulate")
+    parser.add_argument("--history-file", type=Path, default=HISTORY_FILE)
+    parser.add_argument("--history", action="store_true", help="Show past sessions and exit")
+    args = parser.parse_args(argv)
+
+    if args.history:
+        print_history(load_history(args.history_file))
+        return
+
+    profiles = load_profiles(args.profiles)
+    if args.profile not in profiles:
+        print(f"✗ Unknown profile {args.profile}. Available: {', '.join(profiles)}")
+        sys.exit(1)
+
+    try:
+        strategy = STRATEGIES[args.strategy](args)
+    except (ValueError, OSError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    if args.flash_only:
+        config = read_current_values(args.ino)
+        for _ in range(args.steps):
+            if not strategy.flash(config):
+                print("\n❌ Flash failed, stopping.")
+                break
+    else:
+        run_session(strategy, profiles[args.profile], args.controller, args.device, args.steps,
+                    initial_flash=not args.no_initial_flash, history_file=args.history_file)
+    print("\n🏁 Tuning finished!")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠  Interrupted by user.")
+        sys.exit(0)
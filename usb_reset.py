@@ -1,18 +1,192 @@
 #!/usr/bin/env python3
 
 import os
+import sys
+import json
 import time
+import argparse
 import subprocess
 
-# Este script reinicia todos los dispositivos USB en sistemas Linux
+# Este script reinicia dispositivos USB en sistemas Linux
 # Requiere ejecución como root
+#
+# Por defecto solo reinicia el dispositivo indicado (VID/PID, serie o puerto)
+# y espera a que vuelva a enumerarse comprobando sysfs, en lugar de recorrer
+# todo el bus con pausas fijas (lo que además molesta al dongle RTL-SDR).
+#
+# El Digispark solo aparece como 16d0:0753 durante la ventana del bootloader;
+# con el sketch en marcha no está en el bus. Por eso se localiza por el puerto
+# del hub donde se vio por última vez (guardado en .usb_ports.json) y se
+# reinicia cortando la alimentación de ese puerto. Si no se conoce el puerto
+# falla: nunca reinicia todo el bus por su cuenta.
+#
+# Uso:
+#   sudo python3 usb_reset.py --learn                      # enchufar y recordar el puerto
+#   sudo python3 usb_reset.py --digispark                  # puerto recordado
+#   sudo python3 usb_reset.py --digispark --port 1-1.2 --name placa_b
+#   sudo python3 usb_reset.py --serial ABC123
+#   sudo python3 usb_reset.py --all                        # todo el bus (comportamiento antiguo)
+#   python3 usb_reset.py --list --sysfs /tmp/fake_sysfs    # árbol sysfs de pruebas
 
 USB_PATH = "/sys/bus/usb/devices"
+PORTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".usb_ports.json")
 
+# Micronucleus (bootloader Digispark)
+DIGISPARK_VID = "16d0"
+DIGISPARK_PID = "0753"
 
-def reset_usb_devices():
-    for device in os.listdir(USB_PATH):
-        device_path = os.path.join(USB_PATH, device)
+POLL_INTERVAL = 0.05
+ENUM_TIMEOUT = 5.0
+LEARN_TIMEOUT = 30.0
+
+
+def _read(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _write(path, value):
+    with open(path, "w") as f:
+        f.write(value)
+
+
+def list_devices(root=USB_PATH):
+    """Dispositivos USB reales (con idVendor) y sus atributos básicos."""
+    devices = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        # Las interfaces (1-1:1.0) no tienen idVendor
+        vid = _read(os.path.join(path, "idVendor"))
+        if vid is None:
+            continue
+        devices.append({
+            "port": name,
+            "path": path,
+            "vid": vid.lower(),
+            "pid": (_read(os.path.join(path, "idProduct")) or "").lower(),
+            "serial": _read(os.path.join(path, "serial")),
+            "product": _read(os.path.join(path, "product")),
+            "authorized": _read(os.path.join(path, "authorized")),
+        })
+    return devices
+
+
+def find_devices(root=USB_PATH, vid=None, pid=None, serial=None, port=None):
+    """Dispositivos que cumplen todos los criterios indicados."""
+    matches = []
+    for dev in list_devices(root):
+        if vid and dev["vid"] != vid.lower():
+            continue
+        if pid and dev["pid"] != pid.lower():
+            continue
+        if serial and dev["serial"] != serial:
+            continue
+        if port and dev["port"] != port:
+            continue
+        matches.append(dev)
+    return matches
+
+
+def has_interfaces(path):
+    """El kernel crea las interfaces (1-1.2:1.0) solo con el dispositivo configurado."""
+    name = os.path.basename(path)
+    try:
+        return any(entry.startswith(name + ":") for entry in os.listdir(path))
+    except OSError:
+        return False
+
+
+def is_ready(root, port, vid=None, pid=None):
+    """Hay un dispositivo autorizado y configurado en `port` (con VID/PID si se indican)."""
+    for dev in find_devices(root, vid, pid, port=port):
+        if dev["authorized"] == "1" and has_interfaces(dev["path"]):
+            return True
+    return False
+
+
+def port_disable_path(root, port):
+    """Atributo `disable` del puerto del hub padre (1-1.2 -> 1-1:1.0/1-1-port2)."""
+    if "." in port:
+        hub, n = port.rsplit(".", 1)
+        return os.path.join(root, f"{hub}:1.0", f"{hub}-port{n}", "disable")
+    bus, n = port.split("-", 1)
+    return os.path.join(root, f"{bus}-0:1.0", f"usb{bus}-port{n}", "disable")
+
+
+# --- puertos recordados ---
+
+def load_ports(filename=PORTS_FILE):
+    try:
+        with open(filename, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def remember_port(name, port, filename=PORTS_FILE):
+    ports = load_ports(filename)
+    if ports.get(name) != port:
+        ports[name] = port
+        with open(filename, "w") as f:
+            json.dump(ports, f, indent=2)
+
+
+def wait_for(predicate, timeout=ENUM_TIMEOUT, interval=POLL_INTERVAL):
+    """Sondea `predicate` hasta que sea cierto o venza el tiempo."""
+    deadline = time.monotonic() + timeout
+    while True:
+        if predicate():
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+def reset_device(dev, timeout=ENUM_TIMEOUT):
+    """
+    Desautoriza y vuelve a autorizar un único dispositivo, esperando a que
+    el kernel retire sus interfaces y a que vuelvan a aparecer (el nodo sysfs
+    y su idVendor siguen ahí mientras está desautorizado).
+    Devuelve True si vuelve a estar configurado dentro del tiempo límite.
+    """
+    authorized_path = os.path.join(dev["path"], "authorized")
+    _write(authorized_path, "0")
+    wait_for(lambda: not has_interfaces(dev["path"]), timeout)
+
+    _write(authorized_path, "1")
+    return wait_for(lambda: _read(authorized_path) == "1" and has_interfaces(dev["path"]), timeout)
+
+
+def reset_port(root, port, vid=None, pid=None, timeout=ENUM_TIMEOUT):
+    """
+    Corta y devuelve la alimentación de un puerto del hub y espera a que
+    aparezca en él un dispositivo configurado (con VID/PID si se indican,
+    p.ej. el bootloader del Digispark). Sirve aunque ahora no haya nada
+    enumerado en el puerto. Sin `disable` (kernels antiguos) desautoriza el
+    dispositivo que haya en el puerto.
+    """
+    disable_path = port_disable_path(root, port)
+    if os.path.exists(disable_path):
+        _write(disable_path, "1")
+        wait_for(lambda: not find_devices(root, port=port), timeout)
+        _write(disable_path, "0")
+    else:
+        devices = find_devices(root, port=port)
+        if not devices:
+            return False
+        authorized_path = os.path.join(devices[0]["path"], "authorized")
+        _write(authorized_path, "0")
+        wait_for(lambda: not has_interfaces(devices[0]["path"]), timeout)
+        _write(authorized_path, "1")
+    return wait_for(lambda: is_ready(root, port, vid, pid), timeout)
+
+
+def reset_usb_devices(root=USB_PATH):
+    for device in os.listdir(root):
+        device_path = os.path.join(root, device)
 
         # Solo actuar sobre dispositivos USB reales
         if not os.path.isdir(device_path):
@@ -45,11 +219,102 @@ def reload_usb_modules():
     subprocess.run(["modprobe", "usb_storage"], check=False)
 
 
-if __name__ == "__main__":
-    if os.geteuid() != 0:
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reinicio USB selectivo")
+    parser.add_argument("--vid", help="idVendor (hex), p.ej. 16d0")
+    parser.add_argument("--pid", help="idProduct (hex), p.ej. 0753")
+    parser.add_argument("--serial", help="Número de serie")
+    parser.add_argument("--port", help="Puerto sysfs del hub, p.ej. 1-1.2")
+    parser.add_argument("--digispark", action="store_true",
+                        help="Digispark: puerto recordado y espera al bootloader 16d0:0753")
+    parser.add_argument("--name", default="digispark", help="Nombre del puerto recordado (una placa)")
+    parser.add_argument("--learn", action="store_true",
+                        help="Esperar a que se enchufe el Digispark y recordar su puerto")
+    parser.add_argument("--all", action="store_true", help="Reiniciar todos los dispositivos")
+    parser.add_argument("--timeout", type=float, default=ENUM_TIMEOUT)
+    parser.add_argument("--list", action="store_true", help="Listar dispositivos y salir")
+    parser.add_argument("--sysfs", default=USB_PATH, help="Raíz sysfs (árbol falso para pruebas)")
+    parser.add_argument("--ports-file", default=PORTS_FILE, help="Puertos recordados")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        remembered = {port: name for name, port in load_ports(args.ports_file).items()}
+        for dev in list_devices(args.sysfs):
+            name = remembered.get(dev["port"])
+            print(f"{dev['port']:10} {dev['vid']}:{dev['pid']}  {dev['product'] or ''}"
+                  f"{'  serie=' + dev['serial'] if dev['serial'] else ''}"
+                  f"{'  [' + name + ']' if name else ''}")
+        return 0
+
+    if args.sysfs == USB_PATH and os.geteuid() != 0:
         print("Este script debe ejecutarse como root (sudo).")
-        exit(1)
+        return 1
+
+    if args.learn:
+        print(f"Enchufa el Digispark ({LEARN_TIMEOUT:.0f}s)...")
+        wait_for(lambda: find_devices(args.sysfs, DIGISPARK_VID, DIGISPARK_PID), LEARN_TIMEOUT)
+        found = find_devices(args.sysfs, DIGISPARK_VID, DIGISPARK_PID)
+        if not found:
+            print("No ha aparecido ningún bootloader Digispark.")
+            return 2
+        remember_port(args.name, found[0]["port"], args.ports_file)
+        print(f"✓ {args.name}: puerto {found[0]['port']} recordado")
+        return 0
+
+    if args.digispark:
+        # Dentro de la ventana del bootloader se ve por VID/PID; si no, puerto recordado
+        port = args.port
+        if port is None:
+            seen = find_devices(args.sysfs, DIGISPARK_VID, DIGISPARK_PID)
+            port = seen[0]["port"] if len(seen) == 1 else load_ports(args.ports_file).get(args.name)
+        if port is None:
+            print(f"Puerto de '{args.name}' desconocido: usa --learn o --port.")
+            return 2
+        remember_port(args.name, port, args.ports_file)
+        t0 = time.monotonic()
+        if not reset_port(args.sysfs, port, DIGISPARK_VID, DIGISPARK_PID, args.timeout):
+            print(f"⚠ {port}: el bootloader no apareció en {args.timeout:.1f}s")
+            return 3
+        print(f"✓ {port} ({DIGISPARK_VID}:{DIGISPARK_PID}) en bootloader en {time.monotonic() - t0:.2f}s")
+        return 0
+
+    if args.all:
+        print("Reiniciando dispositivos USB...")
+        reset_usb_devices(args.sysfs)
+        print("USB reiniciados correctamente.")
+        return 0
+
+    if not any((args.vid, args.pid, args.serial, args.port)):
+        # Todo el bus solo con --all
+        parser.print_usage()
+        print("Indica el dispositivo (--digispark, --vid/--pid, --serial, --port) o --all.")
+        return 1
 
-    print("Reiniciando dispositivos USB...")
-    reset_usb_devices()
-    print("USB reiniciados correctamente.")
+    if args.port and not any((args.vid, args.pid, args.serial)):
+        t0 = time.monotonic()
+        if not reset_port(args.sysfs, args.port, timeout=args.timeout):
+            print(f"⚠ {args.port} no reapareció en {args.timeout:.1f}s")
+            return 3
+        print(f"✓ {args.port} reiniciado en {time.monotonic() - t0:.2f}s")
+        return 0
+
+    matches = find_devices(args.sysfs, args.vid, args.pid, args.serial, args.port)
+    if not matches:
+        print("Dispositivo no encontrado.")
+        return 2
+
+    status = 0
+    for dev in matches:
+        t0 = time.monotonic()
+        ok = reset_device(dev, args.timeout)
+        elapsed = time.monotonic() - t0
+        if ok:
+            print(f"✓ {dev['port']} ({dev['vid']}:{dev['pid']}) reiniciado en {elapsed:.2f}s")
+        else:
+            print(f"⚠ {dev['port']} no reapareció en {args.timeout:.1f}s")
+            status = 3
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())